@@ -1,26 +1,40 @@
 # Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
 # For license information, please see license.txt
 
+import json
+
 import frappe
 from frappe import _
+from frappe.utils import cint
+
+from work_order_estimations.costing.addons import get_item_rates
+from work_order_estimations.costing.currency import get_default_currency
+from work_order_estimations.costing.processes import calculate_process_costs
+from work_order_estimations.dashboard import get_cost_breakdown as get_cost_breakdown_projection
+from work_order_estimations.estimation_status import transition_single
+from work_order_estimations.error_tracking import record_error
+from work_order_estimations.idempotency import idempotent
 
 @frappe.whitelist()
 def refresh_calculations(doctype, docname):
     """Refresh all calculations for Work Order Estimation"""
     try:
         doc = frappe.get_doc(doctype, docname)
-        doc.calculate_paper_metrics()
-        doc.calculate_costs()
         doc.save()
         frappe.msgprint(_("Calculations refreshed successfully!"))
-        return {"success": True, "message": "Calculations refreshed successfully!"}
+        return {
+            "success": True,
+            "message": "Calculations refreshed successfully!",
+            "delta": doc.flags.estimation_delta
+        }
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Calculation refresh failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("refresh_calculations", error_msg)
         frappe.throw(_("Error refreshing calculations. Please try again."))
 
 @frappe.whitelist()
+@idempotent("convert_to_quotation")
 def convert_to_quotation(doctype, docname):
     """Convert Work Order Estimation to Quotation"""
     try:
@@ -30,10 +44,11 @@ def convert_to_quotation(doctype, docname):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Quotation conversion failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("convert_to_quotation", error_msg)
         frappe.throw(_("Error converting to quotation. Please try again."))
 
 @frappe.whitelist()
+@idempotent("create_sales_order_from_quotation")
 def create_sales_order_from_quotation(doctype, docname, quotation_name):
     """Create Sales Order from Quotation"""
     try:
@@ -43,10 +58,11 @@ def create_sales_order_from_quotation(doctype, docname, quotation_name):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Sales Order creation failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("create_sales_order_from_quotation", error_msg)
         frappe.throw(_("Error creating sales order. Please try again."))
 
 @frappe.whitelist()
+@idempotent("create_work_order_from_sales_order")
 def create_work_order_from_sales_order(doctype, docname, sales_order_name):
     """Create Work Order from Sales Order"""
     try:
@@ -56,10 +72,11 @@ def create_work_order_from_sales_order(doctype, docname, sales_order_name):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Work Order creation failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("create_work_order_from_sales_order", error_msg)
         frappe.throw(_("Error creating work order. Please try again."))
 
 @frappe.whitelist()
+@idempotent("create_stock_entries_from_work_order")
 def create_stock_entries_from_work_order(doctype, docname, work_order_name):
     """Create Stock Entries from Work Order"""
     try:
@@ -69,7 +86,7 @@ def create_stock_entries_from_work_order(doctype, docname, work_order_name):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Stock Entry creation failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("create_stock_entries_from_work_order", error_msg)
         frappe.throw(_("Error creating stock entries. Please try again."))
 
 @frappe.whitelist()
@@ -86,50 +103,46 @@ def generate_pdf_report(doctype, docname):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"PDF generation failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("generate_pdf_report", error_msg)
         frappe.throw(_("Error generating PDF report. Please try again."))
 
 @frappe.whitelist()
 def submit_estimation(doctype, docname):
     """Submit Work Order Estimation (change status to Sent)"""
     try:
-        doc = frappe.get_doc(doctype, docname)
-        doc.status = "Sent"
-        doc.save()
+        transition_single(docname, "Sent")
         frappe.msgprint(_("Estimation submitted successfully!"))
         return {"success": True, "message": "Estimation submitted successfully!"}
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Estimation submission failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("submit_estimation", error_msg)
         frappe.throw(_("Error submitting estimation. Please try again."))
 
 @frappe.whitelist()
 def cancel_estimation(doctype, docname):
     """Cancel Work Order Estimation (change status to Cancelled)"""
     try:
-        doc = frappe.get_doc(doctype, docname)
-        doc.status = "Cancelled"
-        doc.save()
+        transition_single(docname, "Cancelled")
         frappe.msgprint(_("Estimation cancelled successfully!"))
         return {"success": True, "message": "Estimation cancelled successfully!"}
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Estimation cancellation failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("cancel_estimation", error_msg)
         frappe.throw(_("Error cancelling estimation. Please try again."))
 
 @frappe.whitelist()
 def get_cost_breakdown(doctype, docname):
     """Get detailed cost breakdown for dashboard"""
     try:
-        doc = frappe.get_doc(doctype, docname)
-        breakdown = doc.get_cost_breakdown()
+        frappe.has_permission(doctype, "read", doc=docname, throw=True)
+        breakdown = get_cost_breakdown_projection(docname)
         return {"success": True, "breakdown": breakdown}
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Cost breakdown retrieval failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("get_cost_breakdown", error_msg)
         frappe.throw(_("Error getting cost breakdown. Please try again."))
 
 @frappe.whitelist()
@@ -141,6 +154,7 @@ def auto_fetch_rate_from_item(doctype, docname):
             item = frappe.get_doc("Item", doc.paper_type)
             if item.valuation_rate:
                 doc.rate_per_kg = item.valuation_rate
+                doc.rate_currency = get_default_currency()
                 doc.save()
                 frappe.msgprint(_("Rate per kg updated from Item Master: {0}").format(item.valuation_rate))
                 return {"success": True, "rate": item.valuation_rate}
@@ -153,10 +167,11 @@ def auto_fetch_rate_from_item(doctype, docname):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Rate auto-fetch failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("auto_fetch_rate_from_item", error_msg)
         frappe.throw(_("Error auto-fetching rate. Please try again."))
 
 @frappe.whitelist()
+@idempotent("create_sample_bom")
 def create_sample_bom(doctype, docname):
     """Create a sample BOM for the paper type if none exists"""
     try:
@@ -204,7 +219,7 @@ def create_sample_bom(doctype, docname):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Sample BOM creation failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("create_sample_bom", error_msg)
         frappe.throw(_("Error creating sample BOM. Please try again."))
 
 @frappe.whitelist()
@@ -277,7 +292,7 @@ def get_document_flow_summary(doctype, docname):
     except Exception as e:
         # Log error with shorter message to avoid truncation
         error_msg = f"Document flow summary failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("get_document_flow_summary", error_msg)
         frappe.throw(_("Error getting document flow summary. Please try again."))
 
 @frappe.whitelist()
@@ -305,7 +320,7 @@ def get_bom_details(bom_no):
         }
     except Exception as e:
         error_msg = f"BOM details fetch failed for {bom_no}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("get_bom_details", error_msg)
         return {"success": False, "message": str(e)}
 
 @frappe.whitelist()
@@ -317,12 +332,13 @@ def auto_fetch_rate_from_item(doctype, docname):
             item = frappe.get_doc("Item", doc.paper_type)
             if item.valuation_rate:
                 doc.rate_per_kg = item.valuation_rate
+                doc.rate_currency = get_default_currency()
                 doc.save()
                 return {"success": True, "rate": doc.rate_per_kg}
         return {"success": False, "message": "No rate found for this item"}
     except Exception as e:
         error_msg = f"Rate auto-fetch failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("auto_fetch_rate_from_item", error_msg)
         return {"success": False, "message": str(e)}
 
 @frappe.whitelist()
@@ -335,7 +351,7 @@ def update_bom_costs(doctype, docname):
         return {"success": True, "message": "BOM costs updated successfully!"}
     except Exception as e:
         error_msg = f"BOM cost update failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("update_bom_costs", error_msg)
         return {"success": False, "message": str(e)}
 
 @frappe.whitelist()
@@ -348,7 +364,7 @@ def recalculate_operations_cost(doctype, docname):
         return {"success": True, "message": "Operations cost recalculated successfully!"}
     except Exception as e:
         error_msg = f"Operations cost recalculation failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("recalculate_operations_cost", error_msg)
         return {"success": False, "message": str(e)}
 
 @frappe.whitelist()
@@ -361,7 +377,7 @@ def populate_bom_from_default(doctype, docname):
         return {"success": True, "message": "BOM populated from default successfully!"}
     except Exception as e:
         error_msg = f"BOM population from default failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("populate_bom_from_default", error_msg)
         return {"success": False, "message": str(e)}
 
 @frappe.whitelist()
@@ -376,5 +392,119 @@ def get_weight_calculation_breakdown(doctype, docname):
             return {"success": False, "message": "Unable to calculate breakdown"}
     except Exception as e:
         error_msg = f"Weight calculation breakdown failed for {doctype} {docname}: {str(e)[:100]}"
-        frappe.log_error(error_msg, "Work Order Estimation API Error")
+        record_error("get_weight_calculation_breakdown", error_msg)
         return {"success": False, "message": str(e)}
+
+
+def batch_refresh_calculations(doc, args):
+    doc.calculate_all()
+    return {"total_cost": doc.total_cost}
+
+def batch_recalculate_operations_cost(doc, args):
+    calculate_process_costs(doc)
+    doc.calculate_operations_cost()
+    doc.calculate_final_totals()
+    return {"total_cost_for_operations": doc.total_cost_for_operations}
+
+def batch_fetch_item_rates(doc, args):
+    """Refresh rate per kg of all items, or of the given rows, with one price lookup"""
+    rows = [row for row in doc.estimation_items if not args.get("rows") or row.name in args["rows"]]
+    rates = get_item_rates([row.paper_type for row in rows])
+    default_currency = get_default_currency()
+    updated = {}
+    for row in rows:
+        if rates.get(row.paper_type):
+            row.rate_per_kg = updated[row.name] = rates[row.paper_type]
+            row.rate_currency = default_currency
+    return {"rates": updated}
+
+def batch_set_value(doc, args):
+    """Set a parent field, or a child row field when `table` and `row` are given
+
+    Only fields the user can edit on the form qualify: read-only fields and
+    fields with a permission level, such as status or is_archived, are refused.
+    """
+    target = doc
+    if args.get("table"):
+        target = next((row for row in doc.get(args["table"]) or [] if row.name == args.get("row")), None)
+        if not target:
+            frappe.throw(_("Row {0} not found in {1}").format(args.get("row"), args["table"]))
+    df = target.meta.get_field(args.get("fieldname"))
+    if not df:
+        frappe.throw(_("Invalid field {0}").format(args.get("fieldname")))
+    if df.read_only or df.permlevel:
+        frappe.throw(_("Field {0} cannot be set in a batch").format(df.label or df.fieldname), frappe.PermissionError)
+    target.set(args["fieldname"], args.get("value"))
+    return {"fieldname": args["fieldname"], "value": target.get(args["fieldname"])}
+
+def batch_get_cost_breakdown(doc, args):
+    # Reflect earlier operations of the batch without waiting for the save
+    if doc.flags.batch_changed:
+        doc.calculate_all()
+    return doc.get_cost_breakdown()
+
+# Operation name -> (handler, whether it changes the document)
+BATCH_OPERATIONS = {
+    "refresh_calculations": (batch_refresh_calculations, True),
+    "recalculate_operations_cost": (batch_recalculate_operations_cost, True),
+    "auto_fetch_rate_from_item": (batch_fetch_item_rates, True),
+    "set_value": (batch_set_value, True),
+    "get_cost_breakdown": (batch_get_cost_breakdown, False),
+}
+
+def run_document_operations(docname, operations):
+    """Apply operations to one estimation loaded once, saving once if any of them changed it"""
+    doc = frappe.get_doc("Work Order Estimation", docname)
+    changes = any(BATCH_OPERATIONS.get(op.get("method"), (None, False))[1] for _idx, op in operations)
+    doc.check_permission("write" if changes else "read")
+
+    results = {}
+    for idx, op in operations:
+        if op.get("method") not in BATCH_OPERATIONS:
+            frappe.throw(_("Unsupported operation: {0}").format(op.get("method")))
+        handler, changes_doc = BATCH_OPERATIONS[op["method"]]
+        results[idx] = {"docname": docname, "method": op["method"], "success": True,
+                        "result": handler(doc, frappe._dict(op.get("args") or {}))}
+        doc.flags.batch_changed = doc.flags.batch_changed or changes_doc
+
+    if changes:
+        doc.save()
+        for idx in results:
+            results[idx]["modified"] = doc.modified
+        # The delta covers every operation, so attach it once per document
+        results[operations[-1][0]]["delta"] = doc.flags.estimation_delta
+    return results
+
+@frappe.whitelist()
+def run_batch(operations, atomic=0):
+    """Run an ordered list of operations on one or many estimations in one request
+
+    `operations` is a list of {"docname", "method", "args"}. Each document is
+    loaded once, its operations applied in order in memory and the document
+    saved once. A failing document is rolled back on its own and reported in
+    its results; with `atomic` set the whole batch fails instead.
+    """
+    if isinstance(operations, str):
+        operations = json.loads(operations)
+
+    by_document = {}
+    for idx, op in enumerate(operations or []):
+        by_document.setdefault(op.get("docname"), []).append((idx, op))
+
+    results = [None] * len(operations or [])
+    for docname, document_operations in by_document.items():
+        savepoint = f"batch_{frappe.generate_hash(length=8)}"
+        frappe.db.savepoint(savepoint)
+        try:
+            for idx, result in run_document_operations(docname, document_operations).items():
+                results[idx] = result
+        except Exception as e:
+            frappe.db.rollback(save_point=savepoint)
+            if cint(atomic):
+                raise
+            frappe.clear_messages()
+            for idx, op in document_operations:
+                results[idx] = {"docname": docname, "method": op.get("method"), "success": False, "message": str(e)}
+
+    return {"success": all(r["success"] for r in results), "results": results}
+
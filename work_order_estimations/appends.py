@@ -0,0 +1,274 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now
+
+from work_order_estimations.costing.addons import (
+    PER_PIECE,
+    get_addon_amount,
+    get_consumed_item,
+    get_consumption,
+    get_item_rates,
+    split_addon_amount,
+)
+from work_order_estimations.costing.currency import apply_exchange_rates
+from work_order_estimations.costing.reel import calculate_reel_consumption
+from work_order_estimations.costing.totals import apply_final_totals
+from work_order_estimations.costing.waste import calculate_process_waste
+from work_order_estimations.realtime import DELTA_EVENT, TOTAL_FIELDS, get_row_values
+
+DOCTYPE = "Work Order Estimation"
+ITEM_DOCTYPE = "Work Order Estimation Item"
+ADDON_DOCTYPE = "Work Order Estimation Item Addon"
+PROCESS_DOCTYPE = "Estimation Process"
+
+LOCKED_FIELDS = (
+    "name", "creation", "modified", "is_archived", "profit_margin", "currency", "exchange_rate_date",
+    "total_paper_cost", "total_addon_cost", "total_cost_for_operations",
+    *TOTAL_FIELDS,
+)
+
+
+def lock_estimation(name):
+    """Lock the estimation row until the transaction ends and return its totals
+
+    Concurrent appends to the same estimation queue on this lock for the
+    few statements of an append instead of racing on a full document save.
+    """
+    frappe.has_permission(DOCTYPE, "write", doc=name, throw=True)
+    fields = ", ".join(f"`{field}`" for field in dict.fromkeys(LOCKED_FIELDS))
+    rows = frappe.db.sql(
+        f"select {fields} from `tabWork Order Estimation` where name = %s for update", name, as_dict=True
+    )
+    if not rows:
+        frappe.throw(_("Work Order Estimation {0} not found").format(name), frappe.DoesNotExistError)
+    return rows[0]
+
+
+def child_filters(name, table):
+    return {"parent": name, "parenttype": DOCTYPE, "parentfield": table}
+
+
+def new_child_row(doctype, name, table, values):
+    """Child row for direct insert, placed after the current last row"""
+    last_idx = frappe.db.sql(
+        f"select max(idx) from `tab{doctype}` where parent = %s and parenttype = %s and parentfield = %s",
+        (name, DOCTYPE, table),
+    )[0][0]
+    row = frappe.get_doc({"doctype": doctype, **values, **child_filters(name, table)})
+    row.idx = cint(last_idx) + 1
+    row.owner = row.modified_by = frappe.session.user
+    row.creation = row.modified = now()
+    return row
+
+
+def get_product_quantity(name):
+    return flt(
+        frappe.db.sql(
+            """select sum(quantity) from `tabWork Order Estimation Item`
+            where parent = %s and parenttype = %s and parentfield = 'estimation_items'
+            and ifnull(parent_component, '') = ''""",
+            (name, DOCTYPE),
+        )[0][0]
+    )
+
+
+def apply_total_deltas(parent, paper_cost=0, addon_cost=0):
+    """Add cost deltas to the locked estimation and refresh the totals derived from them
+
+    The sums are incremented in SQL and `modified` is bumped so forms opened
+    before the append see the change; derived totals follow the same rules as
+    a full recalculation.
+    """
+    totals = frappe._dict(parent)
+    totals.total_paper_cost = flt(totals.total_paper_cost) + paper_cost
+    totals.total_addon_cost = flt(totals.total_addon_cost) + addon_cost
+    apply_final_totals(totals, get_product_quantity(parent.name))
+    totals.previous_modified, totals.modified = parent.modified, now()
+
+    frappe.db.sql(
+        """update `tabWork Order Estimation`
+        set total_paper_cost = ifnull(total_paper_cost, 0) + %(paper_cost)s,
+            total_addon_cost = ifnull(total_addon_cost, 0) + %(addon_cost)s,
+            total_cost = %(total_cost)s, cost_per_unit = %(cost_per_unit)s,
+            margin_amount = %(margin_amount)s, sales_price = %(sales_price)s,
+            modified = %(modified)s, modified_by = %(user)s
+        where name = %(name)s""",
+        {
+            **totals,
+            "paper_cost": paper_cost,
+            "addon_cost": addon_cost,
+            "user": frappe.session.user,
+        },
+    )
+    return totals
+
+
+def publish_append_delta(totals, rows):
+    """Realtime delta for the appended and updated rows, in the shape of a save's delta"""
+    delta = {
+        "name": totals.name,
+        "modified": totals.modified,
+        "previous_modified": totals.previous_modified,
+        "rows": rows,
+        "removed": {},
+        # Only the totals change on an append
+        "values": {fieldname: totals.get(fieldname) for fieldname in TOTAL_FIELDS},
+    }
+    frappe.publish_realtime(DELTA_EVENT, delta, doctype=DOCTYPE, docname=totals.name, after_commit=True)
+    return delta
+
+
+def append_with_save(name, table, values):
+    """Fallback for appends that change other rows' costs: full recalculation, still under the lock"""
+    doc = frappe.get_doc(DOCTYPE, name)
+    row = doc.append(table, values)
+    doc.save()
+    return row, doc.flags.estimation_delta
+
+
+def get_item_values(item_data):
+    return {
+        "item": item_data.get("item"),
+        "paper_type": item_data.get("paper_type"),
+        "quantity": item_data.get("quantity"),
+        "gsm": item_data.get("gsm"),
+        "length_cm": item_data.get("length_cm"),
+        "width_cm": item_data.get("width_cm"),
+        "rate_per_kg": item_data.get("rate_per_kg"),
+        "rate_currency": item_data.get("rate_currency"),
+        "finish": item_data.get("finish"),
+        "waste_percentage": item_data.get("waste_percentage", 5),
+        "consumption_mode": item_data.get("consumption_mode"),
+        "component_code": item_data.get("component_code"),
+        "parent_component": item_data.get("parent_component"),
+        "quantity_multiplier": item_data.get("quantity_multiplier"),
+    }
+
+
+def append_item(name, item_data):
+    """Insert one estimation item directly and add its paper cost to the parent
+
+    The new row is costed on its own: with the estimation's waste-model
+    processes and reel sizes, but without loading the other items. Rows that
+    belong to a component tree, or that existing addons are consumed by,
+    change other rows' costs and go through a full save instead.
+    """
+    parent = lock_estimation(name)
+    values = {key: value for key, value in get_item_values(item_data).items() if value is not None}
+
+    if (
+        parent.is_archived
+        or values.get("component_code")
+        or values.get("parent_component")
+        or frappe.db.exists(ADDON_DOCTYPE, {**child_filters(name, "estimation_item_addons"), "item": values.get("item")})
+    ):
+        return append_with_save(name, "estimation_items", values)
+
+    row = new_child_row(ITEM_DOCTYPE, name, "estimation_items", values)
+    processes = frappe.get_all(
+        PROCESS_DOCTYPE,
+        filters=child_filters(name, "estimation_processes"),
+        fields=["name", "idx", "applies_to_item", "make_ready_sheets", "run_spoilage_percentage"],
+    )
+    context = frappe._dict(estimation_items=[row], estimation_processes=processes)
+
+    apply_exchange_rates(parent, [row])
+    row.calculate_paper_metrics()
+    calculate_process_waste(context)
+    calculate_reel_consumption(context)
+    row.calculate_costs()
+    row.addon_cost = 0
+    row.subtree_cost = flt(row.total_paper_cost)
+    row.db_insert()
+
+    totals = apply_total_deltas(parent, paper_cost=flt(row.total_paper_cost))
+    return row, publish_append_delta(totals, {"estimation_items": [get_row_values(row)]})
+
+
+def get_addon_values(addon_data):
+    return {
+        "item": addon_data.get("item"),
+        "item_name": frappe.db.get_value("Item", addon_data.get("item"), "item_name") or addon_data.get("item"),
+        "addon_type": addon_data.get("addon_type"),
+        "wrapper_item": addon_data.get("wrapper_item"),
+        "color_item": addon_data.get("color_item"),
+        "handle_item": addon_data.get("handle_item"),
+        "addon_item": addon_data.get("addon_item"),
+        "consumption_basis": addon_data.get("consumption_basis") or PER_PIECE,
+        "consumption_qty": addon_data.get("consumption_qty", 1),
+        "manual_rate": 1 if addon_data.get("rate") else 0,
+        "rate": addon_data.get("rate"),
+        "rate_currency": addon_data.get("rate_currency") if addon_data.get("rate") else None,
+    }
+
+
+def append_addon(name, addon_data):
+    """Insert one addon directly, adding its amount to the items it is consumed by and the parent
+
+    Items inside a component tree also carry the addon in their ancestors'
+    subtree totals, so those appends go through a full save instead.
+    """
+    parent = lock_estimation(name)
+    if not frappe.db.exists(ITEM_DOCTYPE, child_filters(name, "estimation_items")):
+        frappe.throw(_("Please add estimation items first before creating addons"))
+
+    values = get_addon_values(addon_data)
+    item_rows = frappe.get_all(
+        ITEM_DOCTYPE,
+        filters={**child_filters(name, "estimation_items"), "item": values["item"]},
+        fields=["name", "idx", "quantity", "total_weight_kg", "parent_component", "addon_cost", "subtree_cost"],
+        order_by="idx asc",
+    )
+    if parent.is_archived or any(row.parent_component for row in item_rows):
+        return append_with_save(name, "estimation_item_addons", values)
+
+    addon = new_child_row(ADDON_DOCTYPE, name, "estimation_item_addons", values)
+    if not addon.manual_rate:
+        addon.rate = get_item_rates([get_consumed_item(addon)], posting_date=parent.creation).get(
+            get_consumed_item(addon), 0
+        )
+    apply_exchange_rates(parent, [addon])
+    addon.consumed_qty = get_consumption(addon.consumption_basis, addon.consumption_qty, item_rows)
+    addon.amount = get_addon_amount(addon)
+    addon.db_insert()
+
+    updated_items = []
+    for row, share in split_addon_amount(addon, item_rows):
+        frappe.db.sql(
+            """update `tabWork Order Estimation Item`
+            set addon_cost = ifnull(addon_cost, 0) + %(share)s, subtree_cost = ifnull(subtree_cost, 0) + %(share)s
+            where name = %(name)s""",
+            {"share": share, "name": row.name},
+        )
+        updated_items.append(
+            {"name": row.name, "idx": row.idx, "addon_cost": flt(row.addon_cost) + share, "subtree_cost": flt(row.subtree_cost) + share}
+        )
+
+    totals = apply_total_deltas(parent, addon_cost=addon.amount)
+    rows = {"estimation_item_addons": [get_row_values(addon)]}
+    if updated_items:
+        rows["estimation_items"] = updated_items
+    return addon, publish_append_delta(totals, rows)
+
+
+@frappe.whitelist()
+def append_estimation_item(estimation, item_data):
+    """Add an item to an estimation without saving the whole document"""
+    if isinstance(item_data, str):
+        item_data = json.loads(item_data)
+    row, delta = append_item(estimation, item_data)
+    return {"status": "success", "message": _("Item added successfully"), "item_name": row.name, "delta": delta}
+
+
+@frappe.whitelist()
+def append_estimation_addon(estimation, addon_data):
+    """Add an addon to an estimation without saving the whole document"""
+    if isinstance(addon_data, str):
+        addon_data = json.loads(addon_data)
+    row, delta = append_addon(estimation, addon_data)
+    return {"status": "success", "message": _("Addon added successfully"), "addon_name": row.name, "delta": delta}
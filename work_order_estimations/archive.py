@@ -0,0 +1,162 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import base64
+import json
+import zlib
+
+import frappe
+from frappe.utils import add_days, cint, flt, now, nowdate
+
+from work_order_estimations.realtime import CHILD_TABLES
+
+DOCTYPE = "Work Order Estimation"
+ARCHIVE_DOCTYPE = "Work Order Estimation Archive"
+
+# Statuses after which an estimation is no longer worked on
+TERMINAL_STATUSES = ("Sent", "Quotation Created", "Cancelled")
+
+# Overridable from site_config.json
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 200
+
+
+def compress(data):
+    return base64.b64encode(zlib.compress(frappe.as_json(data, indent=None).encode())).decode()
+
+
+def decompress(value):
+    return json.loads(zlib.decompress(base64.b64decode(value)))
+
+
+def get_child_doctypes():
+    meta = frappe.get_meta(DOCTYPE)
+    return {table: meta.get_field(table).options for table in CHILD_TABLES}
+
+
+def get_archivable(cutoff, limit):
+    return frappe.get_all(
+        DOCTYPE,
+        filters={
+            "status": ["in", TERMINAL_STATUSES],
+            "modified": ["<", cutoff],
+            "is_archived": 0,
+            "is_template": 0,
+        },
+        pluck="name",
+        order_by="modified asc",
+        limit=limit,
+    )
+
+
+def archive_estimations(names):
+    """Move the child rows of `names` into compressed archive records
+
+    The parent row stays as a stub so links, search and list views keep
+    working. Rows are read with one query per child table, archive records
+    written with one bulk insert and child rows deleted with one statement
+    per table.
+    """
+    if not names:
+        return []
+
+    snapshots = {name: {table: [] for table in CHILD_TABLES} for name in names}
+    for table, child_doctype in get_child_doctypes().items():
+        for row in frappe.get_all(
+            child_doctype,
+            filters={"parenttype": DOCTYPE, "parentfield": table, "parent": ["in", names]},
+            fields=["*"],
+            order_by="idx asc",
+        ):
+            snapshots[row.parent][table].append(row)
+
+    timestamp, user = now(), frappe.session.user
+    columns = [
+        "name", "owner", "creation", "modified", "modified_by", "docstatus", "idx",
+        "estimation", "archived_on", "product_quantity", "item_count", "total_weight_kg", "snapshot",
+    ]
+    values = []
+    for name, snapshot in snapshots.items():
+        items = snapshot["estimation_items"]
+        values.append([
+            name, user, timestamp, timestamp, user, 0, 0,
+            name,
+            timestamp,
+            sum(cint(row.quantity) for row in items if not row.parent_component),
+            len(items),
+            sum(flt(row.total_weight_kg) for row in items),
+            compress(snapshot),
+        ])
+    frappe.db.bulk_insert(ARCHIVE_DOCTYPE, columns, values)
+
+    for table, child_doctype in get_child_doctypes().items():
+        frappe.db.delete(child_doctype, {"parenttype": DOCTYPE, "parentfield": table, "parent": ["in", names]})
+
+    # Archiving is housekeeping: keep `modified` so it is not mistaken for an edit
+    frappe.db.set_value(DOCTYPE, {"name": ["in", names]}, "is_archived", 1, update_modified=False)
+    return names
+
+
+def archive_old_estimations():
+    """Scheduled job: archive closed estimations untouched for the configured number of days"""
+    days = cint(frappe.conf.get("estimation_archive_after_days")) or DEFAULT_ARCHIVE_AFTER_DAYS
+    cutoff = add_days(nowdate(), -days)
+    batch_size = cint(frappe.conf.get("estimation_archive_batch_size")) or ARCHIVE_BATCH_SIZE
+
+    while names := get_archivable(cutoff, batch_size):
+        archive_estimations(names)
+        frappe.db.commit()
+
+
+def load_archived_rows(doc):
+    """Fill an archived estimation's child tables from its snapshot, in memory"""
+    snapshot = frappe.db.get_value(ARCHIVE_DOCTYPE, {"estimation": doc.name}, "snapshot")
+    if not snapshot:
+        return
+    for table, rows in decompress(snapshot).items():
+        doc.set(table, rows)
+
+
+def restore_archived_rows(doc):
+    """Write an archived estimation's rows back to the live tables before it is saved"""
+    for table, child_doctype in get_child_doctypes().items():
+        # Rows added since opening are inserted by the regular save
+        rows = [row for row in doc.get(table) or [] if not row.is_new()]
+        if not rows:
+            continue
+        columns = [column for column in frappe.get_meta(child_doctype).get_valid_columns() if column != "doctype"]
+        # Values decompressed from JSON are strings or None; cast them as db_insert would
+        values = [row.get_valid_dict(convert_dates_to_str=True) for row in rows]
+        frappe.db.bulk_insert(child_doctype, columns, [[valid.get(column) for column in columns] for valid in values])
+
+    frappe.db.delete(ARCHIVE_DOCTYPE, {"estimation": doc.name})
+    doc.is_archived = 0
+
+
+def get_archived_snapshots(names):
+    """{estimation: {table: [row dicts]}} of archived estimations, read with one query"""
+    if not names:
+        return {}
+    return {
+        archive.estimation: decompress(archive.snapshot)
+        for archive in frappe.get_all(
+            ARCHIVE_DOCTYPE,
+            filters={"estimation": ["in", names]},
+            fields=["estimation", "snapshot"],
+            order_by="estimation asc",
+        )
+    }
+
+
+def get_archived_quantities(names):
+    """Product quantity of archived estimations from the precomputed rollup"""
+    if not names:
+        return {}
+    return dict(
+        frappe.get_all(
+            ARCHIVE_DOCTYPE,
+            filters={"estimation": ["in", names]},
+            fields=["estimation", "product_quantity"],
+            as_list=True,
+        )
+    )
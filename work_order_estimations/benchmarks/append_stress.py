@@ -0,0 +1,157 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+"""
+Concurrent append stress test
+
+Starts many worker processes, each with its own database connection, that add
+items and addons to the same estimation at the same time. Afterwards the row
+count and the stored parent totals are checked against a full recalculation,
+so any lost row or lost total update shows up as a failure.
+
+Usage:
+    bench --site <site> execute work_order_estimations.benchmarks.append_stress.run
+    bench --site <site> execute work_order_estimations.benchmarks.append_stress.run \\
+        --kwargs "{'workers': 32, 'appends': 50}"
+
+The estimation is deleted at the end unless `keep_data` is set.
+"""
+
+import multiprocessing
+import random
+import time
+
+import frappe
+from frappe.utils import flt
+
+from work_order_estimations.benchmarks.estimation_lifecycle import PREFIX, ensure_master_data
+
+TOTAL_FIELDS = ("total_paper_cost", "total_addon_cost", "total_cost", "cost_per_unit", "margin_amount")
+
+
+def worker(site, sites_path, estimation, masters, appends, seed):
+    """Append items and addons in a fresh connection, committing after each append"""
+    from work_order_estimations.appends import append_addon, append_item
+
+    frappe.init(site=site, sites_path=sites_path)
+    frappe.connect()
+    frappe.set_user("Administrator")
+    frappe.flags.mute_messages = True
+    rng = random.Random(seed)
+    errors = []
+
+    try:
+        for i in range(appends):
+            try:
+                if i % 5 == 4:
+                    append_addon(estimation, {
+                        "item": rng.choice(masters["bag_items"][:3]),
+                        "addon_type": "Handle",
+                        "handle_item": rng.choice(masters["addons"]),
+                        "consumption_basis": "Per Piece",
+                        "consumption_qty": 1,
+                    })
+                else:
+                    append_item(estimation, {
+                        "item": rng.choice(masters["bag_items"][3:]),
+                        "paper_type": rng.choice(masters["papers"]),
+                        "quantity": rng.randint(100, 5000),
+                        "gsm": 120,
+                        "length_cm": rng.randint(10, 60),
+                        "width_cm": rng.randint(10, 60),
+                        "rate_per_kg": 2,
+                    })
+                frappe.db.commit()
+            except Exception as e:
+                frappe.db.rollback()
+                errors.append(f"{type(e).__name__}: {str(e)[:200]}")
+    finally:
+        frappe.destroy()
+
+    return errors
+
+
+def create_estimation(masters):
+    """Committed estimation with a few items the addons are consumed by"""
+    doc = frappe.get_doc({
+        "doctype": "Work Order Estimation",
+        "project_name": f"{PREFIX} Append Stress",
+        "client_name": masters.customers[0],
+        "profit_margin": 20,
+        "estimation_items": [
+            {
+                "item": item,
+                "paper_type": masters.papers[0],
+                "quantity": 1000,
+                "gsm": 120,
+                "length_cm": 30,
+                "width_cm": 20,
+                "rate_per_kg": 2,
+            }
+            for item in masters.bag_items[:3]
+        ],
+    }).insert(ignore_permissions=True)
+    frappe.db.commit()
+    return doc.name
+
+
+def run(workers=16, appends=25, keep_data=False):
+    """Append rows from `workers` processes in parallel and verify nothing was lost"""
+    masters = ensure_master_data()
+    frappe.db.commit()
+    estimation = create_estimation(masters)
+    initial_rows = 3
+
+    context = multiprocessing.get_context("spawn")
+    start = time.perf_counter()
+    with context.Pool(workers) as pool:
+        results = pool.starmap(
+            worker,
+            [
+                (frappe.local.site, frappe.local.sites_path, estimation, dict(masters), appends, seed)
+                for seed in range(workers)
+            ],
+        )
+    elapsed = time.perf_counter() - start
+
+    errors = [error for result in results for error in result]
+    expected_items = initial_rows + workers * sum(1 for i in range(appends) if i % 5 != 4)
+    expected_addons = workers * sum(1 for i in range(appends) if i % 5 == 4)
+
+    doc = frappe.get_doc("Work Order Estimation", estimation)
+    stored = {field: flt(doc.get(field), 4) for field in TOTAL_FIELDS}
+    doc.calculate_all()
+    recalculated = {field: flt(doc.get(field), 4) for field in TOTAL_FIELDS}
+
+    report = {
+        "estimation": estimation,
+        "workers": workers,
+        "appends_per_worker": appends,
+        "seconds": round(elapsed, 2),
+        "appends_per_second": round(workers * appends / elapsed, 1) if elapsed else None,
+        "errors": errors,
+        "items": [len(doc.estimation_items), expected_items],
+        "addons": [len(doc.estimation_item_addons), expected_addons],
+        "stored_totals": stored,
+        "recalculated_totals": recalculated,
+    }
+    report["passed"] = (
+        not errors
+        and len(doc.estimation_items) == expected_items
+        and len(doc.estimation_item_addons) == expected_addons
+        and all(abs(stored[field] - recalculated[field]) < 0.01 for field in TOTAL_FIELDS)
+    )
+
+    print("{} appends from {} workers in {:.2f}s ({} appends/s)".format(
+        workers * appends, workers, elapsed, report["appends_per_second"]
+    ))
+    print("items {}/{}  addons {}/{}  errors {}".format(*report["items"], *report["addons"], len(errors)))
+    for field in TOTAL_FIELDS:
+        print(f"    {field:<20} stored {stored[field]:>14.4f}  recalculated {recalculated[field]:>14.4f}")
+    print("PASSED" if report["passed"] else "FAILED")
+
+    if not keep_data:
+        frappe.delete_doc("Work Order Estimation", estimation, force=True, ignore_permissions=True)
+        frappe.db.commit()
+
+    return report
@@ -0,0 +1,324 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+"""
+Work Order Estimation lifecycle benchmark
+
+Generates synthetic customers, paper items, workstations and estimations and
+times the main lifecycle steps, recording wall time, query count and peak
+Python memory for each. Peak memory is taken in a second pass over a fresh
+estimation of the same size, so tracing does not inflate the timings.
+Results are written to a JSON file so runs on different commits can be
+compared.
+
+Usage:
+    bench --site <site> execute work_order_estimations.benchmarks.estimation_lifecycle.run
+    bench --site <site> execute work_order_estimations.benchmarks.estimation_lifecycle.run \\
+        --kwargs "{'sizes': [[100, 10], [2000, 50]], 'output': '/tmp/woe.json'}"
+    bench --site <site> execute work_order_estimations.benchmarks.estimation_lifecycle.compare \\
+        --kwargs "{'baseline': '/tmp/before.json', 'current': '/tmp/after.json'}"
+
+All generated data is rolled back at the end unless `keep_data` is set.
+"""
+
+import json
+import os
+import random
+import subprocess
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import frappe
+from frappe.utils import add_days, now, today
+
+PREFIX = "WOE-BENCH"
+
+# (item rows, process rows)
+DEFAULT_SIZES = ((10, 0), (100, 5), (500, 10), (1000, 25), (2000, 50))
+
+GSM_OPTIONS = (80, 100, 120, 150, 200, 250, 300, 350)
+FINISH_OPTIONS = ("Matte", "Glossy", "Satin", "Uncoated")
+
+
+class Measurement:
+    def __init__(self):
+        self.queries = 0
+        self.elapsed_ms = 0
+        self.peak_kb = 0
+        self.error = None
+
+
+@contextmanager
+def measure(results, step, trace_memory=False):
+    """Record wall time and SQL query count of the wrapped block, or only its peak allocated memory
+
+    Memory tracing slows allocation-heavy code down considerably, so it runs
+    in its own pass with `trace_memory` set and leaves the timings alone.
+    """
+    measurement = Measurement()
+    original_sql = frappe.db.sql
+
+    def counting_sql(*args, **kwargs):
+        measurement.queries += 1
+        return original_sql(*args, **kwargs)
+
+    if trace_memory:
+        tracemalloc.start()
+    else:
+        frappe.db.sql = counting_sql
+    start = time.perf_counter()
+    try:
+        yield measurement
+    except Exception as e:
+        measurement.error = f"{type(e).__name__}: {str(e)[:200]}"
+        frappe.clear_messages()
+    finally:
+        measurement.elapsed_ms = (time.perf_counter() - start) * 1000
+        if trace_memory:
+            measurement.peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+        frappe.db.sql = original_sql
+
+    values = results.setdefault(step, {})
+    if trace_memory:
+        values["peak_memory_kb"] = round(measurement.peak_kb, 1)
+    else:
+        values.update({"ms": round(measurement.elapsed_ms, 2), "queries": measurement.queries})
+    if measurement.error:
+        values.setdefault("error", measurement.error)
+
+
+def ensure_master_data(customers=5, papers=20, workstations=10):
+    """Create (or reuse) the synthetic masters shared by every benchmark estimation"""
+    # Not "items": that would shadow dict.items on the _dict
+    data = frappe._dict(customers=[], papers=[], bag_items=[], addons=[], workstations=[], operations=[])
+
+    for i in range(customers):
+        name = f"{PREFIX} Customer {i}"
+        if not frappe.db.exists("Customer", name):
+            frappe.get_doc({
+                "doctype": "Customer",
+                "customer_name": name,
+                "customer_group": frappe.db.get_value("Customer Group", {"is_group": 0}) or "All Customer Groups",
+                "territory": frappe.db.get_value("Territory", {"is_group": 0}) or "All Territories",
+            }).insert(ignore_permissions=True)
+        data.customers.append(name)
+
+    item_group = frappe.db.get_value("Item Group", {"is_group": 0}) or "All Item Groups"
+
+    def ensure_item(item_code, uom, rate):
+        if not frappe.db.exists("Item", item_code):
+            frappe.get_doc({
+                "doctype": "Item",
+                "item_code": item_code,
+                "item_name": item_code,
+                "item_group": item_group,
+                "stock_uom": uom,
+                "is_stock_item": 0,
+                "valuation_rate": rate,
+            }).insert(ignore_permissions=True)
+        return item_code
+
+    for i in range(papers):
+        data.papers.append(ensure_item(f"{PREFIX}-PAPER-{i}", "Kg", 1.5 + i * 0.1))
+    for i in range(papers):
+        data.bag_items.append(ensure_item(f"{PREFIX}-BAG-{i}", "Nos", 0))
+    for i in range(5):
+        data.addons.append(ensure_item(f"{PREFIX}-HANDLE-{i}", "Nos", 0.05))
+
+    for i in range(workstations):
+        name = f"{PREFIX} Press {i}"
+        if not frappe.db.exists("Workstation", name):
+            frappe.get_doc({
+                "doctype": "Workstation",
+                "workstation_name": name,
+                "hour_rate": 20 + i,
+            }).insert(ignore_permissions=True)
+        data.workstations.append(name)
+
+    for name in ("Printing", "Cutting", "Folding", "Gluing", "Lamination"):
+        operation = f"{PREFIX} {name}"
+        if not frappe.db.exists("Operation", operation):
+            frappe.get_doc({"doctype": "Operation", "name": operation}).insert(ignore_permissions=True)
+        data.operations.append(operation)
+
+    return data
+
+
+def build_estimation(masters, item_count, process_count, rng):
+    """Build an unsaved estimation with the requested number of item and process rows"""
+    doc = frappe.new_doc("Work Order Estimation")
+    doc.client_name = rng.choice(masters.customers)
+    doc.project_name = f"{PREFIX} {item_count} items / {process_count} processes"
+    doc.delivery_date = add_days(today(), 30)
+
+    for i in range(item_count):
+        doc.append("estimation_items", {
+            "item": masters.bag_items[i % len(masters.bag_items)],
+            "paper_type": rng.choice(masters.papers),
+            "quantity": rng.randint(100, 50000),
+            "gsm": rng.choice(GSM_OPTIONS),
+            "length_cm": rng.uniform(10, 100),
+            "width_cm": rng.uniform(10, 70),
+            "rate_per_kg": rng.uniform(1, 5),
+            "finish": rng.choice(FINISH_OPTIONS),
+            "waste_percentage": 5,
+        })
+
+    for i in range(process_count):
+        doc.append("estimation_processes", {
+            "process_type": masters.operations[i % len(masters.operations)],
+            "workstation": rng.choice(masters.workstations),
+            "rate": rng.uniform(0.01, 0.5),
+            "qty": rng.randint(100, 50000),
+        })
+
+    for item in doc.estimation_items:
+        item.calculate_paper_metrics()
+        item.calculate_costs()
+    for process in doc.estimation_processes:
+        process.total_cost = process.rate * process.qty
+
+    return doc
+
+
+def benchmark_size(masters, item_count, process_count, addon_count, rng, steps=None, trace_memory=False):
+    """Run every lifecycle step against one new estimation of the given size"""
+    from work_order_estimations.api import get_document_flow_summary
+    from work_order_estimations.estimation_status import transition_single
+    from work_order_estimations.work_order_estimations.report.work_order_estimation_summary.work_order_estimation_summary import (
+        execute as summary_report,
+    )
+
+    steps = {} if steps is None else steps
+    doc = build_estimation(masters, item_count, process_count, rng)
+
+    def step(name):
+        return measure(steps, name, trace_memory)
+
+    with step("insert"):
+        doc.insert(ignore_permissions=True)
+
+    with step("validate"):
+        doc.run_method("validate")
+
+    with step("save"):
+        doc.save(ignore_permissions=True)
+
+    with step("create_addons"):
+        items = [row.item for row in doc.estimation_items[:addon_count]]
+        for item in items:
+            doc.create_estimation_item_addons({
+                "item": item,
+                "addon_type": "Handle",
+                "handle_item": rng.choice(masters.addons),
+            })
+
+    with step("load"):
+        doc = frappe.get_doc("Work Order Estimation", doc.name)
+
+    with step("create_quotation"):
+        transition_single(doc.name, "Estimation Done")
+        doc.reload()
+        doc.create_quotation()
+
+    with step("summary_report"):
+        summary_report({"client_name": doc.client_name})
+
+    with step("document_flow_summary"):
+        get_document_flow_summary("Work Order Estimation", doc.name)
+
+    return {
+        "items": item_count,
+        "processes": process_count,
+        "addons": min(addon_count, item_count),
+        "steps": steps,
+    }
+
+
+def get_git_revision():
+    app_path = frappe.get_app_path("work_order_estimations")
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=app_path, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def run(sizes=None, addons=20, seed=42, output=None, keep_data=False):
+    """Benchmark the estimation lifecycle for each (items, processes) size and write a JSON report"""
+    rng = random.Random(seed)
+    frappe.flags.mute_messages = True
+
+    report = {
+        "timestamp": now(),
+        "site": frappe.local.site,
+        "revision": get_git_revision(),
+        "db_version": frappe.db.sql("select version()")[0][0],
+        "seed": seed,
+        "results": [],
+    }
+
+    try:
+        masters = ensure_master_data()
+        for item_count, process_count in sizes or DEFAULT_SIZES:
+            size_seed = rng.random()
+            result = benchmark_size(masters, int(item_count), int(process_count), addons, random.Random(size_seed))
+            # Same estimation again, only for peak memory
+            benchmark_size(
+                masters, int(item_count), int(process_count), addons, random.Random(size_seed),
+                steps=result["steps"], trace_memory=True,
+            )
+            report["results"].append(result)
+    finally:
+        frappe.flags.mute_messages = False
+        if not keep_data:
+            frappe.db.rollback()
+
+    if not output:
+        output = frappe.get_site_path(
+            "benchmarks", "estimation-lifecycle-{}.json".format(report["revision"] or report["timestamp"].replace(" ", "_"))
+        )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=1, default=str)
+
+    for result in report["results"]:
+        print("{items:>5} items {processes:>3} processes".format(**result))
+        for step, values in result["steps"].items():
+            print("    {:<24} {:>10.2f} ms {:>7} queries {:>10.1f} KB {}".format(
+                step, values.get("ms", 0), values.get("queries", 0), values.get("peak_memory_kb", 0), values.get("error", "")
+            ))
+    print(f"Results written to {output}")
+
+    return output
+
+
+def compare(baseline, current, threshold=10):
+    """Print per-step time and query deltas between two benchmark JSON files"""
+    with open(baseline) as f:
+        before = {(r["items"], r["processes"]): r["steps"] for r in json.load(f)["results"]}
+    with open(current) as f:
+        after = {(r["items"], r["processes"]): r["steps"] for r in json.load(f)["results"]}
+
+    regressions = []
+    for size, steps in after.items():
+        if size not in before:
+            continue
+        print("{} items {} processes".format(*size))
+        for step, values in steps.items():
+            old = before[size].get(step)
+            if not old:
+                continue
+            change = (values["ms"] - old["ms"]) / old["ms"] * 100 if old["ms"] else 0
+            flag = ""
+            if change > threshold or values["queries"] > old["queries"]:
+                flag = "REGRESSION"
+                regressions.append({"size": size, "step": step, "change_pct": round(change, 1)})
+            print("    {:<24} {:>10.2f} -> {:>10.2f} ms ({:+.1f}%)  queries {} -> {} {}".format(
+                step, old["ms"], values["ms"], change, old["queries"], values["queries"], flag
+            ))
+
+    return regressions
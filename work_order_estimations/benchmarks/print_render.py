@@ -0,0 +1,96 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+"""
+Print format render benchmark
+
+Usage:
+    bench --site <site> execute work_order_estimations.benchmarks.print_render.run
+    bench --site <site> execute work_order_estimations.benchmarks.print_render.run --kwargs "{'row_counts': [50, 500, 2000]}"
+"""
+
+import time
+
+import frappe
+
+from work_order_estimations.print_utils import get_estimation_print_context
+
+DEFAULT_ROW_COUNTS = (10, 50, 100, 250, 500, 1000)
+
+
+def build_estimation(row_count):
+    """Build an unsaved estimation with `row_count` items, half as many addons and a process per ten items"""
+    doc = frappe.new_doc("Work Order Estimation")
+    doc.name = f"BENCH-{row_count}"
+    doc.client_name = "Benchmark Customer"
+    doc.project_name = f"Print benchmark ({row_count} rows)"
+    doc.delivery_date = frappe.utils.today()
+    doc.status = "Draft"
+
+    for i in range(row_count):
+        row = doc.append("estimation_items", {
+            "item": f"BENCH-ITEM-{i}",
+            "paper_type": "BENCH-PAPER",
+            "quantity": 1000 + i,
+            "gsm": 120,
+            "length_cm": 30.0,
+            "width_cm": 20.0,
+            "rate_per_kg": 2.5,
+            "finish": "Matte",
+            "waste_percentage": 5,
+        })
+        row.calculate_paper_metrics()
+        row.calculate_costs()
+
+    for i in range(row_count // 2):
+        doc.append("estimation_item_addons", {
+            "item": f"BENCH-ITEM-{i}",
+            "item_name": f"Benchmark Item {i}",
+            "addon_type": "Handle",
+            "handle_item": "BENCH-HANDLE",
+        })
+
+    for i in range(max(row_count // 10, 1)):
+        doc.append("estimation_processes", {
+            "process_type": "Printing",
+            "workstation": "BENCH-PRESS",
+            "rate": 0.05,
+            "qty": 1000,
+            "total_cost": 50,
+        })
+
+    doc.calculate_totals_from_items()
+    doc.calculate_operations_cost()
+    doc.calculate_final_totals()
+    return doc
+
+
+def run(row_counts=None, repeat=3):
+    """Time context building and full HTML rendering of the standard print format per row count"""
+    template = frappe.db.get_value("Print Format", "Work Order Estimation", "html")
+    results = []
+
+    for row_count in row_counts or DEFAULT_ROW_COUNTS:
+        doc = build_estimation(row_count)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            get_estimation_print_context(doc)
+        context_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            html = frappe.render_template(template, {"doc": doc})
+        render_ms = (time.perf_counter() - start) * 1000 / repeat
+
+        results.append({
+            "rows": row_count,
+            "context_ms": round(context_ms, 2),
+            "render_ms": round(render_ms, 2),
+            "html_kb": round(len(html) / 1024, 1),
+        })
+
+    for result in results:
+        print("{rows:>6} rows  context {context_ms:>9.2f} ms  render {render_ms:>9.2f} ms  {html_kb:>8.1f} KB".format(**result))
+
+    return results
@@ -0,0 +1,13 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+
+
+def redis_key(key):
+    """Site-prefixed key for raw Redis commands, which the cache wrapper would otherwise prefix"""
+    return frappe.cache.make_key(key)
+
+
+def decode(value):
+    return value.decode() if isinstance(value, bytes) else value
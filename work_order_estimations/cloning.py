@@ -0,0 +1,148 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import cint, now, today
+
+from work_order_estimations.costing.addons import get_item_rates
+from work_order_estimations.costing.currency import get_default_currency
+from work_order_estimations.idempotency import idempotent
+
+DOCTYPE = "Work Order Estimation"
+
+CHILD_TABLES = ("estimation_items", "estimation_item_addons", "estimation_processes")
+
+# Parent fields that belong to the source document, not its copy
+RESET_FIELDS = {
+    "status": "Draft",
+    "quotation_reference": None,
+    "sales_order_reference": None,
+    "work_order_reference": None,
+    "is_template": 0,
+    "template_name": None,
+    "is_archived": 0,
+}
+
+
+def copy_estimation(source, client_name=None, as_template=False, template_name=None):
+    """In-memory copy of an estimation with fresh row names and reset references
+
+    The exchange rate date stays with the copy, so its rows' exchange rates
+    still match it; repricing moves both to today.
+    """
+    new = frappe.copy_doc(source)
+    new.update(RESET_FIELDS)
+    if client_name:
+        new.client_name = client_name
+    if as_template:
+        new.is_template = 1
+        new.template_name = template_name or source.project_name
+    return new
+
+
+def reprice(doc):
+    """Refresh paper rates from current prices and recalculate everything in memory
+
+    Paper rates for all items come from one grouped Item Price / valuation
+    lookup; addon and workstation rates are refreshed by the regular
+    calculations, which are already batched.
+    """
+    rates = get_item_rates([row.paper_type for row in doc.estimation_items])
+    default_currency = get_default_currency()
+    for row in doc.estimation_items:
+        if rates.get(row.paper_type):
+            row.rate_per_kg = rates[row.paper_type]
+            row.rate_currency = default_currency
+
+    # Margin drives the sales price again rather than the source's fixed price,
+    # and every row takes today's exchange rate
+    doc.sales_price = None
+    doc.exchange_rate_date = today()
+    doc.calculate_all()
+
+
+def bulk_insert_estimation(doc):
+    """Insert the parent with one statement and each child table with one multi-row insert
+
+    Skips per-row link validation and controller hooks: the rows come from an
+    already validated estimation.
+    """
+    timestamp = now()
+    user = frappe.session.user
+
+    doc.set_new_name()
+    doc.owner = doc.modified_by = user
+    doc.creation = doc.modified = timestamp
+    doc.docstatus = 0
+    doc.db_insert()
+
+    for table in CHILD_TABLES:
+        rows = doc.get(table) or []
+        if not rows:
+            continue
+
+        child_doctype = rows[0].doctype
+        columns = [column for column in frappe.get_meta(child_doctype).get_valid_columns() if column != "doctype"]
+        values = []
+        for idx, row in enumerate(rows, start=1):
+            row.name = row.name or frappe.generate_hash(length=10)
+            row.parent, row.parentfield, row.parenttype = doc.name, table, doc.doctype
+            row.owner = row.modified_by = user
+            row.creation = row.modified = timestamp
+            row.docstatus = 0
+            row.idx = idx
+            # Same type sanitizing as db_insert
+            valid = row.get_valid_dict(convert_dates_to_str=True)
+            values.append([valid.get(column) for column in columns])
+
+        frappe.db.bulk_insert(child_doctype, columns, values)
+
+    return doc
+
+
+def clone_estimation(source_name, reprice_rates=False, as_template=False, template_name=None, client_name=None):
+    """Copy an estimation (or template) with all child rows using bulk inserts"""
+    source = frappe.get_doc(DOCTYPE, source_name)
+    source.check_permission("read")
+    frappe.has_permission(DOCTYPE, "create", throw=True)
+
+    new = copy_estimation(source, client_name, as_template, template_name)
+    if reprice_rates:
+        reprice(new)
+
+    bulk_insert_estimation(new)
+    new.add_comment("Info", _("Copied from {0}").format(source.name))
+    return new
+
+
+@frappe.whitelist()
+@idempotent("duplicate_estimation")
+def duplicate_estimation(source_name, reprice=0, client_name=None):
+    """Create a new draft estimation from an estimation or template"""
+    new = clone_estimation(source_name, reprice_rates=cint(reprice), client_name=client_name)
+    return {"success": True, "name": new.name}
+
+
+@frappe.whitelist()
+@idempotent("save_as_template")
+def save_as_template(source_name, template_name):
+    """Store an estimation as a named, reusable job template for its client"""
+    if not template_name:
+        frappe.throw(_("Template Name is required"))
+    new = clone_estimation(source_name, as_template=True, template_name=template_name)
+    return {"success": True, "name": new.name}
+
+
+@frappe.whitelist()
+def get_templates(client_name=None):
+    """Job templates, optionally only those of one client"""
+    filters = {"is_template": 1}
+    if client_name:
+        filters["client_name"] = client_name
+    return frappe.get_list(
+        DOCTYPE,
+        filters=filters,
+        fields=["name", "template_name", "client_name", "project_name", "total_cost", "modified"],
+        order_by="template_name asc",
+    )
@@ -0,0 +1,132 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import flt, getdate, today
+
+# Field holding the consumed item for each addon type (Color links to the Color master, not an Item)
+ADDON_ITEM_FIELDS = {
+    "Wrapper": "wrapper_item",
+    "Handle": "handle_item",
+    "Add-on": "addon_item",
+}
+
+PER_PIECE = "Per Piece"
+PER_KG_OF_PAPER = "Per Kg of Paper"
+FIXED = "Fixed"
+
+
+def get_consumed_item(addon):
+    """Item code consumed by an addon row, if it has one"""
+    fieldname = ADDON_ITEM_FIELDS.get(addon.addon_type)
+    return addon.get(fieldname) if fieldname else None
+
+
+def get_buying_price_list():
+    return frappe.db.get_single_value("Buying Settings", "buying_price_list") or "Standard Buying"
+
+
+def get_item_rates(item_codes, price_list=None, posting_date=None):
+    """Resolve a cost rate for many items with one query
+
+    The latest valid Item Price on the buying price list wins; items without
+    one fall back to their valuation rate.
+    """
+    item_codes = list({code for code in item_codes if code})
+    if not item_codes:
+        return {}
+
+    price_list = price_list or get_buying_price_list()
+    posting_date = getdate(posting_date or today())
+
+    rows = frappe.db.sql(
+        """select item.name as item_code, item.valuation_rate,
+            price.price_list_rate, price.valid_from
+        from `tabItem` item
+        left join `tabItem Price` price
+            on price.item_code = item.name
+            and price.price_list = %(price_list)s
+            and ifnull(price.valid_from, '2000-01-01') <= %(posting_date)s
+            and ifnull(price.valid_upto, '2500-12-31') >= %(posting_date)s
+        where item.name in %(item_codes)s""",
+        {"price_list": price_list, "posting_date": posting_date, "item_codes": item_codes},
+        as_dict=True,
+    )
+
+    rates = {}
+    latest = {}
+    for row in rows:
+        if row.price_list_rate is not None:
+            valid_from = getdate(row.valid_from) if row.valid_from else getdate("2000-01-01")
+            if row.item_code not in latest or valid_from >= latest[row.item_code]:
+                latest[row.item_code] = valid_from
+                rates[row.item_code] = flt(row.price_list_rate)
+        elif row.item_code not in rates:
+            rates[row.item_code] = flt(row.valuation_rate)
+
+    return rates
+
+
+def get_consumption(basis, consumption_qty, item_rows):
+    """Quantity of addon consumed for the given estimation item rows"""
+    if basis == FIXED:
+        return flt(consumption_qty)
+    if basis == PER_KG_OF_PAPER:
+        return flt(consumption_qty) * sum(flt(row.total_weight_kg) for row in item_rows)
+    return flt(consumption_qty) * sum(flt(row.quantity) for row in item_rows)
+
+
+def get_addon_amount(addon):
+    """Amount of an addon row in the estimation currency; the rate is in the row's rate currency"""
+    return flt(addon.consumed_qty) * flt(addon.rate) * (flt(addon.exchange_rate) or 1)
+
+
+def split_addon_amount(addon, item_rows):
+    """(item row, share of the addon amount) for each item row the addon was consumed by"""
+    if addon.consumption_basis == FIXED:
+        return [(item_rows[0], flt(addon.amount))] if item_rows else []
+    rate = flt(addon.rate) * (flt(addon.exchange_rate) or 1)
+    return [
+        (row, get_consumption(addon.consumption_basis, addon.consumption_qty, [row]) * rate)
+        for row in item_rows
+    ]
+
+
+def calculate_addon_costs(doc):
+    """Cost every addon row and roll the amounts up to item rows and the parent
+
+    Rates for all addons are resolved together, so the number of queries does
+    not grow with the number of addon rows. Rows marked `manual_rate` keep the
+    rate entered on them.
+    """
+    items_by_code = {}
+    for row in doc.get("estimation_items") or []:
+        row.addon_cost = 0
+        items_by_code.setdefault(row.item, []).append(row)
+
+    addons = doc.get("estimation_item_addons") or []
+    rates = get_item_rates(
+        [get_consumed_item(addon) for addon in addons if not addon.manual_rate],
+        posting_date=doc.get("creation"),
+    )
+
+    total = 0
+    for addon in addons:
+        item_rows = items_by_code.get(addon.item) or []
+        if not addon.consumption_basis:
+            addon.consumption_basis = PER_PIECE
+        if addon.consumption_qty is None:
+            addon.consumption_qty = 1
+        if not addon.manual_rate:
+            addon.rate = rates.get(get_consumed_item(addon), 0)
+
+        addon.consumed_qty = get_consumption(addon.consumption_basis, addon.consumption_qty, item_rows)
+        addon.amount = get_addon_amount(addon)
+        total += addon.amount
+
+        # Split the amount over the item rows it was consumed by
+        for row, share in split_addon_amount(addon, item_rows):
+            row.addon_cost += share
+
+    doc.total_addon_cost = total
+    return total
@@ -0,0 +1,156 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+
+class ComponentTree:
+    """Estimation items arranged as product -> parts -> sub-parts
+
+    Rows are linked through `component_code` / `parent_component`; rows
+    without a parent are products. Subtree totals are memoized per node and
+    `invalidate` only drops a node and its ancestors, so after editing one
+    leaf the next lookup recomputes just that path.
+    """
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.by_code = {}
+        self.children = {}
+        self.memo = {}
+
+        for row in self.rows:
+            if row.component_code:
+                if row.component_code in self.by_code:
+                    frappe.throw(_("Component Code {0} is used more than once").format(row.component_code))
+                self.by_code[row.component_code] = row
+
+        for row in self.rows:
+            if row.parent_component and row.parent_component not in self.by_code:
+                frappe.throw(
+                    _("Row {0}: Parent Component {1} does not exist").format(row.idx, row.parent_component)
+                )
+            self.children.setdefault(self.parent_key(row), []).append(row)
+
+        self.check_cycles()
+
+    @staticmethod
+    def key(row):
+        return row.component_code or row.name or id(row)
+
+    def parent_key(self, row):
+        return row.parent_component or None
+
+    @property
+    def roots(self):
+        return self.children.get(None, [])
+
+    def check_cycles(self):
+        reachable = set()
+        stack = list(self.roots)
+        while stack:
+            row = stack.pop()
+            reachable.add(id(row))
+            stack.extend(self.children.get(row.component_code, []) if row.component_code else [])
+        if len(reachable) != len(self.rows):
+            frappe.throw(_("Estimation item components form a cycle"))
+
+    def walk(self):
+        """Rows in top-down order, each with its depth"""
+        stack = [(row, 0) for row in reversed(self.roots)]
+        while stack:
+            row, depth = stack.pop()
+            yield row, depth
+            if row.component_code:
+                stack.extend((child, depth + 1) for child in reversed(self.children.get(row.component_code, [])))
+
+    def ancestors(self, row):
+        while row.parent_component:
+            row = self.by_code[row.parent_component]
+            yield row
+
+    def apply_quantities(self):
+        """Parts take their quantity from their parent times their multiplier"""
+        for row, _depth in self.walk():
+            if row.parent_component:
+                parent = self.by_code[row.parent_component]
+                multiplier = flt(row.quantity_multiplier) if row.quantity_multiplier is not None else 1
+                row.quantity = round(flt(parent.quantity) * multiplier)
+
+    @staticmethod
+    def own_cost(row):
+        return flt(row.total_paper_cost) + flt(row.addon_cost)
+
+    def subtree_total(self, row):
+        """Own cost plus every descendant's, memoized per node"""
+        key = self.key(row)
+        if key in self.memo:
+            return self.memo[key]
+
+        # Post-order without recursion so deep trees do not hit the recursion limit
+        stack = [(row, False)]
+        while stack:
+            node, expanded = stack.pop()
+            node_key = self.key(node)
+            if node_key in self.memo:
+                continue
+            children = self.children.get(node.component_code, []) if node.component_code else []
+            if expanded or not children:
+                self.memo[node_key] = self.own_cost(node) + sum(self.memo[self.key(c)] for c in children)
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children if self.key(child) not in self.memo)
+
+        return self.memo[key]
+
+    def seed(self, row, total):
+        self.memo[self.key(row)] = total
+
+    def invalidate(self, row):
+        """Forget the memoized totals of a node and all of its ancestors"""
+        self.memo.pop(self.key(row), None)
+        for ancestor in self.ancestors(row):
+            self.memo.pop(self.key(ancestor), None)
+
+
+def get_component_tree(doc):
+    return ComponentTree(doc.get("estimation_items") or [])
+
+
+def calculate_subtree_costs(doc, before=None):
+    """Set `subtree_cost` on every item, recomputing only changed paths
+
+    Totals stored on unchanged rows are reused; a row whose own cost or
+    parent changed since `before` invalidates itself and its ancestors.
+    """
+    tree = get_component_tree(doc)
+    previous = {}
+    if before:
+        previous = {
+            row.name: (ComponentTree.own_cost(row), row.parent_component, row.subtree_cost, row.component_code)
+            for row in before.get("estimation_items") or []
+        }
+
+    # Rows added or removed: nothing stored can be trusted
+    if set(previous) != {row.name for row in tree.rows}:
+        previous = {}
+
+    for row in tree.rows:
+        old = previous.get(row.name)
+        if old and old[2] is not None:
+            tree.seed(row, flt(old[2]))
+
+    for row in tree.rows:
+        old = previous.get(row.name)
+        if not old or old[0] != tree.own_cost(row) or old[1] != row.parent_component or old[3] != row.component_code:
+            tree.invalidate(row)
+            # A moved row also changes the totals of its former ancestors
+            if old and old[1] in tree.by_code:
+                tree.invalidate(tree.by_code[old[1]])
+
+    for row in tree.rows:
+        row.subtree_cost = tree.subtree_total(row)
+
+    return tree
@@ -0,0 +1,105 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.utils import flt, getdate, today
+
+from work_order_estimations.costing.processes import is_hour_rate_costed
+
+EXCHANGE_RATE_CACHE_KEY = "work_order_estimation_exchange_rates"
+
+# Child tables whose rows carry a rate currency and exchange rate
+CURRENCY_TABLES = ("estimation_items", "estimation_processes", "estimation_item_addons")
+
+
+def get_default_currency():
+    """Company default currency; workstation hour rates and fetched item rates are in it"""
+    return frappe.db.get_default("currency")
+
+
+def get_exchange_rates(currencies, to_currency, date=None):
+    """Buying exchange rate into `to_currency` on `date` for many currencies, served from a shared cache
+
+    Misses are loaded with one query on Currency Exchange: the latest record
+    on or before the date wins, in either direction. Currencies without a
+    record are left out of the result.
+    """
+    date = getdate(date or today())
+    currencies = {currency for currency in currencies if currency and currency != to_currency}
+    rates = {to_currency: 1.0}
+    if not currencies:
+        return rates
+
+    fields = {currency: f"{currency}:{to_currency}:{date}" for currency in currencies}
+    for currency, field in fields.items():
+        cached = frappe.cache.hget(EXCHANGE_RATE_CACHE_KEY, field)
+        if cached is not None:
+            rates[currency] = cached
+
+    missing = [currency for currency in currencies if currency not in rates]
+    if missing:
+        rows = frappe.db.sql(
+            """select from_currency, to_currency, exchange_rate
+            from `tabCurrency Exchange`
+            where date <= %(date)s and for_buying = 1 and exchange_rate > 0
+                and ((from_currency in %(currencies)s and to_currency = %(to_currency)s)
+                    or (from_currency = %(to_currency)s and to_currency in %(currencies)s))
+            order by date desc, creation desc""",
+            {"date": date, "currencies": missing, "to_currency": to_currency},
+            as_dict=True,
+        )
+        for row in rows:
+            if row.to_currency == to_currency:
+                currency, rate = row.from_currency, flt(row.exchange_rate)
+            else:
+                currency, rate = row.to_currency, 1 / flt(row.exchange_rate)
+            if currency not in rates:
+                rates[currency] = rate
+                frappe.cache.hset(EXCHANGE_RATE_CACHE_KEY, fields[currency], rate)
+
+    return rates
+
+
+def clear_exchange_rate_cache(doc=None, method=None):
+    """doc_event: drop cached exchange rates when a Currency Exchange record changes"""
+    frappe.cache.delete_value(EXCHANGE_RATE_CACHE_KEY)
+
+
+def get_row_currency(row, currency):
+    # Hour-rate processes are costed from workstation rates and addons without a manual
+    # rate from Item Price or valuation rates, all in the company currency
+    if (row.doctype == "Estimation Process" and is_hour_rate_costed(row)) or (
+        row.doctype == "Work Order Estimation Item Addon" and not row.manual_rate
+    ):
+        row.rate_currency = get_default_currency()
+    return row.rate_currency or currency
+
+
+def apply_exchange_rates(target, rows=None):
+    """Set the exchange rate into the estimation currency on every item, process and addon row
+
+    All rates come from one lookup for the estimation's currency and
+    exchange rate date, whatever the number of rows. Rows without a rate
+    currency are priced in the estimation currency.
+    """
+    if not target.get("currency"):
+        target.currency = get_default_currency()
+    if not target.get("exchange_rate_date"):
+        target.exchange_rate_date = today()
+
+    if rows is None:
+        rows = [row for table in CURRENCY_TABLES for row in target.get(table) or []]
+    row_currencies = [(row, get_row_currency(row, target.currency)) for row in rows]
+    rates = get_exchange_rates([currency for row, currency in row_currencies], target.currency, target.exchange_rate_date)
+
+    missing = sorted({currency for row, currency in row_currencies if currency not in rates})
+    if missing:
+        frappe.throw(
+            _("No buying exchange rate from {0} to {1} on or before {2}. Please create a Currency Exchange record.").format(
+                ", ".join(missing), target.currency, frappe.format(target.exchange_rate_date, "Date")
+            )
+        )
+
+    for row, currency in row_currencies:
+        row.exchange_rate = rates[currency]
@@ -0,0 +1,113 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+HOUR_RATE = "Hour Rate"
+MANUAL_RATE = "Manual Rate"
+
+WORKSTATION_CACHE_KEY = "work_order_estimation_workstations"
+
+
+def get_workstation_details(workstations):
+    """Hour rate and type of many workstations, served from a shared cache
+
+    Misses are loaded with a single query joined to Workstation Type, whose
+    hour rate is used when the workstation has none of its own.
+    """
+    names = list({name for name in workstations if name})
+    if not names:
+        return {}
+
+    details = {}
+    for name in names:
+        cached = frappe.cache.hget(WORKSTATION_CACHE_KEY, name)
+        if cached is not None:
+            details[name] = cached
+
+    missing = [name for name in names if name not in details]
+    if missing:
+        rows = frappe.db.sql(
+            """select ws.name, ws.workstation_type,
+                ifnull(nullif(ws.hour_rate, 0), ifnull(wst.hour_rate, 0)) as hour_rate
+            from `tabWorkstation` ws
+            left join `tabWorkstation Type` wst on wst.name = ws.workstation_type
+            where ws.name in %(names)s""",
+            {"names": missing},
+            as_dict=True,
+        )
+        for row in rows:
+            details[row.name] = {"workstation_type": row.workstation_type, "hour_rate": flt(row.hour_rate)}
+            frappe.cache.hset(WORKSTATION_CACHE_KEY, row.name, details[row.name])
+
+    return details
+
+
+def clear_workstation_cache(doc=None, method=None):
+    """doc_event: drop cached workstation metadata when a Workstation or Workstation Type changes"""
+    if doc and doc.doctype == "Workstation":
+        frappe.cache.hdel(WORKSTATION_CACHE_KEY, doc.name)
+    else:
+        # A type's rate feeds every workstation of that type
+        frappe.cache.delete_value(WORKSTATION_CACHE_KEY)
+
+
+def get_process_hours(setup_time_mins, units_per_hour, qty):
+    """Machine hours for one operation: setup time plus run time for the quantity"""
+    run_hours = flt(qty) / flt(units_per_hour) if flt(units_per_hour) > 0 else 0
+    return flt(setup_time_mins) / 60 + run_hours
+
+
+def is_hour_rate_costed(process):
+    """Hour-rate costing needs at least a setup time or a run speed; otherwise the manual rate applies"""
+    return (process.costing_method or HOUR_RATE) == HOUR_RATE and (
+        flt(process.setup_time_mins) > 0 or flt(process.units_per_hour) > 0
+    )
+
+
+def calculate_process_cost(process, details=None):
+    """Set hour rate, machine hours, rate and total cost on one process row
+
+    Rate and hour rate stay in the row's rate currency; the total cost is
+    converted into the estimation currency with the row's exchange rate.
+    Hour-rate costing throws when the workstation has no hour rate.
+    """
+    if details:
+        process.workstation_type = details.get("workstation_type") or process.workstation_type
+        process.hour_rate = details.get("hour_rate")
+
+    exchange_rate = flt(process.exchange_rate) or 1
+    if is_hour_rate_costed(process):
+        if not flt(process.hour_rate):
+            frappe.throw(
+                _("Row {0}: Workstation {1} has no hour rate, on itself or on its Workstation Type. Set one, or cost the process with a Manual Rate.").format(
+                    process.idx, frappe.bold(process.workstation)
+                )
+            )
+        process.total_hours = get_process_hours(process.setup_time_mins, process.units_per_hour, process.qty)
+        cost = process.total_hours * flt(process.hour_rate)
+        process.rate = cost / flt(process.qty) if flt(process.qty) else cost
+        process.total_cost = cost * exchange_rate
+    else:
+        process.total_hours = 0
+        process.total_cost = flt(process.rate) * flt(process.qty) * exchange_rate
+
+
+def calculate_process_costs(doc):
+    """Cost every process row of an estimation with one workstation lookup"""
+    processes = doc.get("estimation_processes") or []
+    details = get_workstation_details([process.workstation for process in processes])
+    for process in processes:
+        calculate_process_cost(process, details.get(process.workstation))
+
+
+@frappe.whitelist()
+def get_workstation_rates(workstations):
+    """Workstation hour rates and types for the form, so rows can be costed client-side"""
+    if isinstance(workstations, str):
+        workstations = json.loads(workstations)
+    return get_workstation_details(workstations)
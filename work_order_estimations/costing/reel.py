@@ -0,0 +1,146 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import math
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+SHEET = "Sheet"
+REEL = "Reel"
+
+REEL_SIZE_CACHE_KEY = "work_order_estimation_reel_sizes"
+
+
+def get_stocked_reel_sizes(paper_types):
+    """Enabled reel sizes per paper type, loaded for all paper types with one query"""
+    paper_types = list({paper for paper in paper_types if paper})
+    if not paper_types:
+        return {}
+
+    sizes = {}
+    for paper in paper_types:
+        cached = frappe.cache.hget(REEL_SIZE_CACHE_KEY, paper)
+        if cached is not None:
+            sizes[paper] = cached
+
+    missing = [paper for paper in paper_types if paper not in sizes]
+    if missing:
+        loaded = {paper: [] for paper in missing}
+        for row in frappe.get_all(
+            "Paper Reel Size",
+            filters={"paper_type": ["in", missing], "disabled": 0},
+            fields=["name", "paper_type", "reel_width_cm", "reel_length_m"],
+            order_by="reel_width_cm asc",
+        ):
+            loaded[row.paper_type].append(row)
+        for paper, rows in loaded.items():
+            frappe.cache.hset(REEL_SIZE_CACHE_KEY, paper, rows)
+        sizes.update(loaded)
+
+    return sizes
+
+
+def clear_reel_size_cache():
+    frappe.cache.delete_value(REEL_SIZE_CACHE_KEY)
+
+
+def pick_reel(sizes, piece_width_cm, lanes=0):
+    """Choose the stocked reel with the least trim for the given piece width
+
+    With `lanes` set, only reels wide enough for that many lanes qualify;
+    otherwise each reel runs as many lanes as fit. Returns (reel, lanes, trim_cm).
+    """
+    piece_width_cm = flt(piece_width_cm)
+    best = None
+    for size in sizes or []:
+        width = flt(size.get("reel_width_cm"))
+        size_lanes = (cint(lanes) or cint(width // piece_width_cm)) if piece_width_cm else 0
+        if size_lanes < 1 or size_lanes * piece_width_cm > width:
+            continue
+        trim = width - size_lanes * piece_width_cm
+        # Least trim relative to the reel width, wider reels winning ties
+        key = (trim / width, -width)
+        if best is None or key < best[0]:
+            best = (key, size, size_lanes, trim)
+    return best[1:] if best else (None, cint(lanes) or 1, 0)
+
+
+def calculate_reel_metrics(row, reel=None, lanes=None):
+    """Running metres, reel count and consumed weight of a reel-fed item
+
+    `lanes` is the lane count chosen with `reel`; the user's `lanes` field is
+    never overwritten, the count actually run is kept in `used_lanes`.
+    """
+    repeat_cm = flt(row.repeat_length_cm) or flt(row.length_cm)
+    if not repeat_cm or not row.width_cm or not row.gsm:
+        return
+
+    if reel:
+        row.reel_size = reel.get("name")
+        row.reel_width_cm = flt(reel.get("reel_width_cm"))
+        row.reel_length_m = flt(reel.get("reel_length_m")) or row.reel_length_m
+
+    width_cm = flt(row.width_cm)
+    if not cint(lanes):
+        # Entered reel widths run as many lanes as fit, like stocked ones
+        lanes = cint(row.lanes) or (cint(flt(row.reel_width_cm) // width_cm) if flt(row.reel_width_cm) else 1)
+    row.used_lanes = lanes = max(cint(lanes), 1)
+
+    if not flt(row.reel_width_cm):
+        row.reel_width_cm = lanes * width_cm
+    if flt(row.reel_width_cm) < lanes * width_cm:
+        frappe.throw(
+            _("Row {0}: a {1} cm reel is narrower than {2} lanes of {3} cm").format(
+                row.idx, flt(row.reel_width_cm), lanes, width_cm
+            )
+        )
+    row.trim_cm = flt(row.reel_width_cm) - lanes * width_cm
+
+    # Gross quantity already includes process or flat waste
+    gross = flt(row.gross_quantity) or flt(row.quantity)
+    running_m = math.ceil(gross / lanes) * repeat_cm / 100
+
+    usable_length = flt(row.reel_length_m) - flt(row.splice_waste_m)
+    row.reel_count = math.ceil(running_m / usable_length) if usable_length > 0 else 0
+    row.running_metres = running_m + row.reel_count * flt(row.splice_waste_m)
+
+    # Everything unwound is consumed, trim and splices included
+    row.total_weight_kg = flt(row.reel_width_cm) / 100 * row.running_metres * flt(row.gsm) / 1000
+    row.waste_kg = max(row.total_weight_kg - flt(row.net_weight_kg), 0)
+
+
+def calculate_reel_consumption(doc):
+    """Evaluate every reel-fed item of an estimation, sharing one reel size lookup
+
+    Rows of a paper with stocked reels must fit one of them: when none is wide
+    enough the previously chosen reel is dropped and the row is costed on a
+    reel of exactly its lanes' width, with a warning.
+    """
+    rows = [row for row in doc.get("estimation_items") or [] if row.consumption_mode == REEL]
+    if not rows:
+        return
+
+    sizes = get_stocked_reel_sizes([row.paper_type for row in rows])
+    for row in rows:
+        reel, lanes = None, None
+        stocked = sizes.get(row.paper_type)
+        if stocked:
+            reel, lanes, _trim = pick_reel(stocked, row.width_cm, row.lanes)
+            if not reel:
+                row.reel_size = None
+                row.reel_width_cm = None
+                lanes = None
+                frappe.msgprint(
+                    _("Row {0}: no stocked reel of {1} fits {2} cm pieces; costed on a reel of the exact width").format(
+                        row.idx, row.paper_type, flt(row.width_cm)
+                    ),
+                    indicator="orange",
+                    alert=True,
+                )
+        elif row.reel_size:
+            # Reel chosen for a previous paper type
+            row.reel_size = None
+            row.reel_width_cm = None
+        calculate_reel_metrics(row, reel, lanes)
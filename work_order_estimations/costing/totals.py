@@ -0,0 +1,28 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+from frappe.utils import flt
+
+
+def apply_final_totals(target, total_quantity):
+    """Set total cost, cost per unit, margin and default sales price from the cost totals
+
+    `target` is an estimation or any dict-like holding its cost fields, so
+    totals updated in place by direct row appends follow the same rules as a
+    full recalculation.
+    """
+    # Total cost (paper + addons + operations)
+    target.total_cost = flt(target.total_paper_cost) + flt(target.total_addon_cost) + flt(target.total_cost_for_operations)
+
+    # Cost per unit over product-level items (parts are not sold on their own)
+    target.cost_per_unit = target.total_cost / total_quantity if total_quantity > 0 else 0
+
+    # Margin calculations
+    if target.profit_margin and target.total_cost:
+        target.margin_amount = target.total_cost * (flt(target.profit_margin) / 100)
+    else:
+        target.margin_amount = 0
+
+    # Calculate sales price if not set
+    if not target.sales_price and target.total_cost and target.margin_amount:
+        target.sales_price = target.total_cost + target.margin_amount
@@ -0,0 +1,65 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import math
+
+from frappe.utils import cint, flt
+
+FLAT_PERCENTAGE = "Flat Percentage"
+PROCESS_CHAIN = "Process Chain"
+
+
+def get_chain_factors(processes):
+    """Reduce a process chain to gross = factor * good + offset
+
+    Walking the chain backwards from the last operation, each step needs its
+    output divided by (1 - spoilage) plus its make-ready sheets as input. The
+    composition of these affine steps is itself affine, so the whole chain is
+    two numbers that can be applied to any quantity.
+    """
+    factor, offset = 1.0, 0.0
+    for process in reversed(processes):
+        spoilage = min(flt(process.run_spoilage_percentage), 99.0) / 100
+        step = 1 / (1 - spoilage)
+        factor *= step
+        offset = offset * step + flt(process.make_ready_sheets)
+    return factor, offset
+
+
+def has_waste_model(process):
+    return flt(process.make_ready_sheets) > 0 or flt(process.run_spoilage_percentage) > 0
+
+
+def calculate_process_waste(doc):
+    """Apply the process-chain waste model to every item of an estimation
+
+    Processes with no `applies_to_item` run for every item. Chain factors are
+    computed once per distinct chain and then applied to all items sharing it.
+    Items whose chain has no make-ready or spoilage keep the flat
+    `waste_percentage` already applied by the item itself.
+    """
+    processes = [p for p in doc.get("estimation_processes") or [] if has_waste_model(p)]
+    common = [p for p in processes if not p.applies_to_item]
+    specific = {}
+    for process in processes:
+        if process.applies_to_item:
+            specific.setdefault(process.applies_to_item, []).append(process)
+
+    chain_factors = {}
+    for row in doc.get("estimation_items") or []:
+        chain = sorted(common + specific.get(row.item, []), key=lambda p: p.idx or 0)
+        weight = flt(row.weight_per_piece_kg)
+        if not chain or not weight:
+            row.waste_method = FLAT_PERCENTAGE
+            row.gross_quantity = cint(row.quantity) + (math.ceil(flt(row.waste_kg) / weight) if weight else 0)
+            continue
+
+        key = tuple(p.name or id(p) for p in chain)
+        if key not in chain_factors:
+            chain_factors[key] = get_chain_factors(chain)
+        factor, offset = chain_factors[key]
+
+        row.waste_method = PROCESS_CHAIN
+        row.gross_quantity = math.ceil(round(flt(row.quantity) * factor + offset, 6))
+        row.waste_kg = (row.gross_quantity - flt(row.quantity)) * weight
+        row.total_weight_kg = flt(row.net_weight_kg) + row.waste_kg
@@ -0,0 +1,192 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+from werkzeug.wrappers import Response
+
+from work_order_estimations.archive import get_archived_snapshots
+
+DOCTYPE = "Work Order Estimation"
+
+# Parent fields a dashboard may request
+SUMMARY_FIELDS = (
+    "status",
+    "client_name",
+    "project_name",
+    "delivery_date",
+    "currency",
+    "total_paper_cost",
+    "total_addon_cost",
+    "total_cost_for_operations",
+    "total_cost",
+    "cost_per_unit",
+    "profit_margin",
+    "margin_amount",
+    "sales_price",
+    "quotation_reference",
+    "sales_order_reference",
+    "work_order_reference",
+)
+
+COST_BREAKDOWN_FIELDS = {
+    "paper_cost": "total_paper_cost",
+    "addon_cost": "total_addon_cost",
+    "process_cost": "total_cost_for_operations",
+    "total_cost": "total_cost",
+    "profit_margin": "profit_margin",
+    "margin_amount": "margin_amount",
+    "sales_price": "sales_price",
+    "cost_per_unit": "cost_per_unit",
+}
+
+def sum_of(fieldname, products_only=False):
+    """Sum of a field over snapshot rows, as the matching SQL aggregate computes it"""
+    return lambda rows: sum(
+        flt(row.get(fieldname)) for row in rows if not (products_only and row.get("parent_component"))
+    )
+
+
+# Per child table aggregates: table key -> (child doctype, table field,
+# {alias: (sql expression, the same aggregate over archived snapshot rows)})
+TABLE_AGGREGATES = {
+    "items": ("Work Order Estimation Item", "estimation_items", {
+        "count": ("count(*)", len),
+        "quantity": (
+            "sum(if(ifnull(`parent_component`, '') = '', ifnull(`quantity`, 0), 0))",
+            sum_of("quantity", products_only=True),
+        ),
+        "total_weight_kg": ("sum(ifnull(`total_weight_kg`, 0))", sum_of("total_weight_kg")),
+        "total_paper_cost": ("sum(ifnull(`total_paper_cost`, 0))", sum_of("total_paper_cost")),
+    }),
+    "processes": ("Estimation Process", "estimation_processes", {
+        "count": ("count(*)", len),
+        "total_cost": ("sum(ifnull(`total_cost`, 0))", sum_of("total_cost")),
+    }),
+    "addons": ("Work Order Estimation Item Addon", "estimation_item_addons", {
+        "count": ("count(*)", len),
+        "amount": ("sum(ifnull(`amount`, 0))", sum_of("amount")),
+    }),
+}
+
+
+def get_etag(versions, fields, aggregates):
+    """Weak ETag over document versions and the requested projection"""
+    payload = json.dumps([sorted(versions.items()), list(fields), list(aggregates)], default=str)
+    return 'W/"{}"'.format(hashlib.md5(payload.encode()).hexdigest())
+
+
+def get_table_aggregates(names, aggregates):
+    """Aggregate child rows of many estimations with one grouped query per table
+
+    Archived estimations have no live rows and are aggregated from their
+    archive snapshots instead.
+    """
+    result = {name: {} for name in names}
+    archived = get_archived_snapshots(
+        frappe.get_all(DOCTYPE, filters={"name": ["in", names], "is_archived": 1}, pluck="name")
+    ) if aggregates else {}
+
+    for key in aggregates:
+        child_doctype, table, expressions = TABLE_AGGREGATES[key]
+        select = ", ".join(f"{sql} as `{alias}`" for alias, (sql, aggregate) in expressions.items())
+        rows = frappe.db.sql(
+            f"""select `parent`, {select}
+            from `tab{child_doctype}`
+            where `parenttype`=%(parenttype)s and `parent` in %(names)s
+            group by `parent`""",
+            {"parenttype": DOCTYPE, "names": names},
+            as_dict=True,
+        )
+        for name in names:
+            result[name][key] = {alias: 0 for alias in expressions}
+        for row in rows:
+            parent = row.pop("parent")
+            result[parent][key] = {alias: flt(value) for alias, value in row.items()}
+            result[parent][key]["count"] = cint(row["count"])
+        for name, snapshot in archived.items():
+            table_rows = snapshot.get(table) or []
+            result[name][key] = {alias: aggregate(table_rows) for alias, (sql, aggregate) in expressions.items()}
+    return result
+
+
+def get_summaries(names, fields=None, aggregates=None, etag=None):
+    """Return parent-level fields and optional child aggregates for many estimations
+
+    Only `name` and `modified` are read before comparing against `etag`, so a
+    poll with nothing changed costs a single indexed lookup.
+    """
+    fields = [f for f in (fields or COST_BREAKDOWN_FIELDS.values()) if f in SUMMARY_FIELDS]
+    aggregates = [a for a in (aggregates or []) if a in TABLE_AGGREGATES]
+    names = list(dict.fromkeys(names or []))
+
+    versions = {
+        row.name: row.modified
+        for row in frappe.get_list(
+            DOCTYPE, filters={"name": ["in", names]}, fields=["name", "modified"]
+        )
+    } if names else {}
+
+    current_etag = get_etag(versions, fields, aggregates)
+    if etag and etag == current_etag:
+        return {"not_modified": True, "etag": current_etag}
+
+    data = {}
+    if versions:
+        for row in frappe.get_all(
+            DOCTYPE, filters={"name": ["in", list(versions)]}, fields=["name", "modified"] + fields
+        ):
+            data[row.name] = row
+        if aggregates:
+            for name, values in get_table_aggregates(list(versions), aggregates).items():
+                data[name].update(values)
+
+    return {
+        "not_modified": False,
+        "etag": current_etag,
+        "data": data,
+        "missing": [name for name in names if name not in versions],
+    }
+
+
+def get_cost_breakdown(name):
+    """Parent-level cost figures for one estimation, without loading child tables"""
+    values = frappe.db.get_value(DOCTYPE, name, list(COST_BREAKDOWN_FIELDS.values()), as_dict=True)
+    if not values:
+        frappe.throw(_("{0} {1} not found").format(_(DOCTYPE), name), frappe.DoesNotExistError)
+    return {key: values.get(fieldname) or 0 for key, fieldname in COST_BREAKDOWN_FIELDS.items()}
+
+
+@frappe.whitelist()
+def get_estimation_summaries(names, fields=None, aggregates=None, etag=None):
+    """Read-only projection endpoint for dashboards
+
+    Supports conditional requests: pass the last `etag` (or send it as an
+    If-None-Match header) and an unchanged result is answered with
+    `not_modified`. Over HTTP every response carries an ETag header, and an
+    If-None-Match that still matches gets an empty 304.
+    """
+    if isinstance(names, str):
+        names = json.loads(names) if names.startswith("[") else [names]
+    if isinstance(fields, str):
+        fields = json.loads(fields)
+    if isinstance(aggregates, str):
+        aggregates = json.loads(aggregates)
+
+    request = getattr(frappe.local, "request", None)
+    header_etag = frappe.get_request_header("If-None-Match") if request else None
+    result = get_summaries(names, fields, aggregates, etag or header_etag)
+    if not request:
+        return result
+
+    # A response object is passed through as is, which lets the ETag header reach the client
+    if result["not_modified"] and header_etag and not etag:
+        response = Response(status=304)
+    else:
+        response = Response(frappe.as_json({"message": result}), content_type="application/json")
+    response.headers["ETag"] = result["etag"]
+    return response
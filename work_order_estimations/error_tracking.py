@@ -0,0 +1,147 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+import random
+import sys
+
+import frappe
+from frappe.utils import add_to_date, cint, now, now_datetime
+
+from work_order_estimations.cache_utils import decode, redis_key
+
+ERROR_TITLE = "Work Order Estimation API Error"
+
+COUNTS_KEY = "work_order_estimation_errors:counts"
+META_KEY = "work_order_estimation_errors:meta"
+SAMPLES_KEY = "work_order_estimation_errors:samples:{}"
+RATE_KEY = "work_order_estimation_errors:rate:{:%Y%m%d%H%M}"
+
+# Full tracebacks kept per fingerprint between flushes: the first few, then a random sample
+SAMPLE_SIZE = 5
+SAMPLE_RATE = 0.05
+# Per-minute buckets kept for error rates
+RATE_RETENTION_MINUTES = 24 * 60
+
+
+def get_fingerprint(endpoint, exc_type):
+    return hashlib.sha1(f"{endpoint}:{exc_type}".encode()).hexdigest()[:16]
+
+
+def record_error(endpoint, message=None):
+    """Count an error of `endpoint` in Redis instead of writing an Error Log per failure
+
+    Errors are grouped by endpoint and exception type. Each group keeps a
+    counter and a small sample of full tracebacks until the next flush, and
+    every error also lands in a per-minute bucket used for error rates. If
+    Redis is unavailable the error is logged directly.
+    """
+    exc_type = sys.exc_info()[0]
+    exc_name = exc_type.__name__ if exc_type else "Error"
+    fingerprint = get_fingerprint(endpoint, exc_name)
+    rate_key = redis_key(RATE_KEY.format(now_datetime()))
+
+    try:
+        # Raw commands on a pipeline: the cache wrapper pickles hash values, counters must stay integers
+        pipeline = frappe.cache.pipeline()
+        pipeline.hincrby(redis_key(COUNTS_KEY), fingerprint, 1)
+        pipeline.hsetnx(redis_key(META_KEY), fingerprint, json.dumps({"endpoint": endpoint, "exception": exc_name}))
+        pipeline.hincrby(rate_key, endpoint, 1)
+        pipeline.expire(rate_key, RATE_RETENTION_MINUTES * 60)
+        count = pipeline.execute()[0]
+
+        if count <= SAMPLE_SIZE or random.random() < SAMPLE_RATE:
+            samples_key = redis_key(SAMPLES_KEY.format(fingerprint))
+            sample = "\n".join(filter(None, [now(), message, frappe.get_traceback()]))
+            pipeline.lpush(samples_key, sample)
+            pipeline.ltrim(samples_key, 0, SAMPLE_SIZE - 1)
+            pipeline.execute()
+    except Exception:
+        frappe.log_error(message, ERROR_TITLE)
+
+
+def get_error_meta(fingerprints):
+    if not fingerprints:
+        return {}
+    pipeline = frappe.cache.pipeline()
+    pipeline.hmget(redis_key(META_KEY), fingerprints)
+    values = pipeline.execute()[0]
+    return {fingerprint: json.loads(decode(value) or "{}") for fingerprint, value in zip(fingerprints, values)}
+
+
+def pop_hash(key):
+    """Read and clear a Redis hash in one transaction, so concurrent increments land in the next read"""
+    pipeline = frappe.cache.pipeline(transaction=True)
+    pipeline.hgetall(key)
+    pipeline.delete(key)
+    return {decode(field): cint(decode(value)) for field, value in pipeline.execute()[0].items()}
+
+
+def flush_error_summaries():
+    """Scheduled job: write one Error Log per error group seen since the last flush"""
+    counts = pop_hash(redis_key(COUNTS_KEY))
+    meta = get_error_meta(list(counts))
+
+    for fingerprint, count in counts.items():
+        pipeline = frappe.cache.pipeline(transaction=True)
+        samples_key = redis_key(SAMPLES_KEY.format(fingerprint))
+        pipeline.lrange(samples_key, 0, -1)
+        pipeline.delete(samples_key)
+        samples = [decode(sample) for sample in pipeline.execute()[0]]
+
+        group = meta.get(fingerprint) or {}
+        title = "{}: {} {} x{}".format(ERROR_TITLE, group.get("endpoint"), group.get("exception"), count)
+        summary = {"fingerprint": fingerprint, "count": count, "flushed_at": now(), "samples": len(samples)}
+        frappe.log_error(
+            title=title[:140],
+            message=json.dumps(summary, indent=1) + "\n\n" + "\n\n---\n\n".join(samples),
+        )
+
+
+def get_error_rates(minutes=60):
+    """Errors per endpoint over the last `minutes`, from the per-minute buckets"""
+    minutes = min(max(cint(minutes), 1), RATE_RETENTION_MINUTES)
+    current = now_datetime()
+
+    pipeline = frappe.cache.pipeline()
+    for offset in range(minutes):
+        pipeline.hgetall(redis_key(RATE_KEY.format(add_to_date(current, minutes=-offset))))
+
+    totals = {}
+    for bucket in pipeline.execute():
+        for endpoint, count in (bucket or {}).items():
+            endpoint = decode(endpoint)
+            totals[endpoint] = totals.get(endpoint, 0) + cint(decode(count))
+
+    return [
+        {"endpoint": endpoint, "errors": count, "per_minute": round(count / minutes, 3)}
+        for endpoint, count in sorted(totals.items(), key=lambda item: -item[1])
+    ]
+
+
+@frappe.whitelist()
+def get_endpoint_error_rates(minutes=60):
+    """Error counts and rates per estimation endpoint, including groups not yet flushed"""
+    frappe.only_for("System Manager")
+
+    pipeline = frappe.cache.pipeline()
+    pipeline.hgetall(redis_key(COUNTS_KEY))
+    counts = {decode(field): cint(decode(value)) for field, value in pipeline.execute()[0].items()}
+    meta = get_error_meta(list(counts))
+
+    pending = [
+        {
+            "fingerprint": fingerprint,
+            "endpoint": (meta.get(fingerprint) or {}).get("endpoint"),
+            "exception": (meta.get(fingerprint) or {}).get("exception"),
+            "count": count,
+        }
+        for fingerprint, count in counts.items()
+    ]
+
+    return {
+        "minutes": cint(minutes),
+        "rates": get_error_rates(minutes),
+        "pending": sorted(pending, key=lambda row: -row["count"]),
+    }
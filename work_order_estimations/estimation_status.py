@@ -0,0 +1,135 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe import _
+from frappe.utils import get_datetime, now
+
+DOCTYPE = "Work Order Estimation"
+
+# Allowed status transitions: current status -> statuses it may move to
+STATUS_TRANSITIONS = {
+    "Draft": ("Estimation Done", "Cancelled"),
+    "Estimation Done": ("Draft", "Sent", "Quotation Created", "Cancelled"),
+    # Back to Estimation Done when the quotation is cancelled
+    "Sent": ("Estimation Done", "Quotation Created", "Cancelled"),
+    "Quotation Created": ("Estimation Done", "Sent", "Cancelled"),
+    "Cancelled": ("Draft",),
+}
+
+
+def can_transition(from_status, to_status):
+    """Check whether the state machine allows moving from one status to another"""
+    return to_status in STATUS_TRANSITIONS.get(from_status or "Draft", ())
+
+
+def transition_status(names, to_status, expected_modified=None):
+    """Move many estimations to `to_status` without loading or re-validating them
+
+    `expected_modified` optionally maps names to the `modified` timestamp the
+    caller last saw; rows changed since then are reported as conflicts. All
+    accepted rows are updated with one conditional UPDATE guarded on `modified`
+    and `status`, so a concurrent edit between the read and the write also
+    surfaces as a conflict instead of being overwritten.
+    """
+    if to_status not in STATUS_TRANSITIONS:
+        frappe.throw(_("Invalid status: {0}").format(to_status))
+
+    names = list(dict.fromkeys(names or []))
+    expected_modified = expected_modified or {}
+    result = {"status": to_status, "updated": [], "conflicts": []}
+    if not names:
+        return result
+
+    current = {
+        row.name: row
+        for row in frappe.get_all(
+            DOCTYPE,
+            filters={"name": ["in", names]},
+            fields=["name", "status", "modified"],
+        )
+    }
+    # Without write access to the doctype no record needs checking
+    can_write = frappe.has_permission(DOCTYPE, "write")
+
+    candidates = []
+    for name in names:
+        row = current.get(name)
+        if not row:
+            result["conflicts"].append({"name": name, "reason": _("Not found")})
+        elif not can_write:
+            result["conflicts"].append({"name": name, "reason": _("Not permitted")})
+        elif name in expected_modified and get_datetime(expected_modified[name]) != get_datetime(row.modified):
+            result["conflicts"].append({
+                "name": name,
+                "reason": _("Document has been modified after you opened it"),
+                "modified": row.modified,
+            })
+        elif not can_transition(row.status, to_status):
+            result["conflicts"].append({
+                "name": name,
+                "reason": _("Cannot change status from {0} to {1}").format(row.status or "Draft", _(to_status)),
+                "current_status": row.status,
+            })
+        # Checked last, since it loads the document: User Permissions may grant only read access
+        elif not frappe.has_permission(DOCTYPE, "write", doc=name):
+            result["conflicts"].append({"name": name, "reason": _("Not permitted")})
+        else:
+            candidates.append(row)
+
+    if not candidates:
+        return result
+
+    modified = now()
+    guard = " or ".join(["(`name`=%s and `modified`=%s and ifnull(`status`, 'Draft')=%s)"] * len(candidates))
+    values = [to_status, modified, frappe.session.user]
+    for row in candidates:
+        values.extend([row.name, row.modified, row.status or "Draft"])
+
+    frappe.db.sql(
+        f"""update `tabWork Order Estimation`
+        set `status`=%s, `modified`=%s, `modified_by`=%s
+        where {guard}""",
+        values,
+    )
+
+    # Rows whose guard no longer matched were changed concurrently
+    updated = set(
+        frappe.get_all(
+            DOCTYPE,
+            filters={"name": ["in", [row.name for row in candidates]], "modified": modified, "status": to_status},
+            pluck="name",
+        )
+    )
+    for row in candidates:
+        if row.name in updated:
+            result["updated"].append({"name": row.name, "from_status": row.status, "modified": modified})
+        else:
+            result["conflicts"].append({
+                "name": row.name,
+                "reason": _("Document was changed by another user during the update"),
+            })
+
+    return result
+
+
+def transition_single(name, to_status, expected_modified=None):
+    """Transition one estimation, raising on conflict"""
+    result = transition_status(
+        [name], to_status, {name: expected_modified} if expected_modified else None
+    )
+    if result["conflicts"]:
+        frappe.throw(result["conflicts"][0]["reason"], title=_("Status not changed"))
+    return result["updated"][0]
+
+
+@frappe.whitelist()
+def bulk_transition_status(names, status, expected_modified=None):
+    """Change the status of many Work Order Estimations in one call"""
+    if isinstance(names, str):
+        names = json.loads(names)
+    if isinstance(expected_modified, str):
+        expected_modified = json.loads(expected_modified)
+    return transition_status(names, status, expected_modified)
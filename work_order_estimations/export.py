@@ -0,0 +1,292 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import csv
+import json
+import os
+import tempfile
+import zipfile
+from itertools import chain, islice
+
+import frappe
+from frappe import _
+from frappe.desk.reportview import build_match_conditions
+from frappe.utils import cint, now_datetime
+
+from work_order_estimations.archive import get_archived_snapshots
+
+DOCTYPE = "Work Order Estimation"
+EXPORT_EVENT = "work_order_estimation_export"
+
+CSV = "csv"
+PARQUET = "parquet"
+
+# Rows fetched from the unbuffered cursor and written per step
+CHUNK_SIZE = 5000
+
+ESTIMATION_COLUMNS = (
+    "name", "project_name", "client_name", "status", "creation", "delivery_date",
+    "total_paper_cost", "total_addon_cost", "total_cost_for_operations", "total_cost",
+    "cost_per_unit", "profit_margin", "margin_amount", "sales_price", "currency", "is_archived",
+)
+
+# File name -> (child table field, columns)
+LINE_TABLES = {
+    "items": ("estimation_items", (
+        "parent", "idx", "item", "paper_type", "component_code", "parent_component", "quantity",
+        "gsm", "length_cm", "width_cm", "rate_per_kg", "rate_currency", "exchange_rate",
+        "waste_kg", "total_weight_kg", "total_paper_cost", "addon_cost",
+    )),
+    "processes": ("estimation_processes", (
+        "parent", "idx", "process_type", "workstation", "qty", "rate", "rate_currency", "exchange_rate",
+        "total_hours", "total_cost",
+    )),
+    "addons": ("estimation_item_addons", (
+        "parent", "idx", "item", "addon_type", "addon_item", "consumed_qty", "rate", "rate_currency",
+        "exchange_rate", "amount",
+    )),
+}
+
+INT_FIELDTYPES = ("Int", "Check")
+FLOAT_FIELDTYPES = ("Float", "Currency", "Percent")
+
+
+# Archive snapshots read and decompressed per query
+ARCHIVE_BATCH_SIZE = 100
+
+
+def get_conditions(filters, user=None):
+    """WHERE clause on the estimation alias `e`, with its parameters
+
+    Includes the user's permission conditions (User Permissions, sharing and
+    permission query hooks), the same ones the list view applies.
+    """
+    conditions, values = ["e.is_template = 0"], {}
+    match_conditions = build_match_conditions(DOCTYPE, user=user)
+    if match_conditions:
+        conditions.append(
+            f"""e.name in (select `tabWork Order Estimation`.name from `tabWork Order Estimation`
+            where {match_conditions})"""
+        )
+    if filters.get("from_date"):
+        conditions.append("e.creation >= %(from_date)s")
+        values["from_date"] = filters["from_date"]
+    if filters.get("to_date"):
+        conditions.append("e.creation < %(to_date)s + interval 1 day")
+        values["to_date"] = filters["to_date"]
+    if filters.get("client_name"):
+        conditions.append("e.client_name = %(client_name)s")
+        values["client_name"] = filters["client_name"]
+    if filters.get("status"):
+        conditions.append("e.status = %(status)s")
+        values["status"] = filters["status"]
+    if filters.get("paper_type"):
+        paper_condition = """exists (select 1 from `tabWork Order Estimation Item` pi
+            where pi.parent = e.name and pi.parenttype = 'Work Order Estimation'
+            and pi.paper_type = %(paper_type)s)"""
+        # Archived estimations have no live items; their snapshots are searched instead
+        archived = get_archived_with_paper(" and ".join(conditions), values, filters["paper_type"])
+        if archived:
+            paper_condition = f"({paper_condition} or e.name in %(archived_with_paper)s)"
+            values["archived_with_paper"] = archived
+        conditions.append(paper_condition)
+        values["paper_type"] = filters["paper_type"]
+    return " and ".join(conditions), values
+
+
+def get_archived_with_paper(where, values, paper_type):
+    """Archived estimations matching `where` whose snapshot has an item of `paper_type`"""
+    names = frappe.db.sql_list(
+        f"select e.name from `tabWork Order Estimation` e where {where} and e.is_archived = 1 order by e.name",
+        values,
+    )
+    matches = []
+    for start in range(0, len(names), ARCHIVE_BATCH_SIZE):
+        for name, snapshot in get_archived_snapshots(names[start : start + ARCHIVE_BATCH_SIZE]).items():
+            if any(row.get("paper_type") == paper_type for row in snapshot.get("estimation_items") or []):
+                matches.append(name)
+    return matches
+
+
+def get_queries(filters, user=None):
+    """(file name, doctype, columns, chunks) for the estimations and each line table
+
+    Lines of archived estimations are no longer in the child tables; they
+    follow the live lines, read from the archive snapshots.
+    """
+    where, values = get_conditions(filters, user)
+    queries = [(
+        "estimations", DOCTYPE, ESTIMATION_COLUMNS,
+        iter_chunks(
+            f"""select {", ".join(f"e.`{c}`" for c in ESTIMATION_COLUMNS)}
+            from `tabWork Order Estimation` e
+            where {where}
+            order by e.name""",
+            values,
+        ),
+    )]
+
+    meta = frappe.get_meta(DOCTYPE)
+    for file_name, (table, columns) in LINE_TABLES.items():
+        child_doctype = meta.get_field(table).options
+        line_where = where
+        if table == "estimation_items" and filters.get("paper_type"):
+            line_where += " and c.paper_type = %(paper_type)s"
+        live = iter_chunks(
+            f"""select {", ".join(f"c.`{c}`" for c in columns)}
+            from `tab{child_doctype}` c
+            inner join `tabWork Order Estimation` e on e.name = c.parent
+            where c.parenttype = 'Work Order Estimation' and c.parentfield = '{table}' and {line_where}
+            order by c.parent, c.idx""",
+            values,
+        )
+        archived = iter_archived_chunks(where, values, table, columns, filters.get("paper_type"))
+        queries.append((file_name, child_doctype, columns, chain(live, archived)))
+    return queries
+
+
+def iter_archived_chunks(where, values, table, columns, paper_type=None):
+    """Lines of one child table of the matching archived estimations, a batch of snapshots at a time"""
+    names = frappe.db.sql_list(
+        f"select e.name from `tabWork Order Estimation` e where {where} and e.is_archived = 1 order by e.name",
+        values,
+    )
+    for start in range(0, len(names), ARCHIVE_BATCH_SIZE):
+        chunk = []
+        for snapshot in get_archived_snapshots(names[start : start + ARCHIVE_BATCH_SIZE]).values():
+            for row in snapshot.get(table) or []:
+                if paper_type and row.get("paper_type") != paper_type:
+                    continue
+                chunk.append([row.get(column) for column in columns])
+        if chunk:
+            yield chunk
+
+
+def iter_chunks(query, values):
+    """Rows of a query in CHUNK_SIZE lists, streamed from a server-side cursor"""
+    with frappe.db.unbuffered_cursor():
+        rows = frappe.db.sql(query, values, as_iterator=True)
+        while chunk := list(islice(rows, CHUNK_SIZE)):
+            yield chunk
+
+
+def write_csv(path, columns, chunks):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
+
+
+def get_parquet_schema(pa, doctype, columns):
+    """Fixed column types from the doctype, so every chunk writes the same schema"""
+    meta = frappe.get_meta(doctype)
+    fields = []
+    for column in columns:
+        df = meta.get_field(column)
+        fieldtype = df.fieldtype if df else ("Int" if column == "idx" else "Data")
+        if fieldtype in INT_FIELDTYPES:
+            fields.append(pa.field(column, pa.int64()))
+        elif fieldtype in FLOAT_FIELDTYPES:
+            fields.append(pa.field(column, pa.float64()))
+        else:
+            fields.append(pa.field(column, pa.string()))
+    return pa.schema(fields)
+
+
+def write_parquet(path, doctype, columns, chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = get_parquet_schema(pa, doctype, columns)
+    converters = []
+    for field in schema:
+        if pa.types.is_integer(field.type):
+            converters.append(lambda v: None if v is None else int(v))
+        elif pa.types.is_floating(field.type):
+            converters.append(lambda v: None if v is None else float(v))
+        else:
+            converters.append(lambda v: None if v is None else str(v))
+
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            arrays = [
+                pa.array([convert(row[i]) for row in chunk], type=field.type)
+                for i, (field, convert) in enumerate(zip(schema, converters))
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def run_export(file_format=CSV, filters=None, user=None):
+    """Background job: write estimations and their lines to a zip of CSV or Parquet files
+
+    Each table is read through an unbuffered cursor in CHUNK_SIZE steps and
+    written straight to disk, so memory stays flat however many rows match.
+    """
+    filters = frappe._dict(filters or {})
+    extension = "parquet" if file_format == PARQUET else "csv"
+    file_name = f"estimation-export-{now_datetime():%Y%m%d-%H%M%S}-{frappe.generate_hash(length=6)}.zip"
+    counts = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, doctype, columns, chunks in get_queries(filters, user):
+            path = os.path.join(tmp, f"{name}.{extension}")
+            if file_format == PARQUET:
+                counts[name] = write_parquet(path, doctype, columns, chunks)
+            else:
+                counts[name] = write_csv(path, columns, chunks)
+
+        # Files are added one at a time from disk, so zipping is streamed as well
+        target = frappe.get_site_path("private", "files", file_name)
+        with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for entry in sorted(os.listdir(tmp)):
+                archive.write(os.path.join(tmp, entry), entry)
+
+    file_doc = frappe.get_doc({
+        "doctype": "File",
+        "file_name": file_name,
+        "file_url": f"/private/files/{file_name}",
+        "is_private": 1,
+    })
+    file_doc.insert(ignore_permissions=True)
+    if user:
+        frappe.db.set_value("File", file_doc.name, "owner", user, update_modified=False)
+
+    result = {"file_url": file_doc.file_url, "counts": counts}
+    frappe.publish_realtime(EXPORT_EVENT, result, user=user, after_commit=True)
+    return result
+
+
+@frappe.whitelist()
+def start_export(file_format=CSV, filters=None):
+    """Queue an export of estimations with their item, process and addon lines
+
+    Filters: from_date, to_date, client_name, status and paper_type. The user
+    is notified through the `work_order_estimation_export` realtime event.
+    """
+    frappe.has_permission(DOCTYPE, "export", throw=True)
+    if isinstance(filters, str):
+        filters = json.loads(filters)
+    if file_format not in (CSV, PARQUET):
+        frappe.throw(_("Unsupported export format: {0}").format(file_format))
+    if file_format == PARQUET:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            frappe.throw(_("Parquet export needs the pyarrow package; export as CSV instead"))
+
+    job = frappe.enqueue(
+        "work_order_estimations.export.run_export",
+        queue="long",
+        timeout=cint(frappe.conf.get("estimation_export_timeout")) or 3600,
+        file_format=file_format,
+        filters=filters or {},
+        user=frappe.session.user,
+    )
+    return {"job_id": job.id if job else None}
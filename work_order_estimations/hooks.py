@@ -10,7 +10,7 @@ app_license = "MIT"
 
 # include js, css files in header of desk.html
 # app_include_css = "/assets/work_order_estimations/css/work_order_estimations.css"
-# app_include_js = "/assets/work_order_estimations/js/work_order_estimations.js"
+app_include_js = "/assets/work_order_estimations/js/estimation_reference.js"
 
 # include js, css files in header of web template
 # web_include_css = "/assets/work_order_estimations/css/work_order_estimations.css"
@@ -53,10 +53,17 @@ doctype_js = {"Quotation" : "public/js/quotation.js"}
 # ----------
 
 # add methods and filters to jinja environment
-# jinja = {
-# 	"methods": "work_order_estimations.utils.jinja_methods",
-# 	"filters": "work_order_estimations.utils.jinja_filters"
-# }
+jinja = {
+	"methods": [
+		"work_order_estimations.print_utils.get_estimation_print_context",
+	],
+}
+
+# Boot
+# ----
+
+# Warms the shared estimator reference data and passes its version to the desk
+boot_session = "work_order_estimations.reference_data.boot_session"
 
 # Installation
 # ------------
@@ -116,17 +123,64 @@ doctype_js = {"Quotation" : "public/js/quotation.js"}
 # ---------------
 # Hook on document methods and events
 
-# doc_events = {
-# 	"*": {
-# 		"on_update": "method",
-# 		"on_cancel": "method",
-# 		"on_trash": "method"
-# 	}
-# }
+doc_events = {
+	"Workstation": {
+		"on_update": [
+			"work_order_estimations.costing.processes.clear_workstation_cache",
+			"work_order_estimations.reference_data.on_reference_change",
+		],
+		"on_trash": [
+			"work_order_estimations.costing.processes.clear_workstation_cache",
+			"work_order_estimations.reference_data.on_reference_change",
+		],
+	},
+	"Workstation Type": {
+		"on_update": [
+			"work_order_estimations.costing.processes.clear_workstation_cache",
+			"work_order_estimations.reference_data.on_reference_change",
+		],
+		"on_trash": [
+			"work_order_estimations.costing.processes.clear_workstation_cache",
+			"work_order_estimations.reference_data.on_reference_change",
+		],
+	},
+	"Item": {
+		"on_update": "work_order_estimations.reference_data.on_reference_change",
+	},
+	"Item Price": {
+		"on_update": "work_order_estimations.reference_data.on_reference_change",
+		"on_trash": "work_order_estimations.reference_data.on_reference_change",
+	},
+	"Currency Exchange": {
+		"on_update": "work_order_estimations.costing.currency.clear_exchange_rate_cache",
+		"on_trash": "work_order_estimations.costing.currency.clear_exchange_rate_cache",
+	},
+	"Quotation": {
+		"after_insert": "work_order_estimations.quotation_sync.on_quotation_insert",
+		"on_submit": "work_order_estimations.quotation_sync.on_quotation_submit",
+		"on_cancel": "work_order_estimations.quotation_sync.on_quotation_cancel",
+		"on_trash": "work_order_estimations.quotation_sync.on_quotation_cancel",
+	},
+	"Sales Order": {
+		"on_submit": "work_order_estimations.quotation_sync.on_sales_order_submit",
+		"on_cancel": "work_order_estimations.quotation_sync.on_sales_order_cancel",
+	},
+}
 
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"cron": {
+		"*/10 * * * *": [
+			"work_order_estimations.error_tracking.flush_error_summaries",
+		],
+	},
+	"daily_long": [
+		"work_order_estimations.archive.archive_old_estimations",
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"work_order_estimations.tasks.all"
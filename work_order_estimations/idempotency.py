@@ -0,0 +1,114 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import functools
+import inspect
+import time
+
+import frappe
+from frappe import _
+
+HEADER = "Idempotency-Key"
+
+# Results are replayed for retries within this window
+RESULT_TTL = 24 * 60 * 60
+# Upper bound on how long a crashed request can hold its key
+LOCK_TIMEOUT = 5 * 60
+# How long a duplicate waits for the original request before giving up
+WAIT_TIMEOUT = 15
+WAIT_INTERVAL = 0.25
+
+
+class IdempotencyConflict(frappe.ValidationError):
+    http_status_code = 409
+
+
+def get_idempotency_key(kwargs):
+    key = kwargs.pop("idempotency_key", None)
+    if not key and getattr(frappe.local, "request", None):
+        key = frappe.get_request_header(HEADER)
+    return key
+
+
+def get_cache_keys(endpoint, key):
+    scope = f"work_order_estimation_idempotency:{frappe.session.user}:{endpoint}:{key}"
+    return f"{scope}:result", f"{scope}:lock"
+
+
+def acquire_lock(lock_key):
+    return bool(frappe.cache.set(frappe.cache.make_key(lock_key), frappe.session.user, nx=True, ex=LOCK_TIMEOUT))
+
+
+def wait_for_result(result_key, lock_key):
+    """Poll for the stored result of the request holding the key
+
+    Returns None, with the lock now held, if that request failed without one.
+    """
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        stored = frappe.cache.get_value(result_key)
+        if stored is not None:
+            return stored
+        if acquire_lock(lock_key):
+            return None
+    frappe.throw(
+        _("A request with this idempotency key is still being processed. Please try again shortly."),
+        IdempotencyConflict,
+    )
+
+
+def idempotent(endpoint):
+    """Make a document-creating endpoint safe to retry
+
+    Callers send a unique key per user action, either as the `Idempotency-Key`
+    header or an `idempotency_key` argument. The first request with a key runs
+    and its result is kept for RESULT_TTL once its transaction commits;
+    retries get that result back without running again. A duplicate arriving
+    while the first is still running waits on a Redis lock instead of
+    executing in parallel. Calls without a key behave as before.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = get_idempotency_key(kwargs)
+            kwargs = frappe.get_newargs(fn, kwargs)
+            # Nested endpoints (e.g. create_quotation under convert_to_quotation) share the outer key
+            if not key or frappe.flags.in_idempotent_call:
+                return fn(*args, **kwargs)
+
+            result_key, lock_key = get_cache_keys(endpoint, key)
+            stored = frappe.cache.get_value(result_key)
+            if stored is None and not acquire_lock(lock_key):
+                stored = wait_for_result(result_key, lock_key)
+            if stored is not None:
+                return stored["result"]
+
+            def release():
+                frappe.cache.delete_value(lock_key)
+
+            def store():
+                # Wrapped so that endpoints returning None are replayed too
+                frappe.cache.set_value(result_key, {"result": result}, expires_in_sec=RESULT_TTL)
+                release()
+
+            frappe.flags.in_idempotent_call = True
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                release()
+                raise
+            finally:
+                frappe.flags.in_idempotent_call = False
+
+            # Only a committed result may be replayed; a rollback frees the key for a retry
+            frappe.db.after_commit.add(store)
+            frappe.db.after_rollback.add(release)
+            return result
+
+        # frappe.get_newargs follows __wrapped__ to fn's signature and would drop the key argument
+        wrapper.fnargs = [*inspect.signature(fn).parameters, "idempotency_key"]
+        return wrapper
+
+    return decorator
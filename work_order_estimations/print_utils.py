@@ -0,0 +1,120 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.utils import cint, flt, fmt_money, formatdate, get_number_format_info
+
+from work_order_estimations.costing.components import get_component_tree
+
+
+ADDON_DETAIL_FIELDS = {
+    "Wrapper": "wrapper_item",
+    "Color": "color_item",
+    "Handle": "handle_item",
+    "Add-on": "addon_item",
+}
+
+
+def get_estimation_print_context(doc):
+    """Build a flat, pre-formatted print context for a Work Order Estimation
+
+    Number format, currency and precision are resolved once per render instead
+    of once per field, and addons are grouped under their items in a single pass
+    so the template only has to loop and print strings.
+    """
+    # Costs are stored in the estimation currency, rates in each row's rate currency
+    currency = doc.get("currency") or frappe.db.get_default("currency")
+    number_format = frappe.db.get_default("number_format") or "#,###.##"
+    precision = cint(frappe.db.get_default("currency_precision")) or get_number_format_info(number_format)[2]
+
+    def money(value, value_precision=None, value_currency=None):
+        return fmt_money(flt(value), value_precision or precision, value_currency or currency, format=number_format)
+
+    def number(value, decimals):
+        # fmt_money without a currency, so numbers follow the same system number format
+        return fmt_money(flt(value), decimals, format=number_format)
+
+    # Group addons by the item code they belong to
+    addons_by_item = {}
+    for addon in doc.get("estimation_item_addons") or []:
+        addons_by_item.setdefault(addon.item, []).append({
+            "addon_type": addon.addon_type or "",
+            "item_name": addon.item_name or addon.item or "",
+            "detail": addon.get(ADDON_DETAIL_FIELDS.get(addon.addon_type)) or "",
+            "consumed_qty": number(addon.consumed_qty, 3),
+            "rate": money(addon.rate, value_currency=addon.rate_currency),
+            "amount": money(addon.amount),
+        })
+
+    items = []
+    total_quantity = 0
+    total_weight = 0
+    for row, depth in get_component_tree(doc).walk():
+        if not row.parent_component:
+            total_quantity += cint(row.quantity)
+        total_weight += flt(row.total_weight_kg)
+        items.append({
+            "idx": row.idx,
+            "depth": depth,
+            "item": row.item or "",
+            "paper_type": row.paper_type or "",
+            "quantity": number(row.quantity, 0),
+            "gsm": cint(row.gsm),
+            "size": "{} × {} cm".format(number(row.length_cm, 1), number(row.width_cm, 1)),
+            "finish": row.finish or "",
+            "waste_percentage": number(row.waste_percentage, 1),
+            "weight_per_piece_kg": number(row.weight_per_piece_kg, 6),
+            "net_weight_kg": number(row.net_weight_kg, 3),
+            "waste_kg": number(row.waste_kg, 3),
+            "total_weight_kg": number(row.total_weight_kg, 3),
+            "rate_per_kg": money(row.rate_per_kg, value_currency=row.rate_currency),
+            "cost_per_piece": money(row.cost_per_piece, 4),
+            "total_paper_cost": money(row.total_paper_cost),
+            "addon_cost": money(row.addon_cost),
+            "subtree_cost": money(row.subtree_cost),
+            # Attach each addon group to the first row of its item only
+            "addons": addons_by_item.pop(row.item, []),
+        })
+
+    processes = [
+        {
+            "idx": process.idx,
+            "process_type": process.process_type or "",
+            "workstation": process.workstation or "",
+            "workstation_type": process.workstation_type or "",
+            "details": process.details or "",
+            "rate": money(process.rate, value_currency=process.rate_currency),
+            "qty": number(process.qty, 2),
+            "total_cost": money(process.total_cost),
+        }
+        for process in doc.get("estimation_processes") or []
+    ]
+
+    # Addons whose item is no longer in the items table
+    unassigned_addons = [addon for group in addons_by_item.values() for addon in group]
+
+    return {
+        "name": doc.name,
+        "client_name": doc.client_name or "",
+        "project_name": doc.project_name or "",
+        "urgency_level": doc.urgency_level or "",
+        "status": doc.status or "",
+        "delivery_date": formatdate(doc.delivery_date) if doc.delivery_date else "",
+        "creation": formatdate(doc.creation) if doc.creation else "",
+        "printed_on": formatdate(frappe.utils.today()),
+        "items": items,
+        "processes": processes,
+        "unassigned_addons": unassigned_addons,
+        "totals": {
+            "quantity": number(total_quantity, 0),
+            "total_weight_kg": number(total_weight, 3),
+            "total_paper_cost": money(doc.total_paper_cost),
+            "total_addon_cost": money(doc.total_addon_cost),
+            "total_cost_for_operations": money(doc.total_cost_for_operations),
+            "total_cost": money(doc.total_cost),
+            "cost_per_unit": money(doc.cost_per_unit, 4),
+            "profit_margin": number(doc.profit_margin, 2),
+            "margin_amount": money(doc.margin_amount),
+            "sales_price": money(doc.sales_price),
+        },
+    }
@@ -0,0 +1,94 @@
+// Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+// For license information, please see license.txt
+
+// Estimator reference data (paper types with rates, workstation rates, reel sizes),
+// mirrored in IndexedDB and refreshed at desk startup, so forms open without lookups
+
+frappe.provide('work_order_estimations.reference');
+
+(function() {
+    const DB_NAME = 'work_order_estimations';
+    const STORE = 'reference_data';
+    const KEY = 'estimator';
+
+    function open_db() {
+        return new Promise((resolve, reject) => {
+            if (!window.indexedDB) {
+                reject(new Error('IndexedDB is not available'));
+                return;
+            }
+            const request = indexedDB.open(DB_NAME, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(STORE);
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    }
+
+    function run(mode, action) {
+        return open_db().then(db => new Promise((resolve, reject) => {
+            const request = action(db.transaction(STORE, mode).objectStore(STORE));
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        }));
+    }
+
+    // Several sites can share an origin, so the record is keyed by site
+    const record_key = () => `${KEY}:${frappe.boot.sitename || ''}`;
+
+    let loading = null;
+
+    Object.assign(work_order_estimations.reference, {
+        data: null,
+
+        load: function(refresh) {
+            if (loading && !refresh) {
+                return loading;
+            }
+            if (!frappe.boot.work_order_estimation_reference_version) {
+                // No access to estimations
+                return Promise.resolve(null);
+            }
+
+            loading = run('readonly', store => store.get(record_key()))
+                .catch(() => null)
+                .then(stored => {
+                    if (stored && !refresh && stored.version === frappe.boot.work_order_estimation_reference_version) {
+                        return stored;
+                    }
+                    // Only the version comes back while the mirror is still current
+                    return frappe.xcall('work_order_estimations.reference_data.get_reference_data', {
+                        version: stored ? stored.version : null
+                    }).then(fresh => {
+                        if (fresh.unchanged) {
+                            return stored;
+                        }
+                        run('readwrite', store => store.put(fresh, record_key())).catch(() => {});
+                        return fresh;
+                    });
+                })
+                .then(data => {
+                    this.data = data;
+                    return data;
+                })
+                .catch(() => {
+                    // Forms fall back to their own lookups
+                    loading = null;
+                    return null;
+                });
+            return loading;
+        },
+
+        get_paper: function(item_code) {
+            return ((this.data && this.data.papers) || {})[item_code] || null;
+        }
+    });
+
+    $(document).on('startup', function() {
+        work_order_estimations.reference.load();
+        // New versions are announced to the estimation doctype room only
+        frappe.realtime.doctype_subscribe('Work Order Estimation');
+        frappe.realtime.on('work_order_estimation_reference_version', function() {
+            work_order_estimations.reference.load(true);
+        });
+    });
+})();
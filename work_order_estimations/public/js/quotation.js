@@ -1,12 +1,7 @@
 frappe.ui.form.on("Quotation", {
 	refresh: function(frm) {
-		// Initialize quotation form
-		if (frm.doc.docstatus === 0) {
-			// Form is in draft mode
-			frm.add_custom_button(__('Calculate Total'), function() {
-				calculateQuotationTotal(frm);
-			});
-		}
+		// Totals, taxes and discounts are calculated by ERPNext on the server;
+		// the estimation's status and references are synced by doc_events
 		
 		// Show WOE reference if exists
 		if (frm.doc.custom_work_order_estimation_reference) {
@@ -34,23 +29,3 @@ frappe.ui.form.on("Quotation", {
 		}
 	}
 });
-
-function calculateQuotationTotal(frm) {
-	if (frm.doc.items && frm.doc.items.length > 0) {
-		let total = 0;
-		frm.doc.items.forEach(function(item) {
-			if (item.qty && item.rate) {
-				total += (item.qty * item.rate);
-			}
-		});
-		
-		frm.set_value('grand_total', total);
-		frm.set_value('total', total);
-		frm.refresh_field('grand_total');
-		frm.refresh_field('total');
-		
-		frappe.show_alert(__('Total calculated: {0}', [format_currency(total)]));
-	} else {
-		frappe.msgprint(__('Please add items to calculate total'));
-	}
-}
\ No newline at end of file
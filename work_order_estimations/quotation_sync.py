@@ -0,0 +1,171 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+
+from work_order_estimations.estimation_status import can_transition
+
+DOCTYPE = "Work Order Estimation"
+REFERENCE_FIELD = "custom_work_order_estimation_reference"
+
+SYNC_FIELDS = ("status", "quotation_reference", "sales_order_reference")
+
+
+def get_pending():
+    """Estimation updates queued in this transaction: name -> ordered list of operations"""
+    if frappe.flags.estimation_sync is None:
+        frappe.flags.estimation_sync = {}
+        frappe.db.before_commit.add(flush_estimation_updates)
+        frappe.db.after_rollback.add(clear_pending)
+    return frappe.flags.estimation_sync
+
+
+def clear_pending():
+    frappe.flags.estimation_sync = None
+
+
+def get_source(doc, method=None):
+    """(doctype, name, docstatus) the triggering document must still have at commit; None when deleted"""
+    return (doc.doctype, doc.name, None if method == "on_trash" else doc.docstatus)
+
+
+def queue_update(names, values=None, status=None, condition=None, source=None):
+    """Queue a change to linked estimations, applied once just before the transaction commits
+
+    `condition` maps fields to the values they must hold for the change to
+    apply, e.g. only clearing a reference that still points at this document.
+    `source` is the document whose event queued the change, from get_source;
+    the change is dropped if a savepoint rollback undid that event.
+    """
+    pending = get_pending()
+    for name in names:
+        if name:
+            pending.setdefault(name, []).append((values or {}, status, condition or {}, source))
+
+
+def get_live_sources(pending):
+    """Sources whose event survived: they still exist at least at the docstatus they had, or are still gone
+
+    A later submit in the same transaction only raises the docstatus, while
+    a rolled back insert, submit or cancel leaves it missing or lower.
+    """
+    sources = {source for operations in pending.values() for *_args, source in operations if source}
+    names = {}
+    for doctype, name, docstatus in sources:
+        names.setdefault(doctype, set()).add(name)
+
+    current = {}
+    for doctype, doctype_names in names.items():
+        for name, docstatus in frappe.get_all(
+            doctype, filters={"name": ["in", list(doctype_names)]}, fields=["name", "docstatus"], as_list=True
+        ):
+            current[(doctype, name)] = docstatus
+
+    def survived(doctype, name, docstatus):
+        if docstatus is None:
+            return (doctype, name) not in current
+        return current.get((doctype, name), -1) >= docstatus
+
+    return {source for source in sources if survived(*source)}
+
+
+def replay_operations(row, operations, live_sources):
+    """Sync field values after applying `operations` in order to the estimation's current values"""
+    state = {field: row.get(field) for field in SYNC_FIELDS}
+    for values, status, condition, source in operations:
+        if source and source not in live_sources:
+            continue
+        if any(state.get(field) != expected for field, expected in condition.items()):
+            continue
+        state.update(values)
+        if status and state["status"] != status and can_transition(state["status"], status):
+            state["status"] = status
+    return state
+
+
+def flush_estimation_updates():
+    """Apply all queued operations with one read and one UPDATE per distinct change
+
+    Operations are replayed in order against the current values, so cancelling
+    a quotation and inserting its amendment in the same transaction leaves the
+    estimation pointing at the amendment. Status changes the state machine
+    does not allow are skipped; reference updates still apply. Operations
+    whose source event was undone by a savepoint rollback are dropped.
+    """
+    pending = frappe.flags.estimation_sync
+    clear_pending()
+    if not pending:
+        return
+
+    current = {
+        row.name: row
+        for row in frappe.get_all(
+            DOCTYPE, filters={"name": ["in", list(pending)]}, fields=["name", *SYNC_FIELDS]
+        )
+    }
+
+    live_sources = get_live_sources(pending)
+    groups = {}
+    for name, operations in pending.items():
+        row = current.get(name)
+        if not row:
+            continue
+
+        state = replay_operations(row, operations, live_sources)
+        changes = tuple(sorted((field, value) for field, value in state.items() if row.get(field) != value))
+        if changes:
+            groups.setdefault(changes, []).append(name)
+
+    for changes, names in groups.items():
+        frappe.db.set_value(DOCTYPE, {"name": ["in", names]}, dict(changes))
+
+
+def on_quotation_insert(doc, method=None):
+    """doc_event: a new or amended quotation becomes the estimation's quotation"""
+    name = doc.get(REFERENCE_FIELD)
+    queue_update([name], {"quotation_reference": doc.name}, status="Quotation Created", source=get_source(doc, method))
+
+
+def on_quotation_submit(doc, method=None):
+    """doc_event: a submitted quotation has been sent to the client"""
+    queue_update(
+        [doc.get(REFERENCE_FIELD)],
+        {"quotation_reference": doc.name},
+        status="Sent",
+        source=get_source(doc, method),
+    )
+
+
+def on_quotation_cancel(doc, method=None):
+    """doc_event: release the estimation when its quotation is cancelled or deleted"""
+    queue_update(
+        [doc.get(REFERENCE_FIELD)],
+        {"quotation_reference": None},
+        status="Estimation Done",
+        condition={"quotation_reference": doc.name},
+        source=get_source(doc, method),
+    )
+
+
+def get_quotations(sales_order):
+    return list({row.prevdoc_docname for row in sales_order.get("items") or [] if row.get("prevdoc_docname")})
+
+
+def on_sales_order_submit(doc, method=None):
+    """doc_event: link the sales order to the estimations of the quotations it was made from"""
+    quotations = get_quotations(doc)
+    if not quotations:
+        return
+    names = frappe.get_all(DOCTYPE, filters={"quotation_reference": ["in", quotations]}, pluck="name")
+    queue_update(names, {"sales_order_reference": doc.name}, source=get_source(doc, method))
+
+
+def on_sales_order_cancel(doc, method=None):
+    """doc_event: drop the sales order reference from linked estimations"""
+    names = frappe.get_all(DOCTYPE, filters={"sales_order_reference": doc.name}, pluck="name")
+    queue_update(
+        names,
+        {"sales_order_reference": None},
+        condition={"sales_order_reference": doc.name},
+        source=get_source(doc, method),
+    )
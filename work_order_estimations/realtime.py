@@ -0,0 +1,82 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model import no_value_fields
+
+DELTA_EVENT = "work_order_estimation_delta"
+
+CHILD_TABLES = ("estimation_items", "estimation_item_addons", "estimation_processes")
+
+TOTAL_FIELDS = (
+    "status",
+    "total_paper_cost",
+    "total_addon_cost",
+    "total_cost_for_operations",
+    "total_cost",
+    "cost_per_unit",
+    "margin_amount",
+    "sales_price",
+    "quotation_reference",
+)
+
+
+def get_row_values(row):
+    """Field values of a child row, keyed by fieldname, ready for JSON"""
+    values = {"name": row.name, "idx": row.idx}
+    for df in row.meta.get("fields"):
+        if df.fieldtype not in no_value_fields:
+            values[df.fieldname] = row.get(df.fieldname)
+    return values
+
+
+def get_changed_parent_values(doc, before=None):
+    """The totals, and every other parent field whose value differs from `before`"""
+    values = {fieldname: doc.get(fieldname) for fieldname in TOTAL_FIELDS}
+    for df in doc.meta.get("fields"):
+        if df.fieldtype not in no_value_fields and (not before or before.get(df.fieldname) != doc.get(df.fieldname)):
+            values[df.fieldname] = doc.get(df.fieldname)
+    return values
+
+
+def get_estimation_delta(doc, before=None):
+    """Rows added or changed since `before`, removed row names and the changed parent values
+
+    `previous_modified` is the timestamp the delta applies on top of; a form
+    loaded at any other version cannot be patched with it.
+    """
+    delta = {
+        "name": doc.name,
+        "modified": doc.modified,
+        "previous_modified": before.modified if before else None,
+        "rows": {},
+        "removed": {},
+        "values": get_changed_parent_values(doc, before),
+    }
+
+    for table in CHILD_TABLES:
+        previous = {row.name: get_row_values(row) for row in (before.get(table) if before else [])}
+        changed = []
+        for row in doc.get(table) or []:
+            values = get_row_values(row)
+            if previous.pop(row.name, None) != values:
+                changed.append(values)
+        if changed:
+            delta["rows"][table] = changed
+        if previous:
+            delta["removed"][table] = list(previous)
+
+    return delta
+
+
+def publish_estimation_delta(doc, before=None):
+    """Push the estimation delta to everyone viewing the document, once the transaction commits"""
+    delta = get_estimation_delta(doc, before)
+    frappe.publish_realtime(
+        DELTA_EVENT,
+        delta,
+        doctype=doc.doctype,
+        docname=doc.name,
+        after_commit=True,
+    )
+    return delta
@@ -0,0 +1,199 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import time
+from contextlib import suppress
+
+import frappe
+from frappe.utils import cint
+from redis.exceptions import LockError
+
+from work_order_estimations.cache_utils import decode, redis_key
+from work_order_estimations.costing.addons import get_buying_price_list, get_item_rates
+from work_order_estimations.costing.currency import get_default_currency
+from work_order_estimations.costing.processes import get_workstation_details
+from work_order_estimations.costing.reel import get_stocked_reel_sizes
+
+DOCTYPE = "Work Order Estimation"
+
+REFERENCE_CACHE_KEY = "work_order_estimation_reference_data"
+GENERATION_KEY = "work_order_estimation_reference_data:generation"
+PAPER_CODES_KEY = "work_order_estimation_reference_data:papers"
+REBUILD_LOCK_KEY = "work_order_estimation_reference_data:lock"
+VERSION_EVENT = "work_order_estimation_reference_version"
+
+# The most used paper types are preloaded; others are looked up when picked
+MAX_PAPER_TYPES = 500
+# Stock movements change valuation rates without an event, so the data is rebuilt at least this often
+REFERENCE_TTL = 6 * 60 * 60
+# Outdated data is served while one worker rebuilds it, for at most this long
+STALE_TTL = 4 * REFERENCE_TTL
+# A rebuild holding the lock longer than this is presumed dead
+REBUILD_TIMEOUT = 120
+
+
+def get_paper_usage():
+    """{paper type: [(gsm, finish, uses)]}, most used paper types first"""
+    usage = {}
+    for paper, gsm, finish, uses in frappe.db.sql(
+        """select paper_type, gsm, finish, count(*) as uses
+        from `tabWork Order Estimation Item`
+        where ifnull(paper_type, '') != ''
+        group by paper_type, gsm, finish
+        order by uses desc"""
+    ):
+        usage.setdefault(paper, []).append((gsm, finish, uses))
+
+    ranked = sorted(usage, key=lambda paper: -sum(uses for gsm, finish, uses in usage[paper]))
+    return {paper: usage[paper] for paper in ranked[:MAX_PAPER_TYPES]}
+
+
+def build_reference_data(version, generation=0):
+    """Paper types with rates and usual GSM / finish, workstation rates and reel sizes in one structure
+
+    Built from the same batched lookups the cost calculation uses, so
+    building it also warms their caches.
+    """
+    usage = get_paper_usage()
+    reel_papers = frappe.get_all("Paper Reel Size", filters={"disabled": 0}, pluck="paper_type", distinct=True)
+    paper_codes = list(dict.fromkeys([*usage, *reel_papers]))
+
+    item_names = dict(
+        frappe.get_all("Item", filters={"name": ["in", paper_codes]}, fields=["name", "item_name"], as_list=True)
+    ) if paper_codes else {}
+    rates = get_item_rates(paper_codes)
+
+    papers = {}
+    for code in paper_codes:
+        rows = usage.get(code) or []
+        papers[code] = {
+            "item_name": item_names.get(code) or code,
+            "rate": rates.get(code) or 0,
+            # Distinct GSMs in order of use; the finish most used with the paper
+            "gsm": list(dict.fromkeys(gsm for gsm, finish, uses in rows if gsm)),
+            "finish": next((finish for gsm, finish, uses in rows if finish), None),
+        }
+
+    return {
+        "version": version,
+        "generation": generation,
+        "built_at": time.time(),
+        "currency": get_default_currency(),
+        "price_list": get_buying_price_list(),
+        "papers": papers,
+        "workstations": get_workstation_details(frappe.get_all("Workstation", pluck="name")),
+        "reel_sizes": {
+            paper: [[size.name, size.reel_width_cm, size.reel_length_m] for size in sizes]
+            for paper, sizes in get_stocked_reel_sizes(reel_papers).items()
+            if sizes
+        },
+    }
+
+
+def get_generation():
+    """Counter bumped by every invalidation; data built for an older one is outdated"""
+    return cint(decode(frappe.cache.get(redis_key(GENERATION_KEY))))
+
+
+def is_current(data, generation):
+    return bool(
+        data and data.get("generation") == generation and time.time() - data.get("built_at", 0) < REFERENCE_TTL
+    )
+
+
+def store_reference_data(data):
+    # Paper codes go in a set of their own so document hooks can check them without loading the data
+    paper_codes = redis_key(PAPER_CODES_KEY)
+    pipeline = frappe.cache.pipeline(transaction=True)
+    pipeline.delete(paper_codes)
+    if data["papers"]:
+        pipeline.sadd(paper_codes, *data["papers"])
+        pipeline.expire(paper_codes, STALE_TTL)
+    pipeline.execute()
+    frappe.cache.set_value(REFERENCE_CACHE_KEY, data, expires_in_sec=STALE_TTL)
+
+
+def rebuild_reference_data():
+    """Build and store the data under a new version, then tell open desks to refresh their mirror"""
+    data = build_reference_data(frappe.generate_hash(length=10), get_generation())
+    store_reference_data(data)
+    # Only to desks subscribed to estimations, which the socket server checks for read access
+    frappe.publish_realtime(VERSION_EVENT, {"version": data["version"]}, doctype=DOCTYPE)
+    return data
+
+
+def get_cached_reference_data():
+    """Reference data shared by all workers, rebuilt under a new version after invalidation or expiry
+
+    One worker rebuilds outdated data under a lock while the others keep
+    serving the previous copy. Only when there is no copy at all do they wait
+    for the rebuild.
+    """
+    data = frappe.cache.get_value(REFERENCE_CACHE_KEY, expires=True)
+    if is_current(data, get_generation()):
+        return data
+
+    lock = frappe.cache.lock(redis_key(REBUILD_LOCK_KEY), timeout=REBUILD_TIMEOUT)
+    if not lock.acquire(blocking=not data, blocking_timeout=REBUILD_TIMEOUT):
+        return data or rebuild_reference_data()
+    try:
+        # Another worker may have rebuilt it while this one waited
+        data = frappe.cache.get_value(REFERENCE_CACHE_KEY, expires=True)
+        if not is_current(data, get_generation()):
+            data = rebuild_reference_data()
+    finally:
+        with suppress(LockError):
+            lock.release()
+    return data
+
+
+def invalidate_reference_data():
+    """Mark the shared data outdated and rebuild it in the background once the change is committed
+
+    Desks keep the previous copy until the rebuild announces the new version.
+    """
+    generation = redis_key(GENERATION_KEY)
+    frappe.cache.incr(generation)
+    # Again after commit, in case another worker rebuilt from the uncommitted state meanwhile
+    frappe.db.after_commit.add(lambda: frappe.cache.incr(generation))
+    frappe.enqueue(
+        "work_order_estimations.reference_data.get_cached_reference_data",
+        queue="short",
+        job_id="work_order_estimation_reference_rebuild",
+        deduplicate=True,
+        enqueue_after_commit=True,
+    )
+
+
+def is_cached_paper(item_code):
+    # The cache wrapper prefixes set keys itself
+    return bool(frappe.cache.sismember(PAPER_CODES_KEY, item_code))
+
+
+def on_reference_change(doc=None, method=None):
+    """doc_event: invalidate when a workstation, or the price or name of a preloaded paper type, changes"""
+    if doc.doctype == "Item Price":
+        if doc.buying and is_cached_paper(doc.item_code):
+            invalidate_reference_data()
+    elif doc.doctype == "Item":
+        if is_cached_paper(doc.name):
+            invalidate_reference_data()
+    else:
+        invalidate_reference_data()
+
+
+def boot_session(bootinfo):
+    """Warm the shared reference cache at login and give the desk its version"""
+    if frappe.session.user == "Guest" or not frappe.has_permission(DOCTYPE, "read"):
+        return
+    bootinfo.work_order_estimation_reference_version = get_cached_reference_data()["version"]
+
+
+@frappe.whitelist()
+def get_reference_data(version=None):
+    """Estimator reference data for the client mirror; only the version when `version` is current"""
+    frappe.has_permission(DOCTYPE, "read", throw=True)
+    data = get_cached_reference_data()
+    if version and version == data["version"]:
+        return {"version": version, "unchanged": True}
+    return data
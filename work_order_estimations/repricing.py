@@ -0,0 +1,100 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe.utils import cint, getdate, today
+
+from work_order_estimations.error_tracking import record_error
+
+DOCTYPE = "Work Order Estimation"
+REPRICE_EVENT = "work_order_estimation_reprice"
+
+# Estimations past these are already quoted and keep their prices
+OPEN_STATUSES = ("Draft", "Estimation Done")
+
+ROW_TABLES = ("Work Order Estimation Item", "Estimation Process", "Work Order Estimation Item Addon")
+
+
+def get_estimations_to_reprice(currency=None, estimations=None):
+    """Open, live estimations with a row priced in `currency`, or in any currency other than their own
+
+    When `estimations` are named and no currency is given, all of the open
+    ones are returned.
+    """
+    values = {"statuses": OPEN_STATUSES, "doctype": DOCTYPE, "currency": currency, "estimations": estimations}
+    conditions = ["e.status in %(statuses)s", "e.is_archived = 0"]
+    if estimations:
+        conditions.append("e.name in %(estimations)s")
+
+    if currency or not estimations:
+        if currency:
+            row_condition = "row.rate_currency = %(currency)s"
+        else:
+            row_condition = "ifnull(row.rate_currency, '') not in ('', ifnull(e.currency, ''))"
+        conditions.append("({})".format(" or ".join(
+            f"""exists (select 1 from `tab{doctype}` row
+                where row.parent = e.name and row.parenttype = %(doctype)s and {row_condition})"""
+            for doctype in ROW_TABLES
+        )))
+
+    return frappe.db.sql_list(
+        "select e.name from `tabWork Order Estimation` e where {} order by e.modified".format(" and ".join(conditions)),
+        values,
+    )
+
+
+def reprice_estimations(names, exchange_rate_date=None, user=None):
+    """Background job: recalculate estimations at the exchange rates of `exchange_rate_date`
+
+    The sales price follows the new costs and the margin. Each estimation is
+    saved and committed on its own, so one that fails validation does not
+    hold back the rest.
+    """
+    exchange_rate_date = exchange_rate_date or today()
+    repriced, failed = [], []
+    for name in names:
+        try:
+            doc = frappe.get_doc(DOCTYPE, name)
+            doc.exchange_rate_date = exchange_rate_date
+            # Margin drives the sales price again, as when a copy is repriced
+            doc.sales_price = None
+            doc.save()
+            frappe.db.commit()
+            repriced.append(name)
+        except Exception:
+            frappe.db.rollback()
+            record_error("reprice_estimations", f"Repricing failed for {name}")
+            failed.append(name)
+
+    result = {"exchange_rate_date": str(getdate(exchange_rate_date)), "repriced": repriced, "failed": failed}
+    frappe.publish_realtime(REPRICE_EVENT, result, user=user)
+    return result
+
+
+@frappe.whitelist()
+def start_repricing(currency=None, estimations=None, exchange_rate_date=None):
+    """Queue repricing of open estimations after exchange rates moved
+
+    Without arguments every open estimation with a row in a foreign
+    currency is repriced at today's rates. The user is notified through the
+    `work_order_estimation_reprice` realtime event.
+    """
+    frappe.has_permission(DOCTYPE, "write", throw=True)
+    if isinstance(estimations, str):
+        estimations = json.loads(estimations)
+
+    names = get_estimations_to_reprice(currency, estimations)
+    if not names:
+        return {"count": 0}
+
+    job = frappe.enqueue(
+        "work_order_estimations.repricing.reprice_estimations",
+        queue="long",
+        timeout=cint(frappe.conf.get("estimation_reprice_timeout")) or 3600,
+        names=names,
+        exchange_rate_date=exchange_rate_date,
+        user=frappe.session.user,
+    )
+    return {"job_id": job.id if job else None, "count": len(names)}
@@ -0,0 +1,329 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+from frappe import _
+from frappe.model import no_value_fields, table_fields
+from frappe.utils import cint, flt
+
+from work_order_estimations.archive import get_archived_snapshots
+from work_order_estimations.realtime import CHILD_TABLES, get_row_values
+
+DOCTYPE = "Work Order Estimation"
+REVISION_DOCTYPE = "Work Order Estimation Revision"
+
+# Every n-th revision stores the full estimation so reconstruction never
+# replays more than this many deltas
+SNAPSHOT_INTERVAL = 10
+
+# Child rows are matched across estimations on these fields
+ROW_KEYS = {
+    "estimation_items": ("item", "component_code", "paper_type"),
+    "estimation_item_addons": ("item", "addon_type", "addon_item"),
+    "estimation_processes": ("process_type", "workstation", "applies_to_item"),
+}
+
+COMPARE_FIELDS = {
+    "estimation_items": ("quantity", "total_weight_kg", "rate_per_kg", "total_paper_cost", "addon_cost"),
+    "estimation_item_addons": ("consumed_qty", "rate", "amount"),
+    "estimation_processes": ("qty", "rate", "total_hours", "total_cost"),
+}
+
+COST_FIELDS = {
+    "estimation_items": "total_paper_cost",
+    "estimation_item_addons": "amount",
+    "estimation_processes": "total_cost",
+}
+
+TOTAL_FIELDS = (
+    "total_paper_cost",
+    "total_addon_cost",
+    "total_cost_for_operations",
+    "total_cost",
+    "cost_per_unit",
+    "margin_amount",
+    "sales_price",
+)
+
+
+def normalize(values):
+    """Round-trip through JSON so dates and decimals compare like stored values"""
+    return json.loads(frappe.as_json(values, indent=None))
+
+
+def get_state(doc):
+    """Parent field values and child rows keyed by row name"""
+    parent = {
+        df.fieldname: doc.get(df.fieldname)
+        for df in doc.meta.get("fields")
+        if df.fieldtype not in no_value_fields and df.fieldtype not in table_fields
+    }
+    tables = {table: {row.name: get_row_values(row) for row in doc.get(table) or []} for table in CHILD_TABLES}
+    return normalize({"parent": parent, "tables": tables})
+
+
+def diff_states(old, new):
+    """Changed parent fields plus added, changed and removed rows
+
+    Changed rows carry only the fields that differ, so a delta grows with the
+    edit rather than with the size of the estimation.
+    """
+    delta = {"parent": {}, "tables": {}}
+    for fieldname, value in new["parent"].items():
+        if old["parent"].get(fieldname) != value:
+            delta["parent"][fieldname] = value
+
+    for table, rows in new["tables"].items():
+        previous = old["tables"].get(table, {})
+        added = {name: row for name, row in rows.items() if name not in previous}
+        changed = {}
+        for name, row in rows.items():
+            if name in previous:
+                fields = {f: v for f, v in row.items() if previous[name].get(f) != v}
+                if fields:
+                    changed[name] = fields
+        removed = [name for name in previous if name not in rows]
+
+        entry = {key: value for key, value in (("added", added), ("changed", changed), ("removed", removed)) if value}
+        if entry:
+            delta["tables"][table] = entry
+
+    return delta
+
+
+def apply_delta(state, delta):
+    """Roll a state forward by one delta, in place"""
+    state["parent"].update(delta.get("parent", {}))
+    for table, entry in delta.get("tables", {}).items():
+        rows = state["tables"].setdefault(table, {})
+        rows.update(entry.get("added", {}))
+        for name, fields in entry.get("changed", {}).items():
+            rows.setdefault(name, {}).update(fields)
+        for name in entry.get("removed", []):
+            rows.pop(name, None)
+    return state
+
+
+def count_changed_rows(delta):
+    return sum(
+        len(entry.get("added", {})) + len(entry.get("changed", {})) + len(entry.get("removed", []))
+        for entry in delta["tables"].values()
+    )
+
+
+def empty_state():
+    return {"parent": {}, "tables": {table: {} for table in CHILD_TABLES}}
+
+
+def get_latest_revision_no(estimation):
+    return cint(
+        frappe.db.get_value(REVISION_DOCTYPE, {"estimation": estimation}, "max(revision_no)")
+    )
+
+
+def load_revision_state(estimation, revision_no):
+    """Rebuild an estimation as it was at `revision_no`
+
+    Starts from the closest snapshot at or before the revision and replays the
+    deltas after it: two queries whatever the revision number.
+    """
+    revision_no = cint(revision_no)
+    snapshot_no = frappe.db.get_value(
+        REVISION_DOCTYPE,
+        {"estimation": estimation, "is_snapshot": 1, "revision_no": ["<=", revision_no]},
+        "max(revision_no)",
+    )
+    if not snapshot_no:
+        frappe.throw(_("Revision {0} of {1} does not exist").format(revision_no, estimation))
+
+    revisions = frappe.get_all(
+        REVISION_DOCTYPE,
+        filters={"estimation": estimation, "revision_no": ["between", [snapshot_no, revision_no]]},
+        fields=["revision_no", "delta"],
+        order_by="revision_no asc",
+    )
+    if not revisions or revisions[-1].revision_no != revision_no:
+        frappe.throw(_("Revision {0} of {1} does not exist").format(revision_no, estimation))
+
+    state = empty_state()
+    for revision in revisions:
+        delta = revision.delta
+        apply_delta(state, json.loads(delta) if isinstance(delta, str) else delta)
+    return state
+
+
+def create_revision(doc, note=None):
+    """Record the estimation's current values as its next revision"""
+    latest = get_latest_revision_no(doc.name)
+    revision_no = latest + 1
+    is_snapshot = latest == 0 or (revision_no - 1) % SNAPSHOT_INTERVAL == 0
+
+    state = get_state(doc)
+    previous = empty_state() if is_snapshot else load_revision_state(doc.name, latest)
+    delta = diff_states(previous, state)
+
+    if not is_snapshot and not delta["parent"] and not delta["tables"]:
+        frappe.throw(_("{0} has not changed since revision {1}").format(doc.name, latest))
+
+    revision = frappe.get_doc(
+        {
+            "doctype": REVISION_DOCTYPE,
+            "estimation": doc.name,
+            "revision_no": revision_no,
+            "is_snapshot": cint(is_snapshot),
+            "total_cost": doc.total_cost,
+            "changed_rows": count_changed_rows(delta),
+            "note": note,
+            "delta": frappe.as_json(delta, indent=None),
+        }
+    )
+    revision.insert()
+    return revision
+
+
+def parse_reference(reference):
+    """`EST-0001` is the current estimation, `EST-0001@3` its revision 3"""
+    name, _sep, revision_no = str(reference).partition("@")
+    return name, cint(revision_no) or None
+
+
+def get_current_states(names):
+    """Current parent totals and cost rows of many estimations, one query per table
+
+    Archived estimations have no live rows; theirs come from the archive snapshots.
+    """
+    states = {name: {"parent": {}, "tables": {table: {} for table in CHILD_TABLES}} for name in names}
+    if not names:
+        return states
+
+    archived = []
+    for row in frappe.get_all(
+        DOCTYPE, filters={"name": ["in", names]}, fields=["name", "modified", "is_archived", *TOTAL_FIELDS]
+    ):
+        states[row.name]["parent"] = row
+        if row.is_archived:
+            archived.append(row.name)
+
+    for name, snapshot in get_archived_snapshots(archived).items():
+        for table in CHILD_TABLES:
+            fields = ["name", "parent", "idx", *ROW_KEYS[table], *COMPARE_FIELDS[table]]
+            for row in snapshot.get(table) or []:
+                states[name]["tables"][table][row["name"]] = frappe._dict({field: row.get(field) for field in fields})
+
+    meta = frappe.get_meta(DOCTYPE)
+    for table in CHILD_TABLES:
+        child_doctype = meta.get_field(table).options
+        fields = ["name", "parent", "idx", *ROW_KEYS[table], *COMPARE_FIELDS[table]]
+        for row in frappe.get_all(
+            child_doctype,
+            filters={"parent": ["in", names], "parenttype": DOCTYPE, "parentfield": table},
+            fields=fields,
+            order_by="idx asc",
+        ):
+            states[row.parent]["tables"][table][row.name] = row
+
+    return states
+
+
+def keyed_rows(table, rows):
+    """Rows keyed by their matching fields, numbering repeats so duplicates stay apart"""
+    keyed, seen = {}, {}
+    for row in sorted(rows.values(), key=lambda r: cint(r.get("idx"))):
+        base = tuple(row.get(field) or "" for field in ROW_KEYS[table])
+        seen[base] = seen.get(base, 0) + 1
+        keyed[(*base, seen[base])] = row
+    return keyed
+
+
+def compare_states(references, states):
+    """Line up totals and rows of several states, with the change from the first to the last"""
+    result = {"references": references, "totals": {}, "tables": {}}
+    for reference in references:
+        parent = states[reference]["parent"]
+        result["totals"][reference] = {field: flt(parent.get(field)) for field in TOTAL_FIELDS}
+
+    for table in CHILD_TABLES:
+        columns = {reference: keyed_rows(table, states[reference]["tables"].get(table, {})) for reference in references}
+        keys = []
+        for reference in references:
+            keys.extend(key for key in columns[reference] if key not in keys)
+
+        rows = []
+        for key in keys:
+            values = {
+                reference: (
+                    {field: flt(columns[reference][key].get(field)) for field in COMPARE_FIELDS[table]}
+                    if key in columns[reference]
+                    else None
+                )
+                for reference in references
+            }
+            cost_field = COST_FIELDS[table]
+            first, last = values[references[0]], values[references[-1]]
+            rows.append(
+                {
+                    "key": dict(zip(ROW_KEYS[table], key)),
+                    "values": values,
+                    "difference": flt((last or {}).get(cost_field)) - flt((first or {}).get(cost_field)),
+                }
+            )
+        result["tables"][table] = rows
+
+    return result
+
+
+@frappe.whitelist()
+def make_revision(estimation, note=None):
+    """Store the current state of an estimation as a new revision"""
+    doc = frappe.get_doc(DOCTYPE, estimation)
+    doc.check_permission("write")
+    revision = create_revision(doc, note)
+    return {"success": True, "name": revision.name, "revision_no": revision.revision_no}
+
+
+@frappe.whitelist()
+def get_revision(estimation, revision_no):
+    """An estimation's parent values and child rows as they were at one revision"""
+    frappe.get_doc(DOCTYPE, estimation).check_permission("read")
+    return load_revision_state(estimation, revision_no)
+
+
+@frappe.whitelist()
+def compare_revisions(references):
+    """Compare two or more estimations or revisions side by side, row by row
+
+    `references` is a list of estimation names, optionally suffixed with
+    `@<revision_no>`. Current estimations are loaded together with one query
+    per child table; revisions are rebuilt from their nearest snapshot.
+    """
+    if isinstance(references, str):
+        references = json.loads(references)
+    references = list(dict.fromkeys(references or []))
+    if len(references) < 2:
+        frappe.throw(_("Select at least two estimations or revisions to compare"))
+
+    parsed = {reference: parse_reference(reference) for reference in references}
+    for name in {name for name, _revision in parsed.values()}:
+        if not frappe.has_permission(DOCTYPE, "read", name):
+            frappe.throw(_("Not permitted to read {0}").format(name), frappe.PermissionError)
+
+    current = get_current_states([name for name, revision_no in parsed.values() if not revision_no])
+    states = {}
+    for reference, (name, revision_no) in parsed.items():
+        states[reference] = load_revision_state(name, revision_no) if revision_no else current[name]
+
+    return compare_states(references, states)
+
+
+@frappe.whitelist()
+def get_revisions(estimation):
+    """Revision history of an estimation, newest first"""
+    frappe.get_doc(DOCTYPE, estimation).check_permission("read")
+    return frappe.get_all(
+        REVISION_DOCTYPE,
+        filters={"estimation": estimation},
+        fields=["name", "revision_no", "is_snapshot", "total_cost", "changed_rows", "note", "owner", "creation"],
+        order_by="revision_no desc",
+    )
@@ -5,22 +5,25 @@ frappe.ui.form.on('Estimation Process', {
     workstation: function(frm, cdt, cdn) {
         let row = locals[cdt][cdn];
         if (row.workstation) {
-            frappe.call({
-                method: 'frappe.client.get_value',
-                args: {
-                    doctype: 'Workstation',
-                    filters: { name: row.workstation },
-                    fieldname: 'workstation_type'
-                },
-                callback: function(r) {
-                    if (r.message && r.message.workstation_type) {
-                        frappe.model.set_value(cdt, cdn, 'workstation_type', r.message.workstation_type);
-                    }
-                }
+            // Rates of all workstations are cached on the form, so only unseen ones hit the server
+            load_workstation_rates(frm, [row.workstation]).then(() => {
+                calculate_total_cost(frm, cdt, cdn);
             });
         }
     },
     
+    costing_method: function(frm, cdt, cdn) {
+        calculate_total_cost(frm, cdt, cdn);
+    },
+    
+    setup_time_mins: function(frm, cdt, cdn) {
+        calculate_total_cost(frm, cdt, cdn);
+    },
+    
+    units_per_hour: function(frm, cdt, cdn) {
+        calculate_total_cost(frm, cdt, cdn);
+    },
+    
     rate: function(frm, cdt, cdn) {
         calculate_total_cost(frm, cdt, cdn);
     },
@@ -37,6 +40,12 @@ frappe.ui.form.on('Estimation Process', {
 
 // Handle child table row events
 frappe.ui.form.on('Work Order Estimation', {
+    onload_post_render: function(frm) {
+        // Load hour rates of every workstation used in this estimation with one call
+        const workstations = (frm.doc.estimation_processes || []).map(row => row.workstation);
+        load_workstation_rates(frm, workstations);
+    },
+    
     estimation_processes_add: function(frm, cdt, cdn) {
         // Recalculate operations cost when processes are added
         setTimeout(() => {
@@ -52,15 +61,53 @@ frappe.ui.form.on('Work Order Estimation', {
     }
 });
 
+function load_workstation_rates(frm, workstations) {
+    // Seeded from the reference mirror; only workstations added since it was built hit the server
+    return work_order_estimations.reference.load().then(reference => {
+        frm.workstation_rates = frm.workstation_rates || Object.assign({}, (reference && reference.workstations) || {});
+        const missing = [...new Set(workstations.filter(name => name && !(name in frm.workstation_rates)))];
+        if (!missing.length) {
+            return frm.workstation_rates;
+        }
+        
+        return frappe.xcall('work_order_estimations.costing.processes.get_workstation_rates', {
+            workstations: missing
+        }).then(rates => {
+            Object.assign(frm.workstation_rates, rates || {});
+            return frm.workstation_rates;
+        });
+    });
+}
+
+function is_hour_rate_costed(row) {
+    return (row.costing_method || 'Hour Rate') === 'Hour Rate'
+        && (flt(row.setup_time_mins) > 0 || flt(row.units_per_hour) > 0);
+}
+
 function calculate_total_cost(frm, cdt, cdn) {
     let row = locals[cdt][cdn];
-    if (row.rate && row.qty) {
-        let total_cost = flt(row.rate) * flt(row.qty);
-        frappe.model.set_value(cdt, cdn, 'total_cost', total_cost);
-        
-        // Update parent's total operations cost
-        update_parent_operations_cost(frm);
+    const details = (frm.workstation_rates || {})[row.workstation];
+    if (details) {
+        row.hour_rate = flt(details.hour_rate);
+        row.workstation_type = details.workstation_type || row.workstation_type;
     }
+    
+    // Same setup + run time model as costing/processes.py, evaluated locally;
+    // the exchange rate of a changed rate currency is resolved on save
+    const exchange_rate = flt(row.exchange_rate) || 1;
+    if (is_hour_rate_costed(row)) {
+        const run_hours = flt(row.units_per_hour) > 0 ? flt(row.qty) / flt(row.units_per_hour) : 0;
+        row.total_hours = flt(row.setup_time_mins) / 60 + run_hours;
+        const cost = row.total_hours * flt(row.hour_rate);
+        row.rate = flt(row.qty) ? cost / flt(row.qty) : cost;
+        row.total_cost = cost * exchange_rate;
+    } else {
+        row.total_hours = 0;
+        row.total_cost = flt(row.rate) * flt(row.qty) * exchange_rate;
+    }
+    
+    frm.refresh_field('estimation_processes');
+    update_parent_operations_cost(frm);
 }
 
 function update_parent_operations_cost(frm) {
@@ -77,13 +124,16 @@ function update_parent_operations_cost(frm) {
     // Update the parent field
     frm.set_value('total_cost_for_operations', total_operations_cost);
     
-    // Update total cost (paper + operations)
+    // Update total cost (paper + addons + operations)
     let total_paper_cost = flt(frm.doc.total_paper_cost) || 0;
-    let total_cost = total_paper_cost + total_operations_cost;
+    let total_addon_cost = flt(frm.doc.total_addon_cost) || 0;
+    let total_cost = total_paper_cost + total_addon_cost + total_operations_cost;
     frm.set_value('total_cost', total_cost);
     
-    // Update cost per unit
-    let quantity = flt(frm.doc.quantity) || 0;
+    // Update cost per unit; component parts are not units of the product, as on the server
+    let quantity = (frm.doc.estimation_items || [])
+        .filter(item => !item.parent_component)
+        .reduce((sum, item) => sum + flt(item.quantity), 0);
     if (quantity > 0) {
         frm.set_value('cost_per_unit', total_cost / quantity);
     }
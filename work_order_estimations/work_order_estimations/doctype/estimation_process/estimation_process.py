@@ -4,8 +4,10 @@
 import frappe
 from frappe.model.document import Document
 
+from work_order_estimations.costing.processes import calculate_process_cost, get_workstation_details
+
 class EstimationProcess(Document):
     def validate(self):
-        """Calculate total cost when rate or quantity changes"""
-        if self.rate and self.qty:
-            self.total_cost = self.rate * self.qty
+        """Calculate total cost from the workstation hour rate or the manual rate"""
+        details = get_workstation_details([self.workstation])
+        calculate_process_cost(self, details.get(self.workstation))
@@ -0,0 +1,25 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+from work_order_estimations.costing.reel import clear_reel_size_cache
+from work_order_estimations.reference_data import invalidate_reference_data
+
+class PaperReelSize(Document):
+    def validate(self):
+        """Validate reel dimensions"""
+        if not self.reel_width_cm or self.reel_width_cm <= 0:
+            frappe.throw(_("Reel Width must be greater than 0"))
+        if self.reel_length_m and self.reel_length_m < 0:
+            frappe.throw(_("Reel Length cannot be negative"))
+    
+    def on_update(self):
+        clear_reel_size_cache()
+        invalidate_reference_data()
+    
+    def on_trash(self):
+        clear_reel_size_cache()
+        invalidate_reference_data()
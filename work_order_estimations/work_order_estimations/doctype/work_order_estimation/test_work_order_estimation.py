@@ -1,9 +1,405 @@
 # Copyright (c) 2025, itsyosfeali and Contributors
 # See license.txt
 
-# import frappe
+import json
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, today
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from work_order_estimations.api import run_batch
+from work_order_estimations.archive import ARCHIVE_DOCTYPE, compress
+from work_order_estimations.cloning import copy_estimation
+from work_order_estimations.costing.addons import get_addon_amount, split_addon_amount
+from work_order_estimations.costing.components import ComponentTree
+from work_order_estimations.costing.processes import calculate_process_cost
+from work_order_estimations.costing.reel import calculate_reel_metrics, pick_reel
+from work_order_estimations.costing.waste import get_chain_factors
+from work_order_estimations.dashboard import get_estimation_summaries, get_summaries
+from work_order_estimations import idempotency
+from work_order_estimations.estimation_status import STATUS_TRANSITIONS, can_transition
+from work_order_estimations.export import LINE_TABLES, get_queries
+from work_order_estimations.quotation_sync import flush_estimation_updates, replay_operations
+from work_order_estimations.realtime import get_estimation_delta
+from work_order_estimations.revisions import apply_delta, diff_states, empty_state
+
+TEST_CUSTOMER = "_Test Estimation Customer"
+
+
+def make_estimation(**values):
+	if not frappe.db.exists("Customer", TEST_CUSTOMER):
+		customer = frappe.get_doc({"doctype": "Customer", "customer_name": TEST_CUSTOMER})
+		customer.insert(ignore_permissions=True, ignore_mandatory=True)
+	return frappe.get_doc({
+		"doctype": "Work Order Estimation",
+		"project_name": "_Test Estimation",
+		"client_name": TEST_CUSTOMER,
+		"delivery_date": add_days(today(), 30),
+		**values,
+	}).insert()
 
 
 class TestWorkOrderEstimation(FrappeTestCase):
-	pass
+	def test_status_transitions(self):
+		self.assertTrue(can_transition("Draft", "Estimation Done"))
+		self.assertTrue(can_transition(None, "Cancelled"))
+		self.assertTrue(can_transition("Estimation Done", "Sent"))
+		self.assertFalse(can_transition("Draft", "Quotation Created"))
+		self.assertFalse(can_transition("Cancelled", "Sent"))
+
+		# Every target status must itself be a known state
+		for targets in STATUS_TRANSITIONS.values():
+			for status in targets:
+				self.assertIn(status, STATUS_TRANSITIONS)
+
+	def test_process_chain_waste_factors(self):
+		printing = frappe._dict(make_ready_sheets=100, run_spoilage_percentage=2)
+		cutting = frappe._dict(make_ready_sheets=20, run_spoilage_percentage=0)
+
+		# No processes means no waste
+		self.assertEqual(get_chain_factors([]), (1.0, 0.0))
+
+		# Cutting needs 1000 + 20 sheets, printing needs 1020 / 0.98 + 100
+		factor, offset = get_chain_factors([printing, cutting])
+		self.assertAlmostEqual(1000 * factor + offset, 1020 / 0.98 + 100)
+
+	def test_process_cost_in_estimation_currency(self):
+		# Manual rate of 2 per unit in a currency worth 3.5 estimation currency units
+		manual = frappe._dict(costing_method="Manual Rate", rate=2, qty=100, exchange_rate=3.5)
+		calculate_process_cost(manual)
+		self.assertEqual(manual.rate, 2)
+		self.assertAlmostEqual(manual.total_cost, 700)
+
+		# Hour rate costing keeps the derived rate in the workstation currency
+		timed = frappe._dict(setup_time_mins=30, units_per_hour=1000, qty=1500, exchange_rate=0.5)
+		calculate_process_cost(timed, {"hour_rate": 40})
+		self.assertAlmostEqual(timed.total_hours, 2)
+		self.assertAlmostEqual(timed.rate, 80 / 1500)
+		self.assertAlmostEqual(timed.total_cost, 40)
+
+		# A workstation without an hour rate must not cost the process at zero
+		unrated = frappe._dict(idx=1, workstation="WS", setup_time_mins=30, qty=100)
+		self.assertRaises(frappe.ValidationError, calculate_process_cost, unrated, {"hour_rate": 0})
+
+	def test_addon_amount_in_estimation_currency(self):
+		rows = [frappe._dict(name="A", quantity=100), frappe._dict(name="B", quantity=300)]
+		addon = frappe._dict(consumption_basis="Per Piece", consumption_qty=1, rate=2, exchange_rate=0.25, consumed_qty=400)
+		addon.amount = get_addon_amount(addon)
+		self.assertAlmostEqual(addon.amount, 200)
+		self.assertEqual([share for row, share in split_addon_amount(addon, rows)], [50, 150])
+
+	def test_reel_lanes_and_width(self):
+		row = frappe._dict(idx=1, lanes=0, width_cm=20, length_cm=30, gsm=100, quantity=1000, reel_length_m=1000)
+		reel, lanes, trim = pick_reel([{"name": "R70", "reel_width_cm": 70}], row.width_cm, row.lanes)
+		calculate_reel_metrics(row, reel, lanes)
+		# The picked lane count is kept apart from the user's input
+		self.assertEqual((row.lanes, row.used_lanes, row.trim_cm), (0, 3, 10))
+
+		# No stocked reel fits two 40 cm lanes
+		self.assertIsNone(pick_reel([{"name": "R70", "reel_width_cm": 70}], 40, 2)[0])
+
+		narrow = frappe._dict(idx=2, lanes=4, width_cm=20, length_cm=30, gsm=100, quantity=1000, reel_width_cm=70)
+		self.assertRaises(frappe.ValidationError, calculate_reel_metrics, narrow)
+
+	def test_component_tree_subtree_totals(self):
+		def row(code, parent=None, cost=0, quantity=0, multiplier=1):
+			return frappe._dict(
+				name=code, component_code=code, parent_component=parent, quantity=quantity,
+				quantity_multiplier=multiplier, total_paper_cost=cost, addon_cost=0
+			)
+
+		box = row("BOX", cost=10, quantity=100)
+		base = row("BASE", "BOX", cost=5, multiplier=1)
+		lid = row("LID", "BOX", cost=4, multiplier=1)
+		wrap = row("WRAP", "LID", cost=1, multiplier=2)
+		tree = ComponentTree([box, base, lid, wrap])
+
+		tree.apply_quantities()
+		self.assertEqual(wrap.quantity, 200)
+		self.assertEqual(tree.subtree_total(box), 20)
+
+		# Editing a leaf only invalidates its ancestors
+		wrap.total_paper_cost = 3
+		tree.invalidate(wrap)
+		self.assertIn("BASE", tree.memo)
+		self.assertNotIn("BOX", tree.memo)
+		self.assertEqual(tree.subtree_total(box), 22)
+
+	def test_component_tree_rejects_cycles(self):
+		rows = [
+			frappe._dict(name="A", component_code="A", parent_component="B"),
+			frappe._dict(name="B", component_code="B", parent_component="A"),
+		]
+		self.assertRaises(frappe.ValidationError, ComponentTree, rows)
+
+	def test_revision_delta_round_trip(self):
+		old = empty_state()
+		old["parent"] = {"total_cost": 100, "notes": "first"}
+		old["tables"]["estimation_items"] = {
+			"row1": {"item": "BOX", "quantity": 1000, "total_paper_cost": 60},
+			"row2": {"item": "LID", "quantity": 1000, "total_paper_cost": 40},
+		}
+		new = empty_state()
+		new["parent"] = {"total_cost": 110, "notes": "first"}
+		new["tables"]["estimation_items"] = {
+			"row1": {"item": "BOX", "quantity": 1000, "total_paper_cost": 70},
+			"row3": {"item": "TRAY", "quantity": 500, "total_paper_cost": 40},
+		}
+
+		delta = diff_states(old, new)
+		items = delta["tables"]["estimation_items"]
+		self.assertEqual(delta["parent"], {"total_cost": 110})
+		self.assertEqual(items["changed"], {"row1": {"total_paper_cost": 70}})
+		self.assertEqual(list(items["added"]), ["row3"])
+		self.assertEqual(items["removed"], ["row2"])
+		self.assertNotIn("estimation_processes", delta["tables"])
+
+		self.assertEqual(apply_delta(old, delta), new)
+
+	def test_estimation_delta_contents(self):
+		before = frappe.get_doc({
+			"doctype": "Work Order Estimation",
+			"name": "EST-DELTA",
+			"modified": "2025-01-01 10:00:00",
+			"profit_margin": 10,
+			"notes": "first",
+			"total_cost": 100,
+			"estimation_items": [
+				{"name": "row1", "idx": 1, "item": "BOX", "quantity": 1000},
+				{"name": "row2", "idx": 2, "item": "LID", "quantity": 1000},
+			],
+		})
+		after = frappe.get_doc(before.as_dict())
+		after.modified = "2025-01-01 10:05:00"
+		after.profit_margin = 20
+		after.total_cost = 120
+		after.estimation_items[0].quantity = 2000
+		after.estimation_items.pop()
+
+		delta = get_estimation_delta(after, before)
+		self.assertEqual(delta["previous_modified"], "2025-01-01 10:00:00")
+		# Every changed parent field travels with the totals, unchanged ones do not
+		self.assertEqual(delta["values"]["profit_margin"], 20)
+		self.assertEqual(delta["values"]["total_cost"], 120)
+		self.assertNotIn("notes", delta["values"])
+		self.assertEqual([row["name"] for row in delta["rows"]["estimation_items"]], ["row1"])
+		self.assertEqual(delta["rows"]["estimation_items"][0]["quantity"], 2000)
+		self.assertEqual(delta["removed"], {"estimation_items": ["row2"]})
+
+	def test_dashboard_summaries_etag(self):
+		names = ["EST-MISSING"]
+		etag = get_summaries(names)["etag"]
+		previous_request = getattr(frappe.local, "request", None)
+		try:
+			# A matching If-None-Match gets an empty 304 with the ETag
+			frappe.local.request = Request(EnvironBuilder(headers={"If-None-Match": etag}).get_environ())
+			response = get_estimation_summaries(names)
+			self.assertEqual(response.status_code, 304)
+			self.assertEqual(response.get_data(), b"")
+			self.assertEqual(response.headers["ETag"], etag)
+
+			# A stale one gets the full result, with the current ETag to send next time
+			frappe.local.request = Request(EnvironBuilder(headers={"If-None-Match": 'W/"stale"'}).get_environ())
+			response = get_estimation_summaries(names)
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(response.headers["ETag"], etag)
+			result = json.loads(response.get_data())["message"]
+			self.assertFalse(result["not_modified"])
+			self.assertEqual(result["missing"], names)
+		finally:
+			frappe.local.request = previous_request
+
+	def test_clone_resets_source_fields(self):
+		source = frappe.get_doc({
+			"doctype": "Work Order Estimation",
+			"name": "EST-SOURCE",
+			"status": "Quotation Created",
+			"quotation_reference": "QTN-0001",
+			"is_archived": 1,
+			"currency": "USD",
+			"exchange_rate_date": "2025-01-01",
+			"estimation_items": [{"name": "row1", "item": "BOX", "rate_currency": "EUR", "exchange_rate": 1.1}],
+		})
+		copy = copy_estimation(source, client_name="Other Client", as_template=True, template_name="Box")
+
+		self.assertEqual(copy.status, "Draft")
+		self.assertIsNone(copy.quotation_reference)
+		self.assertEqual(copy.is_archived, 0)
+		self.assertEqual((copy.client_name, copy.is_template, copy.template_name), ("Other Client", 1, "Box"))
+		self.assertNotEqual(copy.estimation_items[0].name, "row1")
+		# Rows keep their exchange rates, so the date they were taken on stays too
+		self.assertEqual(str(copy.exchange_rate_date), "2025-01-01")
+		self.assertEqual(copy.estimation_items[0].exchange_rate, 1.1)
+
+	def test_quotation_sync_replay(self):
+		row = frappe._dict(status="Quotation Created", quotation_reference="QTN-1", sales_order_reference=None)
+		cancel = ({"quotation_reference": None}, "Estimation Done", {"quotation_reference": "QTN-1"}, ("Quotation", "QTN-1", 2))
+		amend = ({"quotation_reference": "QTN-1-1"}, "Quotation Created", {}, ("Quotation", "QTN-1-1", 0))
+
+		# Cancel and amend in one transaction leaves the estimation on the amendment
+		state = replay_operations(row, [cancel, amend], {cancel[3], amend[3]})
+		self.assertEqual((state["quotation_reference"], state["status"]), ("QTN-1-1", "Quotation Created"))
+
+		# An amendment undone by a savepoint rollback is not applied
+		state = replay_operations(row, [cancel, amend], {cancel[3]})
+		self.assertEqual((state["quotation_reference"], state["status"]), (None, "Estimation Done"))
+
+		# The condition guards against clearing a reference to another quotation
+		state = replay_operations(frappe._dict(row, quotation_reference="QTN-2"), [cancel], {cancel[3]})
+		self.assertEqual(state["quotation_reference"], "QTN-2")
+
+		# Status moves the state machine does not allow are skipped, references still apply
+		draft = frappe._dict(status="Draft", quotation_reference=None, sales_order_reference=None)
+		submit = ({"quotation_reference": "QTN-3"}, "Sent", {}, None)
+		state = replay_operations(draft, [submit], set())
+		self.assertEqual((state["quotation_reference"], state["status"]), ("QTN-3", "Draft"))
+
+	def test_quotation_sync_flush(self):
+		estimations = [
+			frappe._dict(name=name, status="Estimation Done", quotation_reference=None, sales_order_reference=None)
+			for name in ("EST-1", "EST-2")
+		]
+
+		def get_all(doctype, filters=None, fields=None, as_list=False, **kwargs):
+			if doctype == "Work Order Estimation":
+				return estimations
+			# QTN-2 was inserted inside a savepoint that was rolled back
+			return [("QTN-1", 0)]
+
+		frappe.flags.estimation_sync = {
+			"EST-1": [({"quotation_reference": "QTN-1"}, "Quotation Created", {}, ("Quotation", "QTN-1", 0))],
+			"EST-2": [({"quotation_reference": "QTN-2"}, "Quotation Created", {}, ("Quotation", "QTN-2", 0))],
+		}
+		with patch("frappe.get_all", side_effect=get_all), patch.object(frappe.db, "set_value") as set_value:
+			flush_estimation_updates()
+
+		set_value.assert_called_once_with(
+			"Work Order Estimation",
+			{"name": ["in", ["EST-1"]]},
+			{"quotation_reference": "QTN-1", "status": "Quotation Created"},
+		)
+		self.assertIsNone(frappe.flags.estimation_sync)
+
+	def test_run_batch_partial_failure(self):
+		estimation = make_estimation()
+		operations = [
+			{"docname": estimation.name, "method": "set_value", "args": {"fieldname": "project_name", "value": "Renamed"}},
+			{"docname": "EST-MISSING", "method": "refresh_calculations"},
+		]
+
+		# Each document succeeds or fails on its own
+		result = run_batch(operations)
+		self.assertFalse(result["success"])
+		self.assertEqual([r["success"] for r in result["results"]], [True, False])
+		self.assertEqual(frappe.db.get_value("Work Order Estimation", estimation.name, "project_name"), "Renamed")
+
+		# With atomic set the whole batch fails
+		self.assertRaises(frappe.DoesNotExistError, run_batch, operations, atomic=1)
+
+	def test_run_batch_refuses_protected_fields(self):
+		estimation = make_estimation()
+		for fieldname, value in (("status", "Quotation Created"), ("is_archived", 1), ("total_cost", 1)):
+			result = run_batch([
+				{"docname": estimation.name, "method": "set_value", "args": {"fieldname": "project_name", "value": "Changed"}},
+				{"docname": estimation.name, "method": "set_value", "args": {"fieldname": fieldname, "value": value}},
+			])
+			self.assertFalse(result["success"])
+
+		# The refused operation rolled back the whole document, the allowed one included
+		values = frappe.db.get_value("Work Order Estimation", estimation.name, ["project_name", "status", "is_archived"], as_dict=True)
+		self.assertEqual((values.project_name, values.status, values.is_archived), ("_Test Estimation", "Draft", 0))
+
+	def make_idempotent_endpoint(self):
+		calls = []
+
+		@idempotency.idempotent("_test_endpoint")
+		def endpoint(value=None):
+			calls.append(value)
+			return {"value": value, "call": len(calls)}
+
+		return endpoint, calls
+
+	def test_idempotent_replay_after_commit(self):
+		endpoint, calls = self.make_idempotent_endpoint()
+		key = frappe.generate_hash()
+		first = endpoint(value="a", idempotency_key=key)
+		frappe.db.after_commit.run()
+
+		# The retry gets the committed result back without running again
+		self.assertEqual(endpoint(value="a", idempotency_key=key), first)
+		self.assertEqual(calls, ["a"])
+
+		# Calls without a key are not deduplicated
+		endpoint(value="b")
+		endpoint(value="b")
+		self.assertEqual(calls, ["a", "b", "b"])
+
+	def test_idempotent_key_released_on_rollback(self):
+		endpoint, calls = self.make_idempotent_endpoint()
+		key = frappe.generate_hash()
+		endpoint(value="a", idempotency_key=key)
+		# What a rollback runs: pending commit callbacks are dropped, rollback callbacks run
+		frappe.db.after_commit.reset()
+		frappe.db.after_rollback.run()
+
+		endpoint(value="a", idempotency_key=key)
+		self.assertEqual(calls, ["a", "a"])
+		frappe.db.after_commit.reset()
+
+	def test_idempotent_duplicate_waits_on_lock(self):
+		endpoint, calls = self.make_idempotent_endpoint()
+		key = frappe.generate_hash()
+		result_key, lock_key = idempotency.get_cache_keys("_test_endpoint", key)
+		self.assertTrue(idempotency.acquire_lock(lock_key))
+
+		# The original request commits while the duplicate waits
+		def original_commits(seconds):
+			frappe.cache.set_value(result_key, {"result": {"value": "original"}})
+
+		with patch.object(idempotency.time, "sleep", side_effect=original_commits):
+			self.assertEqual(endpoint(value="a", idempotency_key=key), {"value": "original"})
+		self.assertEqual(calls, [])
+
+		# An original that never finishes makes the duplicate give up with a conflict
+		other_key = frappe.generate_hash()
+		self.assertTrue(idempotency.acquire_lock(idempotency.get_cache_keys("_test_endpoint", other_key)[1]))
+		with patch.object(idempotency, "WAIT_TIMEOUT", 0):
+			self.assertRaises(idempotency.IdempotencyConflict, endpoint, value="a", idempotency_key=other_key)
+		self.assertEqual(calls, [])
+
+	def test_export_includes_archived_lines(self):
+		def archive_with_items(*paper_types):
+			estimation = make_estimation()
+			items = [
+				{"parent": estimation.name, "idx": idx, "item": "BOX", "paper_type": paper_type, "quantity": 100}
+				for idx, paper_type in enumerate(paper_types, start=1)
+			]
+			frappe.get_doc({
+				"doctype": ARCHIVE_DOCTYPE,
+				"estimation": estimation.name,
+				"snapshot": compress({"estimation_items": items, "estimation_item_addons": [], "estimation_processes": []}),
+			}).insert(ignore_permissions=True)
+			frappe.db.set_value("Work Order Estimation", estimation.name, "is_archived", 1, update_modified=False)
+			return estimation.name
+
+		both = archive_with_items("_Test Paper A", "_Test Paper B")
+		other = archive_with_items("_Test Paper B")
+		columns = LINE_TABLES["items"][1]
+
+		def export(filters):
+			files = {name: [row for chunk in chunks for row in chunk] for name, doctype, cols, chunks in get_queries(filters)}
+			lines = [(row[columns.index("parent")], row[columns.index("paper_type")]) for row in files["items"]]
+			return [row[0] for row in files["estimations"]], lines
+
+		estimations, lines = export({"client_name": TEST_CUSTOMER})
+		self.assertTrue({both, other} <= set(estimations))
+		self.assertTrue({(both, "_Test Paper A"), (both, "_Test Paper B"), (other, "_Test Paper B")} <= set(lines))
+
+		# The paper type filter applies to archived estimations and their lines too
+		estimations, lines = export({"client_name": TEST_CUSTOMER, "paper_type": "_Test Paper A"})
+		self.assertIn(both, estimations)
+		self.assertNotIn(other, estimations)
+		self.assertEqual(lines, [(both, "_Test Paper A")])
@@ -2,6 +2,18 @@
 // For license information, please see license.txt
 
 frappe.ui.form.on('Work Order Estimation', {
+    setup: function(frm) {
+        // Patch the open form from server-side deltas instead of reloading it
+        if (!frappe.realtime.woe_delta_subscribed) {
+            frappe.realtime.on('work_order_estimation_delta', function(delta) {
+                if (cur_frm && cur_frm.doctype === 'Work Order Estimation') {
+                    apply_estimation_delta(cur_frm, delta);
+                }
+            });
+            frappe.realtime.woe_delta_subscribed = true;
+        }
+    },
+    
     refresh: function(frm) {
         // Show/hide the create addons button based on estimation items
         toggle_create_addons_button(frm);
@@ -38,6 +50,36 @@ frappe.ui.form.on('Work Order Estimation', {
                 frappe.set_route('Form', 'Quotation', frm.doc.quotation_reference);
             }, __('View'));
         }
+        
+        // Copying and templates
+        if (!frm.is_new()) {
+            frm.add_custom_button(__('Duplicate Estimation'), function() {
+                show_duplicate_dialog(frm);
+            }, __('Actions'));
+            
+            if (!frm.doc.is_template) {
+                frm.add_custom_button(__('Save as Template'), function() {
+                    save_as_template(frm);
+                }, __('Actions'));
+            }
+            
+            frm.add_custom_button(__('Save Revision'), function() {
+                save_revision(frm);
+            }, __('Revisions'));
+            
+            frm.add_custom_button(__('Compare Revisions'), function() {
+                show_compare_dialog(frm);
+            }, __('Revisions'));
+        }
+        
+        if (frm.is_new() && frm.doc.client_name) {
+            frm.add_custom_button(__('Load from Template'), function() {
+                show_template_dialog(frm);
+            });
+        }
+        
+        // Render the cost dashboard and keep it fresh while the form is open
+        setup_dashboard_polling(frm);
     },
     
     estimation_items: function(frm) {
@@ -117,6 +159,38 @@ function show_addon_dialog(frm) {
                 fieldtype: 'Link',
                 options: 'Item',
                 depends_on: 'eval:doc.addon_type=="Add-on"'
+            },
+            {
+                fieldtype: 'Section Break',
+                label: __('Costing')
+            },
+            {
+                label: __('Consumption Basis'),
+                fieldname: 'consumption_basis',
+                fieldtype: 'Select',
+                options: 'Per Piece\nPer Kg of Paper\nFixed',
+                default: 'Per Piece'
+            },
+            {
+                label: __('Consumption Qty'),
+                fieldname: 'consumption_qty',
+                fieldtype: 'Float',
+                default: 1
+            },
+            {
+                label: __('Rate'),
+                fieldname: 'rate',
+                fieldtype: 'Currency',
+                options: 'rate_currency',
+                description: __('Leave empty to use the Item Price or valuation rate')
+            },
+            {
+                label: __('Rate Currency'),
+                fieldname: 'rate_currency',
+                fieldtype: 'Link',
+                options: 'Currency',
+                depends_on: 'eval:doc.rate',
+                description: __('Leave empty for the estimation currency')
             }
         ],
         primary_action_label: __('Add Addon'),
@@ -183,6 +257,19 @@ function validate_addon_data(values) {
     return true;
 }
 
+frappe.ui.form.on('Work Order Estimation Item', {
+    paper_type: function(frm, cdt, cdn) {
+        const row = locals[cdt][cdn];
+        const paper = work_order_estimations.reference.get_paper(row.paper_type);
+        if (paper && paper.rate && !row.rate_per_kg) {
+            frappe.model.set_value(cdt, cdn, {
+                rate_per_kg: paper.rate,
+                rate_currency: work_order_estimations.reference.data.currency
+            });
+        }
+    }
+});
+
 function show_add_item_dialog(frm) {
     let dialog = new frappe.ui.Dialog({
         title: __('Add Estimation Item'),
@@ -199,7 +286,10 @@ function show_add_item_dialog(frm) {
                 fieldname: 'paper_type',
                 fieldtype: 'Link',
                 options: 'Item',
-                reqd: 1
+                reqd: 1,
+                onchange: function() {
+                    fill_paper_defaults(dialog, this.get_value());
+                }
             },
             {
                 label: __('Quantity (Pieces)'),
@@ -229,8 +319,16 @@ function show_add_item_dialog(frm) {
                 label: __('Rate per KG'),
                 fieldname: 'rate_per_kg',
                 fieldtype: 'Currency',
+                options: 'rate_currency',
                 reqd: 1
             },
+            {
+                label: __('Rate Currency'),
+                fieldname: 'rate_currency',
+                fieldtype: 'Link',
+                options: 'Currency',
+                description: __('Leave empty for the estimation currency')
+            },
             {
                 label: __('Finish'),
                 fieldname: 'finish',
@@ -254,40 +352,61 @@ function show_add_item_dialog(frm) {
     dialog.show();
 }
 
+function fill_paper_defaults(dialog, paper_type) {
+    // Rate and usual GSM / finish of the paper, from the reference mirror
+    const paper = work_order_estimations.reference.get_paper(paper_type);
+    if (!paper) {
+        return;
+    }
+    
+    if (!dialog.get_value('rate_per_kg') && paper.rate) {
+        dialog.set_value('rate_per_kg', paper.rate);
+        dialog.set_value('rate_currency', work_order_estimations.reference.data.currency);
+    }
+    if (!dialog.get_value('gsm') && paper.gsm.length) {
+        dialog.set_value('gsm', paper.gsm[0]);
+    }
+    if (paper.finish) {
+        dialog.set_value('finish', paper.finish);
+    }
+    dialog.set_df_property('gsm', 'description', paper.gsm.length
+        ? __('Usually {0}', [paper.gsm.slice(0, 5).join(', ')])
+        : '');
+}
+
 function add_estimation_item(frm, values) {
-    frappe.call({
-        method: 'add_estimation_item',
-        doc: frm.doc,
-        args: {
-            item_data: values
-        },
+    // Saved estimations get the row inserted directly, so parallel editors do not conflict
+    const call = frm.is_new()
+        ? { method: 'add_estimation_item', doc: frm.doc, args: { item_data: values } }
+        : { method: 'work_order_estimations.appends.append_estimation_item', args: { estimation: frm.doc.name, item_data: values } };
+    
+    frappe.call(Object.assign(call, {
         callback: function(r) {
             if (r.message && r.message.status === 'success') {
-                frappe.msgprint(__('Item added successfully'));
-                frm.reload_doc();
+                frappe.show_alert({message: __('Item added successfully'), indicator: 'green'});
+                apply_estimation_delta(frm, r.message.delta);
             } else {
                 frappe.msgprint(__('Error adding item: {0}').format(r.message.message || 'Unknown error'));
             }
         }
-    });
+    }));
 }
 
 function create_addon(frm, values) {
-    frappe.call({
-        method: 'create_estimation_item_addons',
-        doc: frm.doc,
-        args: {
-            addon_data: values
-        },
+    const call = frm.is_new()
+        ? { method: 'create_estimation_item_addons', doc: frm.doc, args: { addon_data: values } }
+        : { method: 'work_order_estimations.appends.append_estimation_addon', args: { estimation: frm.doc.name, addon_data: values } };
+    
+    frappe.call(Object.assign(call, {
         callback: function(r) {
             if (r.message && r.message.status === 'success') {
-                frappe.msgprint(__('Addon added successfully'));
-                frm.reload_doc();
+                frappe.show_alert({message: __('Addon added successfully'), indicator: 'green'});
+                apply_estimation_delta(frm, r.message.delta);
             } else {
                 frappe.msgprint(__('Error adding addon: {0}').format(r.message.message || 'Unknown error'));
             }
         }
-    });
+    }));
 }
 
 function mark_estimation_done(frm) {
@@ -311,12 +430,15 @@ function mark_estimation_done(frm) {
 }
 
 function convert_to_quotation(frm) {
+    // One key per conversion, so a retried or repeated request returns the same quotation
+    const idempotency_key = frappe.utils.get_random(20);
     frappe.confirm(
         __('Are you sure you want to convert this estimation to a quotation?'),
         function() {
             frappe.call({
                 method: 'create_quotation',
                 doc: frm.doc,
+                headers: { 'Idempotency-Key': idempotency_key },
                 callback: function(r) {
                     if (r) {
                         frappe.msgprint(__('Quotation {0} created successfully!').format(r.message));
@@ -331,4 +453,360 @@ function convert_to_quotation(frm) {
             });
         }
     );
-}
\ No newline at end of file
+}
+
+const DASHBOARD_POLL_INTERVAL = 30000;
+
+function setup_dashboard_polling(frm) {
+    if (frm.dashboard_poll) {
+        clearInterval(frm.dashboard_poll);
+        frm.dashboard_poll = null;
+    }
+    
+    if (frm.is_new()) {
+        return;
+    }
+    
+    frm.dashboard_etag = null;
+    refresh_estimation_dashboard(frm);
+    
+    frm.dashboard_poll = setInterval(function() {
+        // Stop polling once the user has navigated away from this document
+        if (cur_frm !== frm || frm.is_new()) {
+            clearInterval(frm.dashboard_poll);
+            frm.dashboard_poll = null;
+            return;
+        }
+        refresh_estimation_dashboard(frm);
+    }, DASHBOARD_POLL_INTERVAL);
+}
+
+function refresh_estimation_dashboard(frm) {
+    frappe.call({
+        method: 'work_order_estimations.dashboard.get_estimation_summaries',
+        args: {
+            names: [frm.doc.name],
+            fields: ['status', 'currency', 'total_paper_cost', 'total_addon_cost', 'total_cost_for_operations', 'total_cost',
+                'cost_per_unit', 'profit_margin', 'margin_amount', 'sales_price'],
+            aggregates: ['items', 'processes', 'addons'],
+            etag: frm.dashboard_etag
+        },
+        callback: function(r) {
+            if (!r.message || r.message.not_modified) {
+                return;
+            }
+            frm.dashboard_etag = r.message.etag;
+            const summary = r.message.data && r.message.data[frm.doc.name];
+            if (summary) {
+                render_estimation_dashboard(frm, summary);
+            }
+        }
+    });
+}
+
+function render_estimation_dashboard(frm, summary) {
+    const field = frm.get_field('custom_dashboard');
+    if (!field) {
+        return;
+    }
+    
+    const money = (value) => format_currency(value || 0, summary.currency);
+    const cards = [
+        [__('Paper Cost'), money(summary.total_paper_cost)],
+        [__('Addon Cost'), money(summary.total_addon_cost)],
+        [__('Operations Cost'), money(summary.total_cost_for_operations)],
+        [__('Total Cost'), money(summary.total_cost)],
+        [__('Cost per Unit'), format_currency(summary.cost_per_unit || 0, summary.currency, 4)],
+        [__('Margin'), `${flt(summary.profit_margin)}% / ${money(summary.margin_amount)}`],
+        [__('Sales Price'), money(summary.sales_price)],
+        [__('Items'), `${summary.items.count} / ${format_number(summary.items.quantity, null, 0)} ${__('pcs')}`],
+        [__('Paper Weight'), `${format_number(summary.items.total_weight_kg, null, 3)} kg`],
+        [__('Processes'), summary.processes.count],
+        [__('Addons'), summary.addons.count]
+    ];
+    
+    const html = cards.map(([label, value]) => `
+        <div class="col-sm-3" style="margin-bottom: 15px;">
+            <div class="text-muted small">${label}</div>
+            <div class="h5">${value}</div>
+        </div>`).join('');
+    
+    field.$wrapper.html(`<div class="row">${html}</div>`);
+}
+
+const DELTA_CHILD_DOCTYPES = {
+    estimation_items: 'Work Order Estimation Item',
+    estimation_item_addons: 'Work Order Estimation Item Addon',
+    estimation_processes: 'Estimation Process'
+};
+
+function apply_estimation_delta(frm, delta) {
+    if (!delta || delta.name !== frm.doc.name) {
+        return;
+    }
+    
+    // Ignore stale events (e.g. the realtime copy of a delta already applied from the response)
+    if (frm.doc.modified && delta.modified && delta.modified <= frm.doc.modified) {
+        return;
+    }
+    
+    // The delta only covers changes since the version it was made from, and patching would
+    // overwrite unsaved edits: reload a clean form, let the user decide on a dirty one
+    if (frm.is_dirty()) {
+        show_estimation_conflict(frm);
+        return;
+    }
+    if (delta.previous_modified !== frm.doc.modified) {
+        frm.reload_doc();
+        return;
+    }
+    
+    Object.keys(delta.removed || {}).forEach(function(table) {
+        const removed = new Set(delta.removed[table]);
+        frm.doc[table] = (frm.doc[table] || []).filter(function(row) {
+            if (removed.has(row.name)) {
+                frappe.model.clear_doc(row.doctype, row.name);
+                return false;
+            }
+            return true;
+        });
+    });
+    
+    Object.keys(delta.rows || {}).forEach(function(table) {
+        frm.doc[table] = frm.doc[table] || [];
+        delta.rows[table].forEach(function(values) {
+            const existing = frm.doc[table].find(row => row.name === values.name);
+            if (existing) {
+                Object.assign(existing, values);
+            } else {
+                const row = Object.assign({
+                    doctype: DELTA_CHILD_DOCTYPES[table],
+                    parent: frm.doc.name,
+                    parentfield: table,
+                    parenttype: frm.doctype,
+                    docstatus: frm.doc.docstatus
+                }, values);
+                frappe.model.add_to_locals(row);
+                frm.doc[table].push(row);
+            }
+        });
+        frm.doc[table].sort((a, b) => a.idx - b.idx);
+    });
+    
+    Object.assign(frm.doc, delta.values || {});
+    frm.doc.modified = delta.modified;
+    frm.refresh_fields();
+    frm.dashboard_etag = null;
+}
+
+function show_estimation_conflict(frm) {
+    if (frm.show_conflict_message) {
+        frm.show_conflict_message();
+        return;
+    }
+    frappe.msgprint({
+        title: __('Conflict'),
+        indicator: 'red',
+        message: __('This form has been modified after you have loaded it'),
+        primary_action: {
+            label: __('Reload'),
+            action: function() {
+                frappe.hide_msgprint();
+                frm.reload_doc();
+            }
+        }
+    });
+}
+
+function show_duplicate_dialog(frm, source_name) {
+    const idempotency_key = frappe.utils.get_random(20);
+    let dialog = new frappe.ui.Dialog({
+        title: __('Duplicate Estimation'),
+        fields: [
+            {
+                label: __('Client'),
+                fieldname: 'client_name',
+                fieldtype: 'Link',
+                options: 'Customer',
+                default: frm.doc.client_name
+            },
+            {
+                label: __('Reprice from current rates'),
+                fieldname: 'reprice',
+                fieldtype: 'Check',
+                default: 1
+            }
+        ],
+        primary_action_label: __('Duplicate'),
+        primary_action: function(values) {
+            dialog.hide();
+            frappe.call({
+                method: 'work_order_estimations.cloning.duplicate_estimation',
+                args: {
+                    source_name: source_name || frm.doc.name,
+                    reprice: values.reprice,
+                    client_name: values.client_name,
+                    idempotency_key: idempotency_key
+                },
+                freeze: true,
+                callback: function(r) {
+                    if (r.message && r.message.success) {
+                        frappe.set_route('Form', 'Work Order Estimation', r.message.name);
+                    }
+                }
+            });
+        }
+    });
+    
+    dialog.show();
+}
+
+function save_as_template(frm) {
+    frappe.prompt({
+        label: __('Template Name'),
+        fieldname: 'template_name',
+        fieldtype: 'Data',
+        reqd: 1,
+        default: frm.doc.project_name
+    }, function(values) {
+        frappe.call({
+            method: 'work_order_estimations.cloning.save_as_template',
+            args: {
+                source_name: frm.doc.name,
+                template_name: values.template_name
+            },
+            freeze: true,
+            callback: function(r) {
+                if (r.message && r.message.success) {
+                    frappe.show_alert({message: __('Template {0} saved', [values.template_name]), indicator: 'green'});
+                }
+            }
+        });
+    }, __('Save as Template'), __('Save'));
+}
+
+function show_template_dialog(frm) {
+    frappe.call({
+        method: 'work_order_estimations.cloning.get_templates',
+        args: { client_name: frm.doc.client_name },
+        callback: function(r) {
+            const templates = r.message || [];
+            if (!templates.length) {
+                frappe.msgprint(__('No templates found for {0}', [frm.doc.client_name]));
+                return;
+            }
+            
+            frappe.prompt({
+                label: __('Template'),
+                fieldname: 'template',
+                fieldtype: 'Select',
+                reqd: 1,
+                options: templates.map(t => ({ label: `${t.template_name} (${t.name})`, value: t.name }))
+            }, function(values) {
+                show_duplicate_dialog(frm, values.template);
+            }, __('Load from Template'), __('Next'));
+        }
+    });
+}
+
+function save_revision(frm) {
+    if (frm.is_dirty()) {
+        frappe.msgprint(__('Save the estimation before recording a revision'));
+        return;
+    }
+    
+    frappe.prompt({
+        label: __('Note'),
+        fieldname: 'note',
+        fieldtype: 'Small Text'
+    }, function(values) {
+        frappe.call({
+            method: 'work_order_estimations.revisions.make_revision',
+            args: {
+                estimation: frm.doc.name,
+                note: values.note
+            },
+            freeze: true,
+            callback: function(r) {
+                if (r.message && r.message.success) {
+                    frappe.show_alert({message: __('Revision {0} saved', [r.message.revision_no]), indicator: 'green'});
+                }
+            }
+        });
+    }, __('Save Revision'), __('Save'));
+}
+
+function show_compare_dialog(frm) {
+    frappe.call({
+        method: 'work_order_estimations.revisions.get_revisions',
+        args: { estimation: frm.doc.name },
+        callback: function(r) {
+            const revisions = r.message || [];
+            if (!revisions.length) {
+                frappe.msgprint(__('No revisions saved for {0}', [frm.doc.name]));
+                return;
+            }
+            
+            const options = [{ label: __('Current'), value: frm.doc.name }].concat(
+                revisions.map(rev => ({
+                    label: `${__('Revision')} ${rev.revision_no}${rev.note ? ' - ' + rev.note : ''}`,
+                    value: `${frm.doc.name}@${rev.revision_no}`
+                }))
+            );
+            
+            frappe.prompt([
+                { label: __('From'), fieldname: 'from_ref', fieldtype: 'Select', reqd: 1, options: options, default: options[1].value },
+                { label: __('To'), fieldname: 'to_ref', fieldtype: 'Select', reqd: 1, options: options, default: options[0].value }
+            ], function(values) {
+                frappe.call({
+                    method: 'work_order_estimations.revisions.compare_revisions',
+                    args: { references: [values.from_ref, values.to_ref] },
+                    callback: function(res) {
+                        if (res.message) {
+                            render_revision_comparison(frm, res.message);
+                        }
+                    }
+                });
+            }, __('Compare Revisions'), __('Compare'));
+        }
+    });
+}
+
+function render_revision_comparison(frm, result) {
+    const refs = result.references;
+    const first = refs[0], last = refs[refs.length - 1];
+    const money = value => format_currency(value || 0, frm.doc.currency);
+    const labels = {
+        estimation_items: __('Items'),
+        estimation_item_addons: __('Addons'),
+        estimation_processes: __('Processes')
+    };
+    const cost_fields = {
+        estimation_items: 'total_paper_cost',
+        estimation_item_addons: 'amount',
+        estimation_processes: 'total_cost'
+    };
+    const header = `<tr><th></th>${refs.map(ref => `<th class="text-right">${frappe.utils.escape_html(ref)}</th>`).join('')}<th class="text-right">${__('Change')}</th></tr>`;
+    
+    let html = `<table class="table table-bordered table-condensed">${header}`;
+    Object.keys(result.totals[first]).forEach(field => {
+        const change = result.totals[last][field] - result.totals[first][field];
+        html += `<tr><td>${frappe.model.unscrub(field)}</td>${refs.map(ref => `<td class="text-right">${money(result.totals[ref][field])}</td>`).join('')}<td class="text-right">${money(change)}</td></tr>`;
+    });
+    html += '</table>';
+    
+    Object.keys(result.tables).forEach(table => {
+        const rows = result.tables[table].filter(row => row.difference);
+        if (!rows.length) {
+            return;
+        }
+        html += `<h5>${labels[table]}</h5><table class="table table-bordered table-condensed">${header}`;
+        rows.forEach(row => {
+            const label = Object.values(row.key).filter(v => v && typeof v === 'string').join(' / ');
+            html += `<tr><td>${frappe.utils.escape_html(label)}</td>${refs.map(ref => `<td class="text-right">${row.values[ref] ? money(row.values[ref][cost_fields[table]]) : '-'}</td>`).join('')}<td class="text-right">${money(row.difference)}</td></tr>`;
+        });
+        html += '</table>';
+    });
+    
+    frappe.msgprint({ title: __('Revision Comparison'), message: html, wide: true });
+}
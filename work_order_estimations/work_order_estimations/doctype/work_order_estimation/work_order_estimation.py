@@ -6,27 +6,76 @@ from frappe.model.document import Document
 from frappe import _
 import json
 
+from work_order_estimations.appends import append_addon, append_item, get_addon_values, get_item_values, lock_estimation
+from work_order_estimations.archive import ARCHIVE_DOCTYPE, load_archived_rows, restore_archived_rows
+from work_order_estimations.costing.addons import calculate_addon_costs
+from work_order_estimations.costing.components import calculate_subtree_costs, get_component_tree
+from work_order_estimations.costing.currency import apply_exchange_rates
+from work_order_estimations.costing.processes import calculate_process_costs, is_hour_rate_costed
+from work_order_estimations.costing.reel import calculate_reel_consumption
+from work_order_estimations.costing.totals import apply_final_totals
+from work_order_estimations.costing.waste import calculate_process_waste
+from work_order_estimations.error_tracking import record_error
+from work_order_estimations.estimation_status import transition_single
+from work_order_estimations.idempotency import idempotent
+from work_order_estimations.realtime import publish_estimation_delta
+
 class WorkOrderEstimation(Document):
     def on_trash(self):
         if self.quotation_reference:
-            try:
-                quotation = frappe.get_doc("Quotation", self.quotation_reference)
-                if quotation.custom_work_order_estimation_reference == self.name:
-                    quotation.custom_work_order_estimation_reference = None
-                    quotation.save()
-                    frappe.db.commit()
-                    frappe.msgprint(_("WOE reference cleared from Quotation {0}").format(self.quotation_reference))
-                    
-            except Exception as e:
-                frappe.log_error(f"Error clearing WOE reference from quotation: {str(e)}")
+            # Only clear the link if the quotation still points at this estimation
+            frappe.db.set_value(
+                "Quotation",
+                {"name": self.quotation_reference, "custom_work_order_estimation_reference": self.name},
+                "custom_work_order_estimation_reference",
+                None,
+            )
+        
+        frappe.db.delete("Work Order Estimation Revision", {"estimation": self.name})
+        frappe.db.delete(ARCHIVE_DOCTYPE, {"estimation": self.name})
+    
+    def load_from_db(self):
+        """Archived estimations read their child rows from the archive snapshot"""
+        super().load_from_db()
+        if self.is_archived:
+            load_archived_rows(self)
+    
+    def before_save(self):
+        if self.is_archived:
+            restore_archived_rows(self)
+    
+    def on_update(self):
+        """Push changed rows and new totals to other open forms"""
+        before = self.get_doc_before_save()
+        if before:
+            self.flags.estimation_delta = publish_estimation_delta(self, before)
     
     def validate(self):
         """Validate and calculate all fields"""
+        self.calculate_all()
+        self.update_status()
+        self.validate_processes()
+    
+    def calculate_all(self):
+        """Run every item, addon, process and parent calculation in memory"""
+        apply_exchange_rates(self)
+        self.calculate_item_metrics()
         self.calculate_totals_from_items()
+        calculate_addon_costs(self)
+        calculate_subtree_costs(self, self.get_doc_before_save())
+        calculate_process_costs(self)
         self.calculate_operations_cost()
         self.calculate_final_totals()
-        self.update_status()
-        self.validate_processes()
+    
+    def calculate_item_metrics(self):
+        """Recalculate weights, process-chain waste, reel usage and paper cost of all items in one pass"""
+        get_component_tree(self).apply_quantities()
+        for item in self.estimation_items:
+            item.calculate_paper_metrics()
+        calculate_process_waste(self)
+        calculate_reel_consumption(self)
+        for item in self.estimation_items:
+            item.calculate_costs()
     
     def calculate_totals_from_items(self):
         """Calculate total paper cost from all items in child table"""
@@ -47,32 +96,11 @@ class WorkOrderEstimation(Document):
     
     def calculate_final_totals(self):
         """Calculate final totals and per unit costs"""
-        # Total cost (paper + operations)
-        self.total_cost = (self.total_paper_cost or 0) + (self.total_cost_for_operations or 0)
-        
-        # Calculate total quantity from all items
-        total_quantity = 0
-        if self.estimation_items:
-            for item in self.estimation_items:
-                if item.quantity:
-                    total_quantity += item.quantity
-        
-        # Cost per unit
-        if total_quantity > 0:
-            self.cost_per_unit = self.total_cost / total_quantity
-        else:
-            self.cost_per_unit = 0
-        
-        # Margin calculations
-        if self.profit_margin and self.total_cost:
-            profit_margin = float(self.profit_margin) if isinstance(self.profit_margin, str) else self.profit_margin
-            self.margin_amount = self.total_cost * (profit_margin / 100)
-        else:
-            self.margin_amount = 0
-        
-        # Calculate sales price if not set
-        if not self.sales_price and self.total_cost and self.margin_amount:
-            self.sales_price = self.total_cost + self.margin_amount
+        apply_final_totals(self, self.get_product_quantity())
+    
+    def get_product_quantity(self):
+        """Total quantity of product-level items"""
+        return sum(item.quantity or 0 for item in self.estimation_items if not item.parent_component)
     
     def validate_processes(self):
         """Validate that all processes have required fields"""
@@ -82,7 +110,7 @@ class WorkOrderEstimation(Document):
                     frappe.throw(_("Process Type is required for all processes"))
                 if not process.workstation:
                     frappe.throw(_("Workstation is required for all processes"))
-                if not process.rate:
+                if not process.rate and not is_hour_rate_costed(process):
                     frappe.throw(_("Rate is required for all processes"))
     
     def update_status(self):
@@ -91,12 +119,24 @@ class WorkOrderEstimation(Document):
             self.status = "Draft"
     
     @frappe.whitelist()
+    @idempotent("create_quotation")
     def create_quotation(self):
         """Create Quotation from Work Order Estimation"""
         try:
+            if self.is_template:
+                frappe.throw(_("Templates cannot be converted to quotations. Create an estimation from it first."))
             if self.status != "Estimation Done":
                 frappe.throw(_("Only completed estimations can be converted to quotations."))
             
+            # Serialize conversions of this estimation; a quotation created by a
+            # concurrent request is returned instead of making a second one
+            lock_estimation(self.name)
+            existing = frappe.db.get_value(
+                "Quotation", {"custom_work_order_estimation_reference": self.name, "docstatus": ["<", 2]}
+            )
+            if existing:
+                return existing
+            
             # Create quotation
             quotation = frappe.new_doc("Quotation")
             quotation.party_name = self.client_name
@@ -114,6 +154,8 @@ class WorkOrderEstimation(Document):
                 quotation.valid_till = add_days(today, 30)
             
             quotation.custom_work_order_estimation_reference = self.name
+            if self.currency:
+                quotation.currency = self.currency
             
             # Set flags to prevent automatic price fetching and calculations
             quotation.ignore_pricing_rule = 1
@@ -126,12 +168,8 @@ class WorkOrderEstimation(Document):
             else:
                 total_selling_price = (self.total_cost or 0) + (self.margin_amount or 0)
             
-            # Calculate total quantity from all estimation items
-            total_quantity = 0
-            if self.estimation_items:
-                for est_item in self.estimation_items:
-                    if est_item.quantity:
-                        total_quantity += est_item.quantity
+            # Calculate total quantity from product-level estimation items
+            total_quantity = self.get_product_quantity()
             
             if total_quantity == 0:
                 frappe.throw(_("Total quantity cannot be zero. Please add items with valid quantities."))
@@ -139,10 +177,10 @@ class WorkOrderEstimation(Document):
             # Calculate rate per piece
             rate_per_piece = total_selling_price / total_quantity
             
-            # Add items to quotation
+            # Add product-level items to quotation; their parts are costed into them
             if self.estimation_items:
                 for est_item in self.estimation_items:
-                    if est_item.item and est_item.quantity:
+                    if est_item.item and est_item.quantity and not est_item.parent_component:
                         # Calculate amount for this item
                         item_amount = rate_per_piece * est_item.quantity
                         
@@ -161,23 +199,24 @@ class WorkOrderEstimation(Document):
             quotation.flags.ignore_validate_update_after_submit = True
             quotation.insert()
             
-            # Update status and reference
+            # Status and reference are synced by the Quotation after_insert event;
+            # mirror them here so the returned document is current
             self.status = "Quotation Created"
             self.quotation_reference = quotation.name
-            self.save()
             
             frappe.msgprint(_("Quotation {0} created successfully!").format(quotation.name))
             return quotation.name
             
         except Exception as e:
             error_msg = f"Quotation creation failed for {self.name}: {str(e)[:100]}"
-            frappe.log_error(error_msg, "Work Order Estimation Error")
+            record_error("create_quotation", error_msg)
             frappe.throw(_("Error creating quotation: {0}").format(str(e)))
     
     def get_cost_breakdown(self):
         """Get detailed cost breakdown for dashboard"""
         breakdown = {
             "paper_cost": self.total_paper_cost or 0,
+            "addon_cost": self.total_addon_cost or 0,
             "process_cost": self.total_cost_for_operations or 0,
             "total_cost": self.total_cost or 0,
             "profit_margin": self.profit_margin or 0,
@@ -191,21 +230,12 @@ class WorkOrderEstimation(Document):
     def update_quotation_with_woe_reference(self):
         """Update quotation with WOE reference when WOE is created"""
         if self.quotation_reference:
-            try:
-                # Get the quotation
-                quotation = frappe.get_doc("Quotation", self.quotation_reference)
-                
-                # Update the quotation with WOE reference
-                quotation.custom_work_order_estimation_reference = self.name
-                
-                # Save the quotation
-                quotation.save()
-                frappe.db.commit()
-                
-                frappe.msgprint(_("Quotation updated with WOE reference: {0}").format(self.name))
-                
-            except Exception as e:
-                frappe.log_error(f"Error updating quotation with WOE reference: {str(e)}")
+            frappe.db.set_value(
+                "Quotation",
+                self.quotation_reference,
+                "custom_work_order_estimation_reference",
+                self.name,
+            )
 
     @frappe.whitelist()
     def create_estimation_item_addons(self, addon_data):
@@ -215,41 +245,25 @@ class WorkOrderEstimation(Document):
             if isinstance(addon_data, str):
                 addon_data = json.loads(addon_data)
             
-            # Validate that estimation items exist
-            if not self.estimation_items:
-                frappe.throw(_("Please add estimation items first before creating addons"))
-            
-            # Get item details for display name
-            item_name = ""
-            if addon_data.get("item"):
-                try:
-                    item = frappe.get_doc("Item", addon_data.get("item"))
-                    item_name = item.item_name or item.name
-                except:
-                    item_name = addon_data.get("item")
-            
-            # Add new row to estimation_item_addons
-            new_addon = self.append("estimation_item_addons", {
-                "item": addon_data.get("item"),
-                "item_name": item_name,
-                "addon_type": addon_data.get("addon_type"),
-                "wrapper_item": addon_data.get("wrapper_item"),
-                "color_item": addon_data.get("color_item"),
-                "handle_item": addon_data.get("handle_item"),
-                "addon_item": addon_data.get("addon_item")
-            })
-            
-            # Save the document
-            self.save()
+            if self.is_new():
+                if not self.estimation_items:
+                    frappe.throw(_("Please add estimation items first before creating addons"))
+                new_addon = self.append("estimation_item_addons", get_addon_values(addon_data))
+                self.save()
+                delta = self.flags.estimation_delta
+            else:
+                # Insert the row directly so parallel appends do not race on a full save
+                new_addon, delta = append_addon(self.name, addon_data)
             
             return {
                 "status": "success",
                 "message": _("Addon added successfully"),
-                "addon_name": new_addon.name
+                "addon_name": new_addon.name,
+                "delta": delta
             }
             
         except Exception as e:
-            frappe.log_error(f"Error adding estimation item addon: {str(e)}")
+            record_error("create_estimation_item_addons", f"Error adding estimation item addon: {str(e)}")
             return {
                 "status": "error",
                 "message": _("Error adding addon: {0}").format(str(e))
@@ -262,9 +276,8 @@ class WorkOrderEstimation(Document):
             if self.status != "Draft":
                 frappe.throw(_("Only draft estimations can be marked as done."))
             
-            # Change status to Estimation Done
-            self.status = "Estimation Done"
-            self.save()
+            # Change status to Estimation Done without re-running cost calculations
+            transition_single(self.name, "Estimation Done", self.modified)
             
             return {
                 "status": "success",
@@ -272,7 +285,7 @@ class WorkOrderEstimation(Document):
             }
             
         except Exception as e:
-            frappe.log_error(f"Error marking estimation as done: {str(e)}")
+            record_error("mark_estimation_done", f"Error marking estimation as done: {str(e)}")
             return {
                 "status": "error",
                 "message": _("Error marking estimation as done: {0}").format(str(e))
@@ -286,55 +299,23 @@ class WorkOrderEstimation(Document):
             if isinstance(item_data, str):
                 item_data = json.loads(item_data)
             
-            # Add new row to estimation_items
-            new_item = self.append("estimation_items", {
-                "item": item_data.get("item"),
-                "paper_type": item_data.get("paper_type"),
-                "quantity": item_data.get("quantity"),
-                "gsm": item_data.get("gsm"),
-                "length_cm": item_data.get("length_cm"),
-                "width_cm": item_data.get("width_cm"),
-                "rate_per_kg": item_data.get("rate_per_kg"),
-                "finish": item_data.get("finish"),
-                "waste_percentage": item_data.get("waste_percentage", 5)
-            })
-            
-            # Manually trigger calculations for the new item
-            if new_item.gsm and new_item.length_cm and new_item.width_cm and new_item.quantity:
-                # Calculate weight per piece (GSM * length * width / 10000) / 1000
-                area_sqm = (new_item.length_cm * new_item.width_cm) / 10000
-                new_item.weight_per_piece_kg = (new_item.gsm * area_sqm) / 1000
-                
-                # Calculate pieces per kg
-                if new_item.weight_per_piece_kg > 0:
-                    new_item.pieces_per_kg = 1 / new_item.weight_per_piece_kg
-                
-                # Calculate net weight needed
-                new_item.net_weight_kg = new_item.weight_per_piece_kg * new_item.quantity
-                
-                # Calculate waste weight
-                waste_percentage = new_item.waste_percentage or 0
-                new_item.waste_kg = new_item.net_weight_kg * (waste_percentage / 100)
-                
-                # Calculate total weight including waste
-                new_item.total_weight_kg = new_item.net_weight_kg + new_item.waste_kg
-                
-                # Calculate costs if rate is available
-                if new_item.rate_per_kg and new_item.weight_per_piece_kg and new_item.total_weight_kg:
-                    new_item.cost_per_piece = new_item.weight_per_piece_kg * new_item.rate_per_kg
-                    new_item.total_paper_cost = new_item.total_weight_kg * new_item.rate_per_kg
-            
-            # Save the document to trigger parent calculations
-            self.save()
+            if self.is_new():
+                new_item = self.append("estimation_items", get_item_values(item_data))
+                self.save()
+                delta = self.flags.estimation_delta
+            else:
+                # Insert the row directly so parallel appends do not race on a full save
+                new_item, delta = append_item(self.name, item_data)
             
             return {
                 "status": "success",
                 "message": _("Item added successfully"),
-                "item_name": new_item.name
+                "item_name": new_item.name,
+                "delta": delta
             }
             
         except Exception as e:
-            frappe.log_error(f"Error adding estimation item: {str(e)}")
+            record_error("add_estimation_item", f"Error adding estimation item: {str(e)}")
             return {
                 "status": "error",
                 "message": _("Error adding item: {0}").format(str(e))
@@ -0,0 +1,117 @@
+// Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+// For license information, please see license.txt
+
+frappe.listview_settings['Work Order Estimation'] = {
+    onload: function(listview) {
+        if (frappe.model.can_write('Work Order Estimation')) {
+            listview.page.add_menu_item(__('Reprice at Exchange Rates'), function() {
+                show_reprice_dialog(listview);
+            });
+            
+            if (!frappe.realtime.woe_reprice_subscribed) {
+                frappe.realtime.on('work_order_estimation_reprice', function(result) {
+                    frappe.msgprint({
+                        title: __('Repricing Finished'),
+                        indicator: result.failed.length ? 'orange' : 'green',
+                        message: __('{0} estimations repriced at the rates of {1}; {2} failed', [
+                            result.repriced.length, frappe.datetime.str_to_user(result.exchange_rate_date), result.failed.length
+                        ])
+                    });
+                    listview.refresh();
+                });
+                frappe.realtime.woe_reprice_subscribed = true;
+            }
+        }
+        
+        if (!frappe.model.can_export('Work Order Estimation')) {
+            return;
+        }
+        
+        listview.page.add_menu_item(__('Export Lines'), function() {
+            show_export_dialog();
+        });
+        
+        if (!frappe.realtime.woe_export_subscribed) {
+            frappe.realtime.on('work_order_estimation_export', function(result) {
+                frappe.msgprint({
+                    title: __('Export Ready'),
+                    indicator: 'green',
+                    message: __('Your export is ready: {0}', [
+                        `<a href="${result.file_url}" target="_blank">${__('Download')}</a>`
+                    ])
+                });
+            });
+            frappe.realtime.woe_export_subscribed = true;
+        }
+    }
+};
+
+function show_export_dialog() {
+    const dialog = new frappe.ui.Dialog({
+        title: __('Export Estimations and Lines'),
+        fields: [
+            { label: __('Format'), fieldname: 'file_format', fieldtype: 'Select', options: 'csv\nparquet', default: 'csv', reqd: 1 },
+            { label: __('From Date'), fieldname: 'from_date', fieldtype: 'Date' },
+            { label: __('To Date'), fieldname: 'to_date', fieldtype: 'Date' },
+            { fieldtype: 'Column Break' },
+            { label: __('Client'), fieldname: 'client_name', fieldtype: 'Link', options: 'Customer' },
+            { label: __('Status'), fieldname: 'status', fieldtype: 'Select', options: '\nDraft\nEstimation Done\nSent\nQuotation Created\nCancelled' },
+            { label: __('Paper Type'), fieldname: 'paper_type', fieldtype: 'Link', options: 'Item' }
+        ],
+        primary_action_label: __('Export'),
+        primary_action: function(values) {
+            const { file_format, ...filters } = values;
+            frappe.call({
+                method: 'work_order_estimations.export.start_export',
+                args: { file_format: file_format, filters: filters },
+                callback: function(r) {
+                    if (r.message) {
+                        dialog.hide();
+                        frappe.show_alert({ message: __('Export started; you will be notified when it is ready'), indicator: 'blue' });
+                    }
+                }
+            });
+        }
+    });
+    dialog.show();
+}
+
+function show_reprice_dialog(listview) {
+    const selected = listview.get_checked_items(true);
+    const dialog = new frappe.ui.Dialog({
+        title: __('Reprice Open Estimations'),
+        fields: [
+            {
+                fieldtype: 'HTML',
+                options: `<p class="text-muted">${selected.length
+                    ? __('Reprices the {0} selected estimations that are still open.', [selected.length])
+                    : __('Reprices every open estimation with rows priced in another currency.')}</p>`
+            },
+            { label: __('Only Rows in Currency'), fieldname: 'currency', fieldtype: 'Link', options: 'Currency' },
+            { label: __('Exchange Rate Date'), fieldname: 'exchange_rate_date', fieldtype: 'Date', default: frappe.datetime.get_today(), reqd: 1 }
+        ],
+        primary_action_label: __('Reprice'),
+        primary_action: function(values) {
+            frappe.call({
+                method: 'work_order_estimations.repricing.start_repricing',
+                args: {
+                    currency: values.currency,
+                    estimations: selected.length ? selected : null,
+                    exchange_rate_date: values.exchange_rate_date
+                },
+                callback: function(r) {
+                    if (r.message) {
+                        dialog.hide();
+                        frappe.show_alert({
+                            message: r.message.count
+                                ? __('Repricing {0} estimations; you will be notified when it is done', [r.message.count])
+                                : __('No open estimations to reprice'),
+                            indicator: r.message.count ? 'blue' : 'orange'
+                        });
+                    }
+                }
+            });
+        }
+    });
+    dialog.show();
+}
@@ -34,12 +34,15 @@ class WorkOrderEstimationItem(Document):
         self.total_weight_kg = self.net_weight_kg + self.waste_kg
     
     def calculate_costs(self):
-        """Calculate cost-related fields"""
+        """Calculate cost-related fields in the estimation currency"""
         if not all([self.weight_per_piece_kg, self.rate_per_kg, self.total_weight_kg]):
             return
         
+        # Rate per kg is in the row's rate currency
+        rate_per_kg = self.rate_per_kg * (self.exchange_rate or 1)
+        
         # Calculate cost per piece
-        self.cost_per_piece = self.weight_per_piece_kg * self.rate_per_kg
+        self.cost_per_piece = self.weight_per_piece_kg * rate_per_kg
         
         # Calculate total paper cost
-        self.total_paper_cost = self.total_weight_kg * self.rate_per_kg
+        self.total_paper_cost = self.total_weight_kg * rate_per_kg
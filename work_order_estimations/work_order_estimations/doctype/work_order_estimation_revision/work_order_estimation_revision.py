@@ -0,0 +1,12 @@
+# Copyright (c) 2025, Ebkar Technology & Management Solutions and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe import _
+from frappe.model.document import Document
+
+class WorkOrderEstimationRevision(Document):
+    def validate(self):
+        """Revisions are immutable once written"""
+        if not self.is_new():
+            frappe.throw(_("Estimation revisions cannot be modified"))
@@ -4,6 +4,11 @@
 
 frappe.query_reports["Work Order Estimation Summary"] = {
 	"filters": [
-
+		{
+			"fieldname": "include_archived",
+			"label": __("Include Archived"),
+			"fieldtype": "Check",
+			"default": 0
+		}
 	]
 };
@@ -4,6 +4,8 @@
 import frappe
 from frappe import _
 
+from work_order_estimations.archive import get_archived_quantities
+
 def execute(filters=None):
     columns = get_columns()
     data = get_data(filters)
@@ -37,16 +39,25 @@ def get_columns():
             "fieldtype": "Int",
             "width": 80
         },
+        {
+            "fieldname": "currency",
+            "label": _("Currency"),
+            "fieldtype": "Link",
+            "options": "Currency",
+            "width": 80
+        },
         {
             "fieldname": "total_cost",
             "label": _("Total Cost"),
             "fieldtype": "Currency",
+            "options": "currency",
             "width": 100
         },
         {
             "fieldname": "cost_per_unit",
             "label": _("Cost/Unit"),
             "fieldtype": "Currency",
+            "options": "currency",
             "width": 100
         },
         {
@@ -59,6 +70,7 @@ def get_columns():
             "fieldname": "margin_amount",
             "label": _("Margin Amount"),
             "fieldtype": "Currency",
+            "options": "currency",
             "width": 100
         },
         {
@@ -82,7 +94,8 @@ def get_columns():
     ]
 
 def get_data(filters):
-    conditions = []
+    filters = filters or {}
+    conditions = [["Work Order Estimation", "is_template", "=", 0]]
     
     if filters.get("from_date"):
         conditions.append(["Work Order Estimation", "creation", ">=", filters.get("from_date")])
@@ -92,16 +105,36 @@ def get_data(filters):
         conditions.append(["Work Order Estimation", "status", "=", filters.get("status")])
     if filters.get("client_name"):
         conditions.append(["Work Order Estimation", "client_name", "=", filters.get("client_name")])
+    if not filters.get("include_archived"):
+        conditions.append(["Work Order Estimation", "is_archived", "=", 0])
     
     data = frappe.get_all(
         "Work Order Estimation",
         fields=[
-            "name", "project_name", "client_name", "quantity",
-            "total_cost", "cost_per_unit", "profit_margin", "margin_amount",
-            "status", "creation", "delivery_date"
+            "name", "project_name", "client_name",
+            "currency", "total_cost", "cost_per_unit", "profit_margin", "margin_amount",
+            "status", "creation", "delivery_date", "is_archived"
         ],
         filters=conditions,
         order_by="creation desc"
     )
     
+    # Quantity lives on the product-level items, so sum it per estimation in one grouped query
+    if data:
+        quantities = dict(frappe.get_all(
+            "Work Order Estimation Item",
+            filters={
+                "parenttype": "Work Order Estimation",
+                "parent": ["in", [d.name for d in data]],
+                "parent_component": ["is", "not set"]
+            },
+            fields=["parent", "sum(quantity) as quantity"],
+            group_by="parent",
+            as_list=True
+        ))
+        # Archived estimations have no live items; use their rollup instead
+        quantities.update(get_archived_quantities([d.name for d in data if d.is_archived]))
+        for row in data:
+            row.quantity = quantities.get(row.name) or 0
+    
     return data